@@ -1,14 +1,18 @@
 # run_agent_camera.py
 
+import os
 import cv2
 import time
 import numpy as np
-from threading import Thread, Lock
+from threading import Thread, Condition, Lock
 from pathlib import Path
 from PIL import Image
 
 from vlm_robot_agent.vlm_agent.agent import RobotAgent, Observation
 from vlm_robot_agent.vlm_agent.conversation import ConversationManager
+from vlm_robot_agent.vlm_agent.pipeline import PerceptionPipeline
+from vlm_robot_agent.vlm_agent.state_tracker import AgentState
+from vlm_robot_agent.vlm_inference import telemetry
 
 class CameraStream:
     def __init__(self, src=0):
@@ -16,8 +20,10 @@ class CameraStream:
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH,  640)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         self.cap.set(cv2.CAP_PROP_FPS,          30)
-        self.lock = Lock()
+        self.cond = Condition()
         self.frame = None
+        self.seq = 0
+        self._last_read = 0
         self.running = True
         Thread(target=self.update, daemon=True).start()
 
@@ -25,21 +31,47 @@ class CameraStream:
         while self.running:
             ret, f = self.cap.read()
             if ret:
-                with self.lock:
+                # cap.read() allocates a fresh array per frame: mark it
+                # read-only and share it instead of copying on every read
+                f.setflags(write=False)
+                with self.cond:
                     self.frame = f
+                    self.seq += 1
+                    self.cond.notify_all()
 
     def read(self):
-        with self.lock:
-            return self.frame.copy() if self.frame is not None else None
+        with self.cond:
+            return self.frame
+
+    def read_new(self, timeout=0.5):
+        """Block until a frame newer than the last one returned (None on timeout)."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq != self._last_read or not self.running, timeout):
+                return None
+            self._last_read = self.seq
+            return self.frame
 
     def release(self):
         self.running = False
+        with self.cond:
+            self.cond.notify_all()
         self.cap.release()
 
 
 def main():
+    # Métricas Prometheus en http://<robot>:$VLM_METRICS_PORT/metrics
+    if os.getenv("VLM_METRICS_PORT"):
+        telemetry.enable(telemetry.PrometheusSink(port=int(os.environ["VLM_METRICS_PORT"])))
+
     cam   = CameraStream()
-    agent = RobotAgent(goal_text="Entrar en la oficina 12")
+    # VLM_FAST_PATH=1: pasillo despejado y sin cambios → sin llamada al VLM
+    # VLM_MAX_STALENESS=<s>: frecuencia adaptativa de consultas (QueryScheduler)
+    staleness = os.getenv("VLM_MAX_STALENESS")
+    agent = RobotAgent(
+        goal_text="Entrar en la oficina 12",
+        fast_path=os.getenv("VLM_FAST_PATH") == "1",
+        scheduler={"max_staleness": float(staleness)} if staleness else False,
+    )
 
     # Mostrar plan inicial
     print("┌ Plan de Sub-Goals ────────────────────────────")
@@ -55,13 +87,53 @@ def main():
     cv2.resizeWindow(win_info, 400, 600)
 
     plan_log  = []
-    last_time = time.time()
-    interval  = 0.5  # ≈2 FPS
-
+    overlay   = {"txt": None}
+    # step() (hilo de inferencia) y la conversación (hilo de UI) modifican
+    # state_tracker / memory / goal_manager: nunca a la vez
+    agent_lock = Lock()
+
+    # --- Pipeline captura → encode → inferencia → actuación (hilos propios) ---
+    def encode(frame):
+        # BGR de OpenCV directo al encoder: sin cvtColor ni Image.fromarray;
+        # el frame crudo sigue al encoded para el fast path / scheduler
+        return frame, agent.perception.prepare(frame, channel_order="BGR")
+
+    def infer(item):
+        frame, encoded = item
+        # La conversación corre en el hilo de UI con el lock tomado: el
+        # frame se descarta (ya estaría viejo al terminar) en vez de esperar
+        if not agent_lock.acquire(blocking=False):
+            return None
+        try:
+            if agent._current_mode() != "navigation":
+                return None
+            action = agent.step(encoded, scene=frame, channel_order="BGR")
+            return f"{action.kind.name}: {action.params}"
+        except Exception as e:
+            return "Error: " + str(e)
+        finally:
+            agent_lock.release()
+
+    def actuate(txt):
+        plan_log.append(txt)
+        overlay["txt"] = txt
+        print("🤖", txt)
+        # Pop sub-goals cumplidos
+        with agent_lock:
+            agent.goal_manager.pop_finished()
+
+    pipeline = PerceptionPipeline(capture=cam.read_new, encode=encode, infer=infer, actuate=actuate)
+    pipeline.start()
+
+    shown = None
     while True:
-        frame = cam.read()
-        if frame is None:
+        frame = pipeline.latest_frame
+        if frame is None or frame is shown:
+            # Nada nuevo: cedemos la CPU esperando teclado (~30 FPS de UI)
+            if cv2.waitKey(30) & 0xFF == ord('q'):
+                break
             continue
+        shown = frame
 
         # --- Dibuja cámara y header de modo ---
         disp = frame.copy()
@@ -74,31 +146,19 @@ def main():
 
         # --- Si estamos en modo interacción, corremos bucle de conversación ---
         if mode == "interaction" and agent.conversation:
-            # Ejecuta turnos hasta que la conversación acabe
-            while agent.conversation.interactive_turn(listen_secs=5):
-                # Muestra cada nuevo turno en consola
-                pass
-            # Tras terminar, volvemos a navegación
-            agent.state_tracker.state = agent.state_tracker.NAVIGATING
-
-        # --- Tick de navegación / interacción breve para decidir acción ---
-        if mode == "navigation":
-            if time.time() - last_time > interval:
-                last_time = time.time()
-                img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                try:
-                    action = agent.step(img)
-                    txt    = f"{action.kind.name}: {action.params}"
-                except Exception as e:
-                    txt = "Error: " + str(e)
-
-                # Overlay de la acción
-                plan_log.append(txt)
-                cv2.displayOverlay(win_cam, txt, 1000)
-                print("🤖", txt)
-
-                # Pop sub-goals cumplidos
-                agent.goal_manager.pop_finished()
+            # Ejecuta turnos hasta que la conversación acabe; el lock pausa
+            # la etapa de inferencia (espera a que termine un step en curso)
+            with agent_lock:
+                while agent.conversation.interactive_turn(listen_secs=5):
+                    # Muestra cada nuevo turno en consola
+                    pass
+                # Tras terminar, volvemos a navegación
+                agent.state_tracker.state = AgentState.NAVIGATING
+
+        # --- Overlay de la última acción decidida ---
+        if overlay["txt"] is not None:
+            cv2.displayOverlay(win_cam, overlay["txt"], 1000)
+            overlay["txt"] = None
 
         # --- Panel lateral de info ---
         info = np.zeros((600,400,3), dtype=np.uint8)
@@ -145,6 +205,8 @@ def main():
             print("✅ Misión completada.")
             break
 
+    print("⏱ Tiempos por etapa:", pipeline.timings())
+    pipeline.stop()
     cam.release()
     cv2.destroyAllWindows()
 
@@ -0,0 +1,203 @@
+# ---------------------------------------------------------------------------
+# tests/test_astep.py
+# ---------------------------------------------------------------------------
+"""``RobotAgent.astep`` against an in-process OpenAI-compatible server."""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from vlm_robot_agent.vlm_agent.action_types import NavigationDirection
+from vlm_robot_agent.vlm_agent.agent import RobotAgent
+from vlm_robot_agent.vlm_inference.resilience import ResilientCaller, RetryPolicy
+
+_ENDPOINTS = itertools.count()
+
+
+def _reply(n: int) -> str:
+    return json.dumps(
+        {
+            "actions": [
+                {
+                    "type": "Navigation",
+                    "parameters": {"direction": "forward", "angle": 0, "distance": 0.5},
+                    "Goal_observed": "False",
+                    "where_goal": "FALSE",
+                    "obstacle_avoidance_strategy": "",
+                }
+            ],
+            "description": f"reply {n}",
+            "obstacles": [],
+            "current_environment_type": "OPEN_SPACE_OR_CORRIDOR",
+            "status": "OK",
+        }
+    )
+
+
+class FakeChatServer(ThreadingHTTPServer):
+    """``POST /v1/chat/completions``; request *n* is answered after ``delays[n]`` s."""
+
+    daemon_threads = True
+
+    def __init__(self, delays):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.delays = list(delays)
+        self.requests = 0
+        self.received = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def take(self):
+        with self._lock:
+            n = self.requests
+            self.requests += 1
+        self.received.set()
+        return n, self.delays[n] if n < len(self.delays) else 0.0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        n, delay = self.server.take()
+        time.sleep(delay)
+        body = json.dumps(
+            {
+                "id": f"chatcmpl-{n}",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "fake",
+                "choices": [
+                    {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": _reply(n)}}
+                ],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            }
+        ).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up on this request
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(*delays):
+        server = FakeChatServer(delays)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _agent(server, budget=5.0) -> RobotAgent:
+    agent = RobotAgent(
+        goal_text="Find the door",
+        async_mode=True,
+        conversation=False,
+        backend_options={"base_url": server.url, "api_key": "test"},
+    )
+    # one breaker per test: the process-wide breakers are keyed by endpoint
+    engine = agent.perception.engine
+    engine.resilience = ResilientCaller(
+        RetryPolicy(budget=budget, min_attempt=0.1, max_attempts=1), endpoint=f"fake-{next(_ENDPOINTS)}"
+    )
+    return agent
+
+
+def _frame(shade: int) -> Image.Image:
+    return Image.new("RGB", (64, 48), (shade, shade, shade))
+
+
+def test_superseded_astep_is_cancelled(serve):
+    server = serve(1.5, 0.05)
+    agent = _agent(server)
+
+    async def run():
+        older = asyncio.ensure_future(agent.astep(_frame(0)))
+        await asyncio.to_thread(server.received.wait, 2.0)
+        t0 = time.perf_counter()
+        newer = await agent.astep(_frame(255))
+        return await older, newer, time.perf_counter() - t0
+
+    older, newer, elapsed = asyncio.run(run())
+    assert older is None
+    assert newer is not None and newer.params["direction"] == NavigationDirection.FORWARD
+    assert elapsed < 1.0  # the older request did not hold up the newer tick
+    assert agent.perception.engine.last_raw == _reply(1)
+
+
+def test_stale_answer_is_dropped(serve):
+    server = serve(0.6, 0.05)
+    agent = _agent(server)
+
+    async def run():
+        older = asyncio.ensure_future(agent.astep(_frame(0)))
+        await asyncio.to_thread(server.received.wait, 2.0)
+        await agent.astep(_frame(255))
+        await older
+        await asyncio.sleep(0.8)  # the server has answered the older request by now
+
+    asyncio.run(run())
+    assert server.requests == 2
+    assert len(agent.memory) == 1
+    assert agent.state_tracker.last_observation["description"] == "reply 1"
+    assert agent.perception.engine.last_raw == _reply(1)
+
+
+def test_deadline_stops_the_robot(serve):
+    server = serve(3.0)
+    agent = _agent(server, budget=0.5)
+
+    t0 = time.perf_counter()
+    action = asyncio.run(agent.astep(_frame(0)))
+    assert time.perf_counter() - t0 < 2.0
+    assert action.params["direction"] == NavigationDirection.STOP
+    assert agent.state_tracker.last_observation["status"] == "ERROR"
+
+
+def test_overlapping_ticks_act_one_at_a_time(serve):
+    server = serve(0.01, 0.01)
+    agent = _agent(server)
+    active, peak = [0], [0]
+    act = agent._act
+
+    def slow_act(obs):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        try:
+            time.sleep(0.2)
+            return act(obs)
+        finally:
+            active[0] -= 1
+
+    agent._act = slow_act
+
+    async def run():
+        first = asyncio.ensure_future(agent.astep(_frame(0)))
+        await asyncio.sleep(0.1)  # the first tick is inside ``_act`` now
+        return await asyncio.gather(first, agent.astep(_frame(255)))
+
+    actions = asyncio.run(run())
+    assert all(a is not None for a in actions)
+    assert peak[0] == 1
+    assert len(agent.memory) == 2
@@ -0,0 +1,48 @@
+# ---------------------------------------------------------------------------
+# tests/test_conversation.py
+# ---------------------------------------------------------------------------
+"""Single-call conversation endings."""
+import json
+import types
+
+import pytest
+
+from vlm_robot_agent.vlm_agent import conversation as C
+from vlm_robot_agent.vlm_agent.io import speech_io
+
+
+class ScriptedCompletions:
+    """Answers every chat request with the next structured reply."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+
+    def create(self, **kwargs):
+        content = json.dumps(self.replies.pop(0))
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def spoken(monkeypatch):
+    said = []
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(speech_io, "speak", lambda text, block=True: said.append(text))
+    monkeypatch.setattr(speech_io, "listen_streaming", lambda max_seconds: speech_io.Utterance("mmm, bueno, espera", 1.0))
+    return said
+
+
+def _manager(*replies) -> C.ConversationManager:
+    cm = C.ConversationManager("entrar en la oficina", single_call=True, fast_path=False, retry=False)
+    cm.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=ScriptedCompletions(*replies)))
+    return cm
+
+
+def test_positive_without_utterance_says_farewell(spoken):
+    cm = _manager(
+        {"intent": "neutral", "utterance": "¿Me dejas pasar?", "tag": "none"},
+        {"intent": "positive", "utterance": "", "tag": C.POS_TAG},
+    )
+    assert cm.interactive_turn() is False
+    assert cm.final_result == C.POS_TAG
+    assert spoken[-1].strip() not in ("", C.POS_TAG)  # a farewell, not the bare tag
@@ -0,0 +1,56 @@
+# ---------------------------------------------------------------------------
+# tests/test_encoding.py
+# ---------------------------------------------------------------------------
+"""The encoder never alters an image the caller handed in; the prompt matches what was sent."""
+from PIL import Image
+
+from vlm_robot_agent.vlm_agent.fast_path import GateConfig, SceneGate
+from vlm_robot_agent.vlm_inference.encoding import EncodeOptions, ImageEncoder
+from vlm_robot_agent.vlm_inference.inference import VLMInference
+
+
+def _jpeg(tmp_path, size=(1280, 960)):
+    path = tmp_path / "frame.jpg"
+    Image.new("RGB", size, (40, 90, 140)).save(path, format="JPEG")
+    return path
+
+
+def test_callers_lazy_jpeg_is_not_drafted(tmp_path):
+    img = Image.open(_jpeg(tmp_path))
+    encoded = ImageEncoder(EncodeOptions(max_side=320)).encode(img)
+    assert img.size == (1280, 960) and img.mode == "RGB"
+    assert max(encoded.size) == 320
+
+
+def test_engine_keeps_callers_image(tmp_path):
+    engine = VLMInference(goal="Find the door", provider="stub", retry=False, encoder=EncodeOptions(max_side=320))
+    img = Image.open(_jpeg(tmp_path))
+    engine.prepare(img)
+    assert img.size == (1280, 960)
+
+
+def test_opened_file_is_drafted(tmp_path):
+    encoder = ImageEncoder(EncodeOptions(max_side=320))
+    img = encoder.decode(Image.open(_jpeg(tmp_path)), owned=True)
+    assert max(img.size) < 1280  # decoded at reduced scale
+    encoded = VLMInference(goal="x", provider="stub", retry=False, encoder=encoder).prepare(_jpeg(tmp_path))
+    assert max(encoded.size) == 320
+
+
+def test_gate_keeps_callers_image(tmp_path):
+    img = Image.open(_jpeg(tmp_path))
+    SceneGate(GateConfig(detect_people=False)).check(img)
+    assert img.size == (1280, 960)
+
+
+def test_prompt_drops_guide_note_for_unannotated_image(tmp_path):
+    engine = VLMInference(goal="Find the door", provider="stub", retry=False)
+    engine.infer(_jpeg(tmp_path).read_bytes())  # sent as is: no guide-lines drawn
+    assert "guide-lines" not in engine.last_prompt.system
+    engine.infer(Image.new("RGB", (64, 48)))
+    assert "guide-lines" in engine.last_prompt.system
+
+    legacy = VLMInference(goal="Find the door", provider="stub", retry=False, prompt_layout="legacy",
+                          encoder=EncodeOptions(annotate=False))
+    legacy.infer(Image.new("RGB", (64, 48)))
+    assert "guide-lines" not in legacy.last_prompt and "Find the door" in legacy.last_prompt
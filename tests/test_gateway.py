@@ -0,0 +1,54 @@
+# ---------------------------------------------------------------------------
+# tests/test_gateway.py
+# ---------------------------------------------------------------------------
+"""Every gateway client is billed the usage of its own upstream call only."""
+import asyncio
+
+from vlm_robot_agent.vlm_inference.backends import Completion, StubBackend
+from vlm_robot_agent.vlm_inference.gateway import GatewayServer
+
+
+class MeteredBackend(StubBackend):
+    """Prompt tokens = length of the user message; longer prompts answer first."""
+
+    def _respond(self, request):
+        self.calls += 1
+        tokens = len(request[-1]["content"])
+        return Completion(self.reply, {"prompt_tokens": tokens}), 0.2 / tokens
+
+
+def _payload(text: str):
+    return {"model": "stub", "messages": [{"role": "user", "content": text}]}
+
+
+def _server() -> GatewayServer:
+    return GatewayServer(backends={"stub": MeteredBackend()}, key_rpm=0, robot_rpm=0)
+
+
+def test_overlapping_requests_keep_their_usage():
+    async def run():
+        server = _server()
+        return await asyncio.gather(
+            server.submit("a", _payload("x")),
+            server.submit("b", _payload("x" * 8)),
+        )
+
+    a, b = asyncio.run(run())
+    assert a["usage"] == {"prompt_tokens": 1}
+    assert b["usage"] == {"prompt_tokens": 8}
+
+
+def test_coalesced_follower_reports_no_usage():
+    async def run():
+        server = _server()
+        replies = await asyncio.gather(
+            server.submit("a", _payload("same")),
+            server.submit("b", _payload("same")),
+        )
+        return replies, server.upstreams[0].backend.calls
+
+    (leader, follower), calls = asyncio.run(run())
+    assert calls == 1
+    assert leader["usage"] == {"prompt_tokens": 4} and not leader["coalesced"]
+    assert follower["usage"] == {} and follower["coalesced"]
+    assert follower["text"] == leader["text"]
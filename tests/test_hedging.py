@@ -0,0 +1,56 @@
+# ---------------------------------------------------------------------------
+# tests/test_hedging.py
+# ---------------------------------------------------------------------------
+"""A losing hedge attempt must not leak its usage into the winner's call."""
+import asyncio
+import time
+
+from PIL import Image
+
+from vlm_robot_agent.vlm_inference.async_inference import AsyncVLMInference
+from vlm_robot_agent.vlm_inference.backends import Completion, StubBackend
+from vlm_robot_agent.vlm_inference.hedging import HedgePolicy, HedgeTarget
+from vlm_robot_agent.vlm_inference.inference import CallContext, VLMInference
+
+POLICY = HedgePolicy(initial_delay=0.05, targets=[HedgeTarget(model="fast")])
+
+
+class TwoSpeedBackend(StubBackend):
+    """The primary model answers in 0.4 s (100 tokens), ``fast`` in 0.02 s (1 token)."""
+
+    def _answer(self, model):
+        self.calls += 1
+        return Completion(self.reply, {"prompt_tokens": 1 if model == "fast" else 100}), 0.02 if model == "fast" else 0.4
+
+    def generate(self, request, *, model, **kwargs):
+        reply, delay = self._answer(model)
+        time.sleep(delay)
+        return reply
+
+    async def agenerate(self, request, *, model, **kwargs):
+        reply, delay = self._answer(model)
+        await asyncio.sleep(delay)
+        return reply
+
+
+def test_loser_does_not_overwrite_winner_usage():
+    engine = VLMInference(goal="Find the door", backend=TwoSpeedBackend(), hedge=POLICY, retry=False)
+    ctx = CallContext()
+    engine.infer(Image.new("RGB", (64, 48)), context=ctx)
+    time.sleep(0.5)  # let the losing primary finish on its pool thread
+    assert ctx.usage == {"prompt_tokens": 1}
+    assert engine.last_usage == {"prompt_tokens": 1}
+    assert engine.usage_stats()["prompt_tokens"] == 101  # both attempts were billed
+    stats = engine.hedger.stats()
+    assert stats["hedge_wins"] == 1 and stats["primary_wins"] == 0
+
+
+def test_async_winner_usage():
+    async def run():
+        engine = AsyncVLMInference(goal="Find the door", backend=TwoSpeedBackend(), hedge=POLICY, retry=False)
+        await engine.infer(Image.new("RGB", (64, 48)))
+        return engine
+
+    engine = asyncio.run(run())
+    assert engine.last_usage == {"prompt_tokens": 1}
+    assert engine.hedger.stats()["hedge_wins"] == 1
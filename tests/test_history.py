@@ -0,0 +1,33 @@
+# ---------------------------------------------------------------------------
+# tests/test_history.py
+# ---------------------------------------------------------------------------
+"""History ring text stays numbered 1..n, oldest first, across wrap-around."""
+from vlm_robot_agent.vlm_inference.history import HistoryRing
+
+
+def _expected(lines):
+    return "\n".join(f"{k}. {line}" for k, line in enumerate(lines, start=1))
+
+
+def test_text_before_and_after_wrap():
+    ring = HistoryRing(3)
+    assert ring.text() == "(none)"
+    seen = []
+    for i in range(8):
+        ring.append(i, f"line {i}")
+        seen.append(f"line {i}")
+        assert ring.text() == _expected(seen[-3:])
+        assert list(ring) == list(range(i + 1))[-3:]
+    ring.clear()
+    ring.append(0, "again")
+    assert ring.text() == "1. again"
+
+
+def test_digest_follows_text():
+    ring = HistoryRing(2)
+    ring.append(0, "a")
+    ring.append(1, "b")
+    before = ring.digest()
+    ring.append(2, "c")
+    assert ring.digest() != before
+    assert ring.text() == "1. b\n2. c"
@@ -0,0 +1,61 @@
+# ---------------------------------------------------------------------------
+# tests/test_import_budget.py
+# ---------------------------------------------------------------------------
+"""A navigation-only agent must not load the speech models at start-up.
+
+Every measurement runs in a fresh interpreter so that nothing is cached.
+"""
+import json
+import os
+import subprocess
+import sys
+
+HEAVY = ("whisper", "TTS", "torch", "sounddevice", "soundfile")
+
+SPEECH_IO_BUDGET = 0.1   # s, importing speech_io once numpy is loaded
+COLD_START_BUDGET = 1.0  # s, import + build a RobotAgent, OpenAI SDK import excluded
+
+
+def _python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "OPENAI_API_KEY": "sk-test"}
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], capture_output=True, text=True, env=env, check=True, timeout=120
+    )
+
+
+def _cumulative_us(importtime: str, module: str) -> int:
+    """Cumulative import time of ``module`` from ``-X importtime`` output."""
+    for line in importtime.splitlines():
+        fields = [f.strip() for f in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    raise AssertionError(f"{module} not in -X importtime output")
+
+
+def test_speech_io_import_is_cheap():
+    proc = _python(
+        "import sys, json, numpy\n"
+        "import vlm_robot_agent.vlm_inference.telemetry\n"
+        "import vlm_robot_agent.vlm_agent.io.speech_io\n"
+        f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))",
+        "-X",
+        "importtime",
+    )
+    assert json.loads(proc.stdout) == []
+    seconds = _cumulative_us(proc.stderr, "vlm_robot_agent.vlm_agent.io.speech_io") / 1e6
+    assert seconds < SPEECH_IO_BUDGET, f"speech_io import took {seconds:.3f}s"
+
+
+def test_navigation_agent_cold_start():
+    proc = _python(
+        "import sys, json, time\n"
+        "import openai\n"
+        "t0 = time.perf_counter()\n"
+        "from vlm_robot_agent.vlm_agent.agent import RobotAgent\n"
+        "agent = RobotAgent(goal_text='Find the door')\n"
+        "elapsed = time.perf_counter() - t0\n"
+        f"print(json.dumps([elapsed, [m for m in {HEAVY!r} if m in sys.modules]]))"
+    )
+    elapsed, loaded = json.loads(proc.stdout.splitlines()[-1])
+    assert loaded == []
+    assert elapsed < COLD_START_BUDGET, f"cold start took {elapsed:.3f}s"
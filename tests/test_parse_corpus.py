@@ -0,0 +1,55 @@
+# ---------------------------------------------------------------------------
+# tests/test_parse_corpus.py
+# ---------------------------------------------------------------------------
+"""Parse-failure rate on a corpus of raw model replies, with and without repair.
+
+``fixtures/raw_replies.jsonl`` holds one ``{"kind", "raw"}`` object per line:
+clean, fenced and prefixed replies; complete replies with trailing commas or
+comments; replies cut off by ``max_tokens`` or a dropped stream
+(``truncated`` still holds complete values, ``truncated_early`` does not);
+and prose refusals.
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from vlm_robot_agent.vlm_inference.inference import Status, VLMInference, VLMInferenceError
+
+CORPUS = [json.loads(line) for line in (Path(__file__).parent / "fixtures" / "raw_replies.jsonl").open(encoding="utf-8")]
+PARSEABLE = {"clean", "fenced", "prefixed"}
+REPAIRABLE = PARSEABLE | {"trailing_comma", "comment", "truncated"}
+
+
+def _run(repair: bool):
+    engine = VLMInference(goal="Find office 12", provider="stub", repair=repair, retry=False)
+    results = {}
+    for i, row in enumerate(CORPUS):
+        try:
+            results[i] = engine._parse_response(row["raw"], record=True)
+        except VLMInferenceError:
+            results[i] = None
+    return engine.parse_stats(), results
+
+
+def _share(kinds) -> float:
+    return sum(row["kind"] not in kinds for row in CORPUS) / len(CORPUS)
+
+
+def test_failure_rate_without_repair():
+    stats, results = _run(repair=False)
+    assert stats["failure_rate"] == pytest.approx(_share(PARSEABLE))
+    assert all((results[i] is None) == (row["kind"] not in PARSEABLE) for i, row in enumerate(CORPUS))
+
+
+def test_failure_rate_with_repair():
+    stats, results = _run(repair=True)
+    assert stats["failure_rate"] == pytest.approx(_share(REPAIRABLE))
+    assert stats["failure_rate"] < _run(repair=False)[0]["failure_rate"]
+    assert all((results[i] is None) == (row["kind"] not in REPAIRABLE) for i, row in enumerate(CORPUS))
+
+
+def test_repaired_truncations_are_never_ok():
+    _, results = _run(repair=True)
+    truncated = [results[i] for i, row in enumerate(CORPUS) if row["kind"] == "truncated"]
+    assert truncated and all(r["status"] == Status.NEED_HELP and r["error"] for r in truncated)
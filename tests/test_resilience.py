@@ -0,0 +1,64 @@
+# ---------------------------------------------------------------------------
+# tests/test_resilience.py
+# ---------------------------------------------------------------------------
+"""Breaker bookkeeping of :class:`ResilientCaller`."""
+import itertools
+import logging
+
+import pytest
+
+from vlm_robot_agent.vlm_inference.resilience import ResilientCaller, RetryPolicy, circuit_breaker
+
+_ENDPOINTS = itertools.count()
+
+
+class ClientError(Exception):
+    status_code = 400
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+def _raise(exc):
+    def fn(timeout):
+        raise exc
+
+    return fn
+
+
+def _caller(**policy) -> ResilientCaller:
+    return ResilientCaller(RetryPolicy(max_attempts=1, **policy), endpoint=f"test-{next(_ENDPOINTS)}")
+
+
+def test_client_error_keeps_failure_count():
+    caller = _caller(failure_threshold=2)
+    with pytest.raises(ServerError):
+        caller.call(_raise(ServerError()))
+    with pytest.raises(ClientError):
+        caller.call(_raise(ClientError()))
+    assert caller.breaker.failures == 1
+    with pytest.raises(ServerError):
+        caller.call(_raise(ServerError()))
+    assert caller.breaker.state == "open"
+
+
+def test_client_error_does_not_close_a_half_open_breaker():
+    caller = _caller(failure_threshold=1, reset_timeout=0.0)
+    with pytest.raises(ServerError):
+        caller.call(_raise(ServerError()))
+    with pytest.raises(ClientError):
+        caller.call(_raise(ClientError()))  # the probe, answered with a 400
+    assert caller.breaker.state == "half_open"
+    assert caller.call(lambda timeout: "ok") == "ok"  # the probe was given back
+    assert caller.breaker.state == "closed"
+
+
+def test_conflicting_policy_is_reported(caplog):
+    endpoint = f"test-{next(_ENDPOINTS)}"
+    first = circuit_breaker(endpoint, RetryPolicy(failure_threshold=3))
+    with caplog.at_level(logging.WARNING, logger="vlm_resilience"):
+        assert circuit_breaker(endpoint, RetryPolicy(failure_threshold=3)) is first
+        assert not caplog.records
+        assert circuit_breaker(endpoint, RetryPolicy(failure_threshold=9)) is first
+    assert "failure_threshold=3" in caplog.text
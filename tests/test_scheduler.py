@@ -0,0 +1,73 @@
+# ---------------------------------------------------------------------------
+# tests/test_scheduler.py
+# ---------------------------------------------------------------------------
+"""Ticks skipped by the query scheduler."""
+import json
+
+import numpy as np
+from PIL import Image
+
+from vlm_robot_agent.vlm_agent.action_types import NavigationDirection
+from vlm_robot_agent.vlm_agent.agent import RobotAgent
+
+
+def _agent(status: str) -> RobotAgent:
+    reply = {
+        "actions": [
+            {
+                "type": "Navigation",
+                "parameters": {"direction": "forward", "angle": 0, "distance": 0.5},
+                "Goal_observed": "False",
+                "where_goal": "FALSE",
+                "obstacle_avoidance_strategy": "",
+            }
+        ],
+        "description": "corridor",
+        "obstacles": [],
+        "current_environment_type": "OPEN_SPACE_OR_CORRIDOR",
+        "status": status,
+    }
+    return RobotAgent(
+        goal_text="Find the door",
+        provider="stub",
+        backend_options={"reply": json.dumps(reply)},
+        conversation=False,
+        scheduler={"retry_interval": 60.0, "max_staleness": 60.0},
+    )
+
+
+def test_reuse_extrapolates_after_ok():
+    agent = _agent("OK")
+    frame = Image.new("RGB", (64, 48))
+    agent.step(frame, odometry=0.0)
+    action = agent.step(frame, odometry=0.2)
+    assert agent.scheduler.decisions["reuse"] == 1
+    assert action.params["direction"] == NavigationDirection.FORWARD
+    assert action.params["distance"] == 0.3
+
+
+def test_retry_wait_stops_after_blocked():
+    agent = _agent("BLOCKED")
+    frame = Image.new("RGB", (64, 48))
+    agent.step(frame, odometry=0.0)
+    action = agent.step(frame, odometry=0.0)
+    assert agent.scheduler.decisions["retry_wait"] == 1
+    assert action.params["direction"] == NavigationDirection.STOP
+    assert action.params["distance"] == 0.0
+
+
+def test_scheduler_measures_the_raw_scene():
+    agent = _agent("OK")
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    encoded = agent.perception.prepare(frame, channel_order="BGR")
+    measured = []
+    measure = agent.scheduler.gate.measure
+
+    def spy(img, *args, **kwargs):
+        measured.append(img)
+        return measure(img, *args, **kwargs)
+
+    agent.scheduler.gate.measure = spy
+    agent.step(encoded, scene=frame, channel_order="BGR")
+    agent.step(encoded, scene=frame, channel_order="BGR")
+    assert len(measured) == 2 and all(img is frame for img in measured)
@@ -0,0 +1,58 @@
+# ---------------------------------------------------------------------------
+# tests/test_schema_repair.py
+# ---------------------------------------------------------------------------
+"""Local JSON repair must never complete a truncated value."""
+import json
+
+import pytest
+
+from vlm_robot_agent.vlm_inference.inference import Status, VLMInference, VLMInferenceError
+from vlm_robot_agent.vlm_inference.schema import repair_json
+
+ACTION = '{"type":"Navigation","parameters":{"direction":"forward","angle":90,"distance":0.5}}'
+
+
+def _repaired(raw: str):
+    return json.loads(repair_json(raw))
+
+
+@pytest.fixture
+def engine() -> VLMInference:
+    return VLMInference(goal="Find the door", provider="stub", repair=True, retry=False)
+
+
+def test_truncated_number_is_dropped():
+    data = _repaired('{"actions":[' + ACTION + '],"distance_to_goal":9')
+    assert data == {"actions": [json.loads(ACTION)]}
+
+
+def test_truncated_string_is_dropped():
+    data = _repaired('{"actions":[' + ACTION + '],"description":"a long corr')
+    assert "description" not in data
+    with pytest.raises(ValueError):
+        json.loads(repair_json('{"actions":[{"type":"Navigation","parameters":{"direction":"forward_le'))
+
+
+def test_partial_trailing_element_is_dropped():
+    data = _repaired('{"actions":[' + ACTION + ',{"type":"Interac')
+    assert data["actions"] == [json.loads(ACTION)]
+    data = _repaired('{"obstacles":["chair","tab')
+    assert data["obstacles"] == ["chair"]
+
+
+def test_comments_and_trailing_commas():
+    raw = '{"actions":[' + ACTION + ', // first\n],"status":"OK",}'
+    assert _repaired(raw) == {"actions": [json.loads(ACTION)], "status": "OK"}
+
+
+def test_truncated_reply_is_not_ok(engine):
+    result = engine._parse_response('{"actions":[' + ACTION + '],"description":"hall"')
+    assert result["status"] == Status.NEED_HELP
+    assert result["error"]
+    assert result["actions"][0]["parameters"]["angle"] == 90
+
+
+def test_repair_is_opt_in():
+    engine = VLMInference(goal="Find the door", provider="stub", retry=False)
+    with pytest.raises(VLMInferenceError):
+        engine._parse_response('{"actions":[' + ACTION + '],"status":"OK"')
@@ -0,0 +1,38 @@
+# ---------------------------------------------------------------------------
+# tests/test_usage.py
+# ---------------------------------------------------------------------------
+"""Token usage travels with each reply, never through shared backend state."""
+import threading
+
+from PIL import Image
+
+from vlm_robot_agent.vlm_inference.backends import Backend, Completion, StubBackend
+from vlm_robot_agent.vlm_inference.inference import CallContext, VLMInference
+
+
+class TaggedBackend(StubBackend):
+    """Slow goal → 100 prompt tokens after 0.3 s; any other goal → 1 token after 0.05 s."""
+
+    def _respond(self, request):
+        self.calls += 1
+        tokens = 100 if "slow" in request[1]["content"] else 1
+        return Completion(self.reply, {"prompt_tokens": tokens}), 0.3 if tokens == 100 else 0.05
+
+
+def test_backend_has_no_shared_usage():
+    assert "last_usage" not in vars(Backend)
+
+
+def test_concurrent_calls_keep_their_own_usage():
+    backend = TaggedBackend()
+    slow = VLMInference(goal="slow", backend=backend, retry=False)
+    fast = VLMInference(goal="fast", backend=backend, retry=False)
+    frame = Image.new("RGB", (64, 48))
+    ctx = CallContext()
+    worker = threading.Thread(target=slow.infer, args=(frame,), kwargs={"record_history": False, "context": ctx})
+    worker.start()
+    fast.infer(frame)  # finishes while the slow call is in flight
+    worker.join()
+    assert fast.last_usage == {"prompt_tokens": 1}
+    assert ctx.usage == {"prompt_tokens": 100}
+    assert slow.last_usage == {}  # speculative call: last_* untouched
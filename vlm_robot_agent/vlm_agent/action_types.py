@@ -10,6 +10,7 @@ class NavigationDirection(str, Enum):
     FORWARD_RIGHT = "forward_right"
     LEFT = "left"
     RIGHT = "right"
+    STOP = "stop"           # parada segura: percepción no disponible
 
 class ActionKind(str, Enum):
     NAVIGATION = "navigation"
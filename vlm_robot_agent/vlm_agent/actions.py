@@ -20,3 +20,21 @@ class Action:
         """
         # ★ Implementar según tus sensores o outputs del VLM
         return observation.get("status") == "DONE"
+
+    @classmethod
+    def from_vlm(cls, data: Dict[str, Any]) -> "Action":
+        """
+        Convierte una acción sugerida por el VLM (``InferenceResult["actions"][i]``)
+        en una Action; los valores fuera de los enums se dejan como str
+        (p. ej. "turn_left", "finish").
+        """
+        params = dict(data.get("parameters") or {})
+        if str(data.get("type", "Navigation")).lower() == "interaction":
+            kind = ActionKind.INTERACTION
+            if params.get("interaction_type") in InteractionType._value2member_map_:
+                params["interaction_type"] = InteractionType(params["interaction_type"])
+        else:
+            kind = ActionKind.NAVIGATION
+            if params.get("direction") in NavigationDirection._value2member_map_:
+                params["direction"] = NavigationDirection(params["direction"])
+        return cls(kind=kind, params=params)
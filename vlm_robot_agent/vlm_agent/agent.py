@@ -5,8 +5,10 @@
 
 from __future__ import annotations
 
+import asyncio
+import time
 from enum import Enum, auto
-from typing import Union
+from typing import Any, Callable, Dict, Optional, Union
 from pathlib import Path
 
 from PIL import Image
@@ -17,11 +19,18 @@ from .memory import Memory
 from .planner import Planner
 from .state_tracker import StateTracker, AgentState
 from .actions import Action
-from .perception import Perception, Observation
+from .action_types import ActionKind
+from .fast_path import GateConfig, SceneGate
+from .scheduler import Odometry, QueryScheduler, SchedulePolicy
+from .perception import ImageInput, Perception, Observation
+from .speculation import SpeculativePrefetcher
+from ..vlm_inference import telemetry
+from ..vlm_inference.replay import SessionRecorder
 
 try:
     # ConversationManager is optional – import lazily.
     from .conversation import ConversationManager  # type: ignore
+    from .io import speech_io  # type: ignore
 except ImportError:
     ConversationManager = None  # type: ignore
 
@@ -48,22 +57,94 @@ class RobotAgent:
         goal_text: str,
         provider: str = "openai",
         history_size: int = 10,
+        frame_cache: Dict[str, Any] | None = None,
+        async_mode: bool = False,
+        encode_options: Dict[str, Any] | None = None,
+        hedge: Dict[str, Any] | None = None,
+        backend_options: Dict[str, Any] | None = None,
+        structured_output: bool = False,
+        repair: bool = False,
+        speculative: bool = False,
+        frame_source: Callable[[], ImageInput] | None = None,
+        warm_up_speech: bool = False,
+        conversation: bool = True,
+        recorder: SessionRecorder | str | Path | None = None,
+        fast_path: bool | Dict[str, Any] | SceneGate = False,
+        scheduler: bool | Dict[str, Any] | QueryScheduler = False,
     ) -> None:
-        # 1) Perception engines
+        # 1) Perception engines (``frame_cache`` enables the perceptual-hash cache,
+        #    ``async_mode`` builds asyncio engines for :meth:`astep`,
+        #    ``encode_options`` tunes image size / codec / quality,
+        #    ``hedge`` duplicates slow requests, first valid reply wins,
+        #    ``backend_options`` configures the ``provider`` backend,
+        #    ``structured_output`` constrains replies to the JSON schema,
+        #    ``repair`` fixes malformed / truncated JSON locally)
         self.perception = Perception(
             goal_text=goal_text,
             provider=provider,
             history_size=history_size,
+            frame_cache=frame_cache,
+            async_mode=async_mode,
+            encode_options=encode_options,
+            hedge=hedge,
+            backend_options=backend_options,
+            structured_output=structured_output,
+            repair=repair,
         )
 
+        # 1b) Speculative prefetch: overlap the next request with actuation.
+        #     With ``frame_source`` the next frame is grabbed automatically at
+        #     the end of every step; otherwise call :meth:`speculate`.
+        if speculative and async_mode:
+            raise ValueError("speculative prefetch requires the synchronous engine")
+        self.prefetcher = SpeculativePrefetcher(self.perception) if speculative else None
+        self.frame_source = frame_source
+        self._last_action: Action | None = None
+        self._act_lock = asyncio.Lock()  # one :meth:`astep` worker thread at a time
+
+        # 1c) Local fast path: on a clear, unchanged corridor repeat the last
+        #     navigation action instead of calling the VLM (``fast_path`` may
+        #     be ``True``, a dict of :class:`GateConfig` fields or a gate)
+        if isinstance(fast_path, SceneGate):
+            self.gate: SceneGate | None = fast_path
+        elif fast_path:
+            self.gate = SceneGate(GateConfig(**fast_path) if isinstance(fast_path, dict) else None)
+        else:
+            self.gate = None
+        #     ``scheduler`` adapts the query rate to scene change, status,
+        #     odometry and staleness (a dict of :class:`SchedulePolicy`
+        #     fields); with ``fast_path`` too, the gate also detects people.
+        if isinstance(scheduler, QueryScheduler):
+            self.scheduler: QueryScheduler | None = scheduler
+        elif scheduler:
+            policy = SchedulePolicy(**scheduler) if isinstance(scheduler, dict) else None
+            self.scheduler = QueryScheduler(policy, gate=self.gate)
+        else:
+            self.scheduler = None
+
         # 2) Cognition / memory / planning
         self.goal_manager = GoalManager(Goal(goal_text))
         self.memory = Memory(size=history_size)
         self.planner = Planner()
         self.state_tracker = StateTracker()
 
-        # 3) Optional conversation manager
-        self.conversation = ConversationManager(goal_text) if ConversationManager else None
+        # 3) Optional conversation manager (``conversation=False`` for
+        #    navigation-only agents and offline benchmarks: no LLM client)
+        self.conversation = ConversationManager(goal_text) if ConversationManager and conversation else None
+        #    STT/TTS models load lazily on the first turn; ``warm_up_speech``
+        #    loads them now on a background thread instead.
+        if self.conversation and warm_up_speech:
+            speech_io.warm_up()
+
+        # 3b) Session recording: frame, prompt, raw reply and timings of every
+        #     perceived tick (replay with provider="replay")
+        if isinstance(recorder, (str, Path)):
+            engine = self.perception.engine
+            recorder = SessionRecorder(
+                recorder, meta={"goal": goal_text, "provider": provider, "model": engine.model}
+            )
+        self.recorder = recorder
+        self.last_timings: Dict[str, float] = {}
 
         # 4) Decompose high-level goal into sub-goals
         if hasattr(self.planner, "decompose"):
@@ -82,19 +163,176 @@ class RobotAgent:
         """Whether the agent has completed its top-level mission."""
         return self.state_tracker.state == AgentState.FINISHED
 
-    def step(self, img: Union[str, Path, Image.Image, np.ndarray]) -> Action:
+    def step(
+        self,
+        img: ImageInput | None,
+        *,
+        channel_order: str = "RGB",
+        executed: Action | None = None,
+        on_first_action: Callable[[Action], None] | None = None,
+        odometry: Odometry | None = None,
+        scene: ImageInput | None = None,
+    ) -> Action:
         """One control tick:
         1. Perceive with the right mode.
         2. Update goal_manager & state_tracker.
         3. Decide next action via planner.
         4. If INTERACTION, run ConversationManager.
         5. Log to memory.
+
+        ``img`` may also be a raw OpenCV frame (``channel_order="BGR"``) or
+        pre‑encoded JPEG bytes – see :meth:`Perception.perceive`.  When it is
+        pre‑encoded, pass the raw capture as ``scene``: the fast‑path gate and
+        the scheduler measure ``scene`` (default ``img``) instead of decoding
+        the JPEG again.
+
+        With ``speculative=True``, ``executed`` is the action the robot really
+        carried out since the previous step (``None`` = exactly the returned
+        one).  If it matches, the prefetched result is used and ``img`` is not
+        sent; ``img`` may then be ``None``.
+
+        ``on_first_action`` streams the completion and is called with the
+        VLM's first suggested action as soon as it has been generated, so the
+        robot can start moving while the rest of the answer streams in.  The
+        returned action is still the planner's decision; it may differ.
         """
 
-        # 1) Run perception
+        # 1) Run perception (or adopt the speculative result)
+        t0 = time.perf_counter()
+        mode = self._current_mode()
+        result = self.prefetcher.resolve(executed, mode) if self.prefetcher else None
+        if result is not None:
+            # timings of the speculative call itself, not of the engine's last tick
+            engine_timings = self.prefetcher.context.timings
+            telemetry.count("agent.speculation_hits")
+            self.perception.engine.commit(result, mode)
+            if on_first_action is not None and result["actions"]:
+                on_first_action(Action.from_vlm(result["actions"][0]))
+            obs: Observation = self.perception.to_observation(result)
+        else:
+            if img is None:
+                img = self.frame_source() if self.frame_source else None
+            if img is None:
+                raise ValueError("step() needs an image when no speculative result is usable")
+            if mode == "navigation" and (self.scheduler is not None or self.gate is not None):
+                reused = self._skip_vlm(img if scene is None else scene, mode, channel_order, odometry, t0)
+                if reused is not None:
+                    if on_first_action is not None:
+                        on_first_action(reused)
+                    return reused
+            on_action = None
+            if on_first_action is not None:
+                dispatched: list = []
+
+                def on_action(suggested: Dict[str, Any]) -> None:
+                    if not dispatched:
+                        dispatched.append(suggested)
+                        on_first_action(Action.from_vlm(suggested))
+
+            obs = self.perception.perceive(
+                img, mode=mode, channel_order=channel_order, on_action=on_action
+            )
+            if self.gate is not None and self.scheduler is None and mode == "navigation":
+                self.gate.keyframe(obs)
+            engine_timings = self.perception.engine.last_timings
+        t_perceive = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        action = self._act(obs)
+        if self.scheduler is not None and result is None and mode == "navigation":
+            self.scheduler.committed(obs, action, odometry=odometry)
+        self.last_timings = {
+            **engine_timings,
+            "perceive": t_perceive,
+            "plan": time.perf_counter() - t0,
+        }
+        if self.recorder is not None and result is None:
+            self._record(img, mode, channel_order, action)
+
+        if self.prefetcher and self.frame_source:
+            self.speculate(self.frame_source(), channel_order=channel_order)
+        self.last_timings["step"] = t_perceive + (time.perf_counter() - t0)
+        self._report_timings(mode)
+        return action
+
+    def speculate(self, img: ImageInput, *, channel_order: str = "RGB") -> None:
+        """Fire the next inference now, predicting the last action gets executed."""
+        if self.prefetcher is None or self._last_action is None or img is None:
+            return
+        self.prefetcher.launch(
+            img, predicted=self._last_action, mode=self._current_mode(), channel_order=channel_order
+        )
+
+    async def astep(self, img: ImageInput, *, channel_order: str = "RGB") -> Optional[Action]:
+        """Async control tick (agent built with ``async_mode=True``).
+
+        Calling ``astep`` again while a previous tick is still waiting on the
+        model cancels the older request; the superseded call returns ``None``.
+        The conversation turn, which is blocking, runs in a worker thread;
+        overlapping ticks take turns there, so goals, state and memory are
+        never updated by two threads at once.
+        """
+        t0 = time.perf_counter()
         mode = self._current_mode()
-        obs: Observation = self.perception.perceive(img, mode=mode)
+        obs = await self.perception.aperceive(img, mode=mode, channel_order=channel_order)
+        if obs is None:
+            return None
+        t_perceive = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        async with self._act_lock:
+            action = await asyncio.to_thread(self._act, obs)
+        self.last_timings = {
+            **self.perception.engine.last_timings,
+            "perceive": t_perceive,
+            "plan": time.perf_counter() - t0,
+        }
+        if self.recorder is not None:
+            self._record(img, mode, channel_order, action)
+        self.last_timings["step"] = t_perceive + self.last_timings["plan"]
+        self._report_timings(mode)
+        return action
+
+    def _skip_vlm(
+        self, img: ImageInput, mode: str, channel_order: str, odometry: Odometry | None, t0: float
+    ) -> Action | None:
+        """Repeat the last navigation action if the scheduler / gate says the VLM can be skipped.
 
+        The gate only skips after an OK reply; the scheduler also skips while
+        waiting to re-query a BLOCKED / NEED_HELP scene, and then returns a STOP.
+        """
+        last = self._last_action
+        if self.scheduler is not None:
+            decision = self.scheduler.decide(img, channel_order=channel_order, odometry=odometry)
+            skip, reason = not decision.query, decision.reason
+        else:
+            gated = self.gate.check(img, channel_order=channel_order)
+            skip, reason = not gated.call_vlm, gated.reason
+        if not skip or last is None or last.kind != ActionKind.NAVIGATION:
+            return None
+        if self.scheduler is not None:
+            action = self.scheduler.extrapolate()
+        else:
+            action = Action(kind=last.kind, params=dict(last.params))
+        self.memory.add(self.state_tracker.last_observation, action)
+        self._last_action = action
+        elapsed = time.perf_counter() - t0
+        self.last_timings = {"gate": elapsed, "perceive": elapsed, "plan": 0.0, "step": elapsed}
+        telemetry.count("agent.fast_path_hits")
+        if self.recorder is not None:
+            self.recorder.record(
+                img,
+                prompt=None,
+                raw=None,
+                timings=self.last_timings,
+                mode=mode,
+                channel_order=channel_order,
+                action={"kind": action.kind.name, "params": action.params},
+                gate=reason,
+            )
+        self._report_timings(mode)
+        return action
+
+    def _act(self, obs: Observation) -> Action:
+        """Steps 2-5 of :meth:`step`, shared by the sync and async ticks."""
         # 2) Update goals + state
         self.goal_manager.update_from_observation(obs)
         self.goal_manager.pop_finished()
@@ -105,14 +343,35 @@ class RobotAgent:
 
         # 4) If interaction, trigger conversation turn
         if action.kind.name.lower() == "interaction" and self.conversation:
-            utterance = self.conversation.robot_turn()
+            with telemetry.span("agent.conversation"):
+                utterance = self.conversation.robot_turn()
             action.params["utterance"] = utterance
 
         # 5) Record into memory
         self.memory.add(obs, action)
 
+        self._last_action = action
         return action
 
+    def _report_timings(self, mode: str) -> None:
+        """Agent-level spans; the engine reports its own ``vlm.*`` stages."""
+        if telemetry.enabled():
+            for stage in ("step", "perceive", "plan"):
+                telemetry.record(f"agent.{stage}", self.last_timings[stage], mode=mode)
+
+    def _record(self, img: ImageInput, mode: str, channel_order: str, action: Action) -> None:
+        engine = self.perception.engine
+        self.recorder.record(
+            img,
+            prompt=engine.last_prompt,
+            raw=engine.last_raw,
+            timings=self.last_timings,
+            mode=mode,
+            channel_order=channel_order,
+            usage=engine.last_usage if engine.last_raw is not None else None,
+            action={"kind": action.kind.name, "params": action.params},
+        )
+
     def _current_mode(self) -> str:
         """Choose 'navigation' vs 'interaction' based on the agent's state."""
         if self.state_tracker.state in {
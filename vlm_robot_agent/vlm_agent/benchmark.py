@@ -0,0 +1,200 @@
+"""
+vlm_robot_agent/vlm_agent/benchmark.py
+======================================
+Offline latency benchmark of :meth:`RobotAgent.step` – no network, no API.
+
+Frames come either from the images in ``img/`` (answered by the ``"stub"``
+backend) or from sessions recorded with ``RobotAgent(recorder=…)``
+(answered by the ``"replay"`` backend with the recorded replies).  For every
+stage of the tick – decode, resize, annotate, encode, b64, request, parse,
+plan – and for the whole tick it reports p50 / p95 / p99, plus the peak
+Python heap allocated per tick (``tracemalloc``) and the net growth over the
+run::
+
+    python -m vlm_robot_agent.vlm_agent.benchmark                       # img/*
+    python -m vlm_robot_agent.vlm_agent.benchmark --session runs/office12
+    python -m vlm_robot_agent.vlm_agent.benchmark --json now.json --baseline base.json
+
+With ``--baseline`` the exit status is 1 when any stage's p95 got slower
+than the baseline by more than ``--tolerance`` (regression gate).
+Timings include the ``tracemalloc`` overhead; pass ``--no-memory`` for
+clean latency numbers.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .agent import RobotAgent
+from ..vlm_inference.replay import load_session, session_frames
+
+__all__ = ["STAGES", "percentile", "run_ticks", "summarize", "compare"]
+
+STAGES = ("decode", "resize", "annotate", "encode", "b64", "request", "parse", "perceive", "plan", "tick")
+MEMORY = ("mem_peak_kib",)
+DEFAULT_IMG_DIR = Path(__file__).resolve().parent.parent.parent / "img"
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear‑interpolated percentile (``q`` in 0‑100) of unsorted ``values``."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def run_ticks(agent: RobotAgent, frames: Iterable[Any], *, memory: bool = True) -> Dict[str, List[float]]:
+    """Step ``agent`` over ``frames``; per‑stage samples (ms / KiB)."""
+    samples: Dict[str, List[float]] = defaultdict(list)
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0] if memory else 0
+        for frame in frames:
+            if memory:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+            t0 = time.perf_counter()
+            agent.step(frame)
+            samples["tick"].append((time.perf_counter() - t0) * 1000)
+            for stage, seconds in agent.last_timings.items():
+                samples[stage].append(seconds * 1000)
+            if memory:
+                current, peak = tracemalloc.get_traced_memory()
+                samples["mem_peak_kib"].append((peak - before) / 1024)
+        if memory:
+            samples["mem_growth_kib"].append((tracemalloc.get_traced_memory()[0] - base) / 1024)
+    finally:
+        if started:
+            tracemalloc.stop()
+    return dict(samples)
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        name: {
+            "n": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+        for name, values in samples.items()
+        if values
+    }
+
+
+def compare(
+    summary: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float = 0.2,
+    min_ms: float = 0.5,
+) -> List[str]:
+    """Stages whose p95 exceeds the baseline by more than ``tolerance``.
+
+    Stages under ``min_ms`` in both runs are ignored (timer noise).
+    """
+    regressions = []
+    for name, stats in summary.items():
+        ref = baseline.get(name)
+        if ref is None or max(ref["p95"], stats["p95"]) < min_ms:
+            continue
+        if stats["p95"] > ref["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {stats['p95']:.2f} vs baseline {ref['p95']:.2f}")
+    return regressions
+
+
+def _print_table(title: str, summary: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n── {title} ─────────────────────────────────────")
+    print(f"{'stage':16s} {'n':>5s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+    order = [s for s in STAGES + MEMORY if s in summary]
+    order += sorted(set(summary) - set(order))
+    for name in order:
+        st = summary[name]
+        unit = "KiB" if name.startswith("mem_") else "ms"
+        print(f"{name:16s} {st['n']:5d} {st['p50']:9.2f} {st['p95']:9.2f} {st['p99']:9.2f} {unit}")
+
+
+def _image_frames(img_dir: Path, ticks: Optional[int]) -> List[str]:
+    images = sorted(glob.glob(str(img_dir / "*.[jp][pn]g")))
+    if not images:
+        raise SystemExit(f"no images in {img_dir}")
+    n = ticks or len(images)
+    return [images[i % len(images)] for i in range(n)]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Per-stage latency / memory of RobotAgent.step, offline",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--session", action="append", default=[], help="recorded session directory (repeatable)")
+    parser.add_argument("--images", type=Path, default=DEFAULT_IMG_DIR, help="image folder when no session is given")
+    parser.add_argument("--ticks", type=int, help="ticks over --images (cycled); default one per image")
+    parser.add_argument("--goal", default="Entrar en la oficina 12")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated request latency of the stub [s]")
+    parser.add_argument("--realtime", action="store_true", help="replay sessions with their recorded latency")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc")
+    parser.add_argument("--json", type=Path, help="write the summaries here")
+    parser.add_argument("--baseline", type=Path, help="summary JSON of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p95 slowdown")
+    args = parser.parse_args()
+
+    logging.getLogger("vlm_inference").setLevel(logging.WARNING)
+
+    runs: Dict[str, Dict[str, Dict[str, float]]] = {}
+    if args.session:
+        for session in args.session:
+            meta, _ = load_session(session)
+            agent = RobotAgent(
+                goal_text=meta.get("goal", args.goal),
+                provider="replay",
+                backend_options={"session": session, "realtime": args.realtime},
+                conversation=False,
+            )
+            # only ticks that made a request: the replay serves replies in order
+            frames = [str(p) for tick, p in session_frames(session) if p is not None and tick.get("raw") is not None]
+            runs[session] = summarize(run_ticks(agent, frames, memory=not args.no_memory))
+    else:
+        agent = RobotAgent(
+            goal_text=args.goal,
+            provider="stub",
+            backend_options={"latency": args.latency},
+            conversation=False,
+        )
+        runs[str(args.images)] = summarize(
+            run_ticks(agent, _image_frames(args.images, args.ticks), memory=not args.no_memory)
+        )
+
+    for name, summary in runs.items():
+        _print_table(name, summary)
+
+    if args.json:
+        args.json.write_text(json.dumps(runs, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        failed = False
+        for name, summary in runs.items():
+            ref = baseline.get(name) or (next(iter(baseline.values())) if len(baseline) == 1 else None)
+            if ref is None:
+                print(f"\n{name}: no baseline")
+                continue
+            regressions = compare(summary, ref, args.tolerance)
+            for line in regressions:
+                print(f"REGRESSION {name} {line}")
+            failed = failed or bool(regressions)
+        raise SystemExit(1 if failed else 0)
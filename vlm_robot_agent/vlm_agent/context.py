@@ -0,0 +1,165 @@
+# ---------------------------------------------------------------------------
+# vlm_robot_agent/vlm_agent/context.py
+# ---------------------------------------------------------------------------
+"""Token‑budgeted chat context for :class:`ConversationManager`.
+
+Rebuilding the message list every call (re‑formatting the system template,
+re‑extending the examples, re‑slicing the history) costs little, but sending
+an ever‑growing history does: latency and cost grow with every turn of a long
+negotiation.  **ConversationContext** keeps
+
+    • a *static prefix* (system + examples) rendered once, so its bytes are
+      identical on every request and provider‑side prompt caching hits;
+    • the turns with a running token count, trimmed oldest‑first once the
+      total exceeds ``budget``;
+    • optionally, a rolling summary of the trimmed turns (``summarizer``),
+      placed right after the prefix.
+
+>>> ctx = ConversationContext(prefix, budget=1500)
+>>> ctx.append("user", "Estoy ocupado.")
+>>> client.chat.completions.create(messages=ctx.messages(), ...)
+
+Token counts use ``tiktoken`` when installed, otherwise ~4 characters per
+token.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import tiktoken  # type: ignore
+
+    _ENC = tiktoken.get_encoding("o200k_base")
+except Exception:  # ImportError or missing encoding files
+    _ENC = None
+
+__all__ = ["ConversationContext", "count_tokens"]
+
+Message = Dict[str, str]
+_MSG_OVERHEAD = 4  # role / separators per chat message
+
+
+def count_tokens(text: str) -> int:
+    if _ENC is not None:
+        return len(_ENC.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _msg_tokens(msg: Message) -> int:
+    return count_tokens(msg["content"]) + _MSG_OVERHEAD
+
+
+class ConversationContext:
+    """Static prefix + budgeted, incrementally maintained turn list.
+
+    Parameters
+    ----------
+    prefix : list of messages
+        System prompt and few‑shot examples; copied once and never changed.
+    budget : int, default 1500
+        Token budget for summary + turns (the prefix is not counted).
+    max_turns : int | None
+        Hard cap on kept turns, on top of the budget.
+    summarizer : callable, optional
+        ``summarizer(previous_summary, dropped_messages) -> str``.  When set,
+        trimmed turns are folded into a summary instead of being forgotten.
+        Trimming then goes down to ``low_water * budget`` so the summarizer
+        runs once per batch rather than once per turn.
+    """
+
+    def __init__(
+        self,
+        prefix: Sequence[Message],
+        *,
+        budget: int = 1500,
+        max_turns: Optional[int] = None,
+        summarizer: Optional[Callable[[str, List[Message]], str]] = None,
+        low_water: float = 0.6,
+    ) -> None:
+        self._prefix: Tuple[Message, ...] = tuple(dict(m) for m in prefix)
+        self.prefix_tokens = sum(_msg_tokens(m) for m in self._prefix)
+        self.budget = budget
+        self.max_turns = max_turns
+        self.summarizer = summarizer
+        self.low_water = low_water
+
+        self._turns: Deque[Tuple[Message, int]] = deque()
+        self._turn_tokens = 0
+        self.summary = ""
+        self._summary_msg: Optional[Message] = None
+        self._summary_tokens = 0
+
+        self.trimmed = 0
+        self.summaries = 0
+
+    # ------------------------------------------------------------------
+    @property
+    def tokens(self) -> int:
+        """Tokens sent per request (prefix + summary + turns)."""
+        return self.prefix_tokens + self._summary_tokens + self._turn_tokens
+
+    def append(self, role: str, text: str) -> None:
+        msg = {"role": role, "content": text}
+        n = _msg_tokens(msg)
+        self._turns.append((msg, n))
+        self._turn_tokens += n
+        self._trim()
+
+    def messages(self, extra: Sequence[Message] = ()) -> List[Message]:
+        """Prefix, ``extra`` (constant per call site), summary, then turns."""
+        out = list(self._prefix)
+        out.extend(extra)
+        if self._summary_msg is not None:
+            out.append(self._summary_msg)
+        out.extend(m for m, _ in self._turns)
+        return out
+
+    def clear(self) -> None:
+        self._turns.clear()
+        self._turn_tokens = 0
+        self._set_summary("")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tokens": self.tokens,
+            "prefix_tokens": self.prefix_tokens,
+            "turns": len(self._turns),
+            "trimmed": self.trimmed,
+            "summaries": self.summaries,
+        }
+
+    # ------------------------------------------------------------------
+    def _over(self) -> bool:
+        if self.max_turns is not None and len(self._turns) > self.max_turns:
+            return True
+        return self._summary_tokens + self._turn_tokens > self.budget
+
+    def _trim(self) -> None:
+        if not self._over():
+            return
+        target = self.budget * (self.low_water if self.summarizer else 1.0)
+        dropped: List[Message] = []
+        # always keep the newest turn
+        while len(self._turns) > 1 and (
+            self._over() or self._summary_tokens + self._turn_tokens > target
+        ):
+            msg, n = self._turns.popleft()
+            self._turn_tokens -= n
+            dropped.append(msg)
+        self.trimmed += len(dropped)
+        if dropped and self.summarizer is not None:
+            self._set_summary(self.summarizer(self.summary, dropped))
+            self.summaries += 1
+
+    def _set_summary(self, summary: str) -> None:
+        self.summary = summary.strip()
+        if self.summary:
+            self._summary_msg = {
+                "role": "system",
+                "content": f"Resumen de la conversación anterior: {self.summary}",
+            }
+            self._summary_tokens = _msg_tokens(self._summary_msg)
+        else:
+            self._summary_msg = None
+            self._summary_tokens = 0
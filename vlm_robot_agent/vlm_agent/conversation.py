@@ -8,16 +8,43 @@
     – ordena al LLM despedirse con la etiqueta adecuada,
     – termina al detectar la etiqueta.
 • NUEVO: imprime la clasificación de cada respuesta y el resultado final.
+• La escucha usa VAD: corta al terminar la frase y el silencio se cuenta
+  con el tiempo realmente escuchado (``vad=False`` = ventana fija).
+• El turno del robot se habla en streaming: cada frase se sintetiza y suena
+  mientras el LLM sigue generando (``stream_speech=False`` = texto completo).
+  ``last_time_to_first_audio`` guarda la latencia hasta el primer audio.
+• ``phrase_cache=True`` activa la caché de audio y pre-sintetiza las frases
+  fijas (clave "phrases" del JSON); ``canned_farewells=True`` usa esas
+  despedidas en vez de pedirlas al LLM, así suenan al instante.
+• ``single_call=True``: una sola llamada por respuesta humana devuelve JSON
+  con intención (positive/negative/neutral), la siguiente frase y la
+  etiqueta de cierre (prompt "structured" del JSON); las despedidas de
+  cierre por límite salen de las frases fijas.
+• ``fast_path=True``: respuestas cortas y obvias ("sí", "vale", "no") se
+  clasifican con reglas, sin LLM.
+• El contexto enviado al LLM vive en un :class:`ConversationContext`: prefijo
+  (system + ejemplos) idéntico byte a byte en cada llamada y turnos recortados
+  a ``context_budget`` tokens (``summarize=True`` resume los recortados).
+• Llamadas al LLM, turnos y escucha se miden con spans de ``telemetry``
+  (``conversation.*``) y se cuentan los tokens de cada respuesta.
+• Cada llamada pasa por ``resilience`` (reintentos con Retry-After, plazo
+  ``retry.budget`` y circuito compartido con la percepción).  Si el LLM no
+  responde, el turno no se cae: el robot dice una frase fija ("common"),
+  la clasificación queda neutral y las despedidas salen de las fijas.
 """
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Dict
-import os, json, time, re, unicodedata
+from typing import Iterator, List, Dict
+import os, json, random, time, re, unicodedata
 from importlib import resources
 
-from openai import OpenAI
+from vlm_robot_agent.vlm_agent.context import ConversationContext
 from vlm_robot_agent.vlm_agent.io import speech_io
+from vlm_robot_agent.vlm_inference import telemetry
+from vlm_robot_agent.vlm_inference.backends import usage_dict
+from vlm_robot_agent.vlm_inference.clients import shared_openai_client
+from vlm_robot_agent.vlm_inference.resilience import ResilientCaller, RetryPolicy
 
 PROMPT_FILE = "conversation_prompts.json"
 TAG_RE = re.compile(r"#HUMANO_(?:DESPEJO_PASO|RECHAZO|SIN_RESPUESTA)", re.I)
@@ -37,16 +64,79 @@ def _load_prompt(key: str) -> Dict[str, str]:
     return {"system": e.get("system", ""), "examples": e.get("examples", [])}
 
 
+def _load_phrases() -> Dict:
+    with resources.files("vlm_robot_agent.prompts").joinpath(PROMPT_FILE).open(
+        "r", encoding="utf-8"
+    ) as f:
+        return json.load(f).get("phrases") or {}
+
+
 def _clean(t: str) -> str:
     return t.replace("¿", "").replace("¡", "")
 
 
+_POSITIVE = {
+    "si", "vale", "claro", "ok", "okay", "venga", "adelante", "perfecto", "bueno",
+    "de acuerdo", "por supuesto", "sin problema", "claro que si", "si claro", "vale vale",
+    "si si", "pasa", "pase", "ya me muevo", "ya me aparto", "me aparto", "me muevo",
+}
+_NEGATIVE = {
+    "no", "no no", "nope", "ni hablar", "para nada", "de ninguna manera", "nunca",
+    "no puedo", "no quiero", "ahora no", "que no", "no me muevo", "no me voy a mover",
+}
+
+
+def fast_classify(text: str, *, max_words: int = 5) -> str | None:
+    """Clasificación por reglas de respuestas cortas y obvias.
+
+    Devuelve "positive" / "negative", o ``None`` si hace falta el LLM.
+    """
+    t = unicodedata.normalize("NFKD", text.lower())
+    t = "".join(c for c in t if not unicodedata.combining(c))
+    t = re.sub(r"[^\w\s]", " ", t)
+    words = t.split()
+    if not words or len(words) > max_words:
+        return None
+    phrase = " ".join(words)
+    if phrase in _POSITIVE:
+        return "positive"
+    if phrase in _NEGATIVE:
+        return "negative"
+    return None
+
+
 @dataclass
 class Turn:
     role: str
     text: str
 
 
+@dataclass
+class StructuredReply:
+    intent: str      # positive | negative | neutral
+    utterance: str
+    tag: str | None  # POS_TAG o None
+
+
+def parse_structured(raw: str) -> StructuredReply:
+    """Parser local de la respuesta del modo ``single_call``.
+
+    Tolera JSON con fences; si no es JSON, el texto se toma como frase neutra.
+    """
+    clean = raw.strip()
+    if clean.startswith("```"):
+        clean = clean.split("```", 2)[1].removeprefix("json").strip()
+    try:
+        data = json.loads(clean)
+    except json.JSONDecodeError:
+        return StructuredReply("neutral", raw.strip(), None)
+    intent = str(data.get("intent", "neutral")).lower()
+    intent = next((i for i in ("positive", "negative") if intent.startswith(i[:3])), "neutral")
+    tag = data.get("tag")
+    tag = tag if tag in (POS_TAG, NEG_TAG, SIL_TAG) else None
+    return StructuredReply(intent, str(data.get("utterance", "")).strip(), tag)
+
+
 # ---------- manager ------------------------------------------------
 class ConversationManager:
     def __init__(
@@ -60,6 +150,15 @@ class ConversationManager:
         max_negative=5,
         max_elapsed_neg=40,
         openai_api_key: str | None = None,
+        vad: bool = True,
+        stream_speech: bool = True,
+        phrase_cache: bool = False,
+        canned_farewells: bool = False,
+        single_call: bool = False,
+        fast_path: bool = True,
+        context_budget: int = 1500,
+        summarize: bool = False,
+        retry: RetryPolicy | bool = True,
     ):
         self.goal = goal
         self.model = model
@@ -67,8 +166,18 @@ class ConversationManager:
         self.silence_limit = silence_limit
         self.max_negative = max_negative
         self.max_elapsed_neg = max_elapsed_neg
-
-        self.silence_elapsed = 0
+        self.vad = vad
+        self.stream_speech = stream_speech
+        self.last_time_to_first_audio: float | None = None
+        self.canned_farewells = canned_farewells
+        self.single_call = single_call
+        self.fast_path = fast_path
+        self.llm_calls = 0
+        self._phrases = _load_phrases()
+        self._next_utterance: str | None = None  # modo single_call
+
+        self.silence_elapsed = 0.0
+        self.last_listen_elapsed = 0.0
         self.negatives = 0
         self.neg_start: float | None = None
         self.greeted = False
@@ -77,22 +186,52 @@ class ConversationManager:
         prm = _load_prompt(prompt_key)
         self._system_tpl = prm["system"]
         self._examples = prm["examples"]
+        self._structured_system = _load_prompt("structured")["system"]
 
         self.history: List[Turn] = []
-        self.client = OpenAI(api_key=openai_api_key or os.getenv("OPENAI_API_KEY"))
+        self.context = ConversationContext(
+            [{"role": "system", "content": self._system_prompt()}, *self._examples],
+            budget=context_budget,
+            max_turns=max_history,
+            summarizer=self._summarize if summarize else None,
+        )
+        # same pooled keep-alive client as the perception engine
+        self.client = shared_openai_client(openai_api_key or os.getenv("OPENAI_API_KEY"))
+        # plazo corto: una persona espera la respuesta
+        policy = retry if isinstance(retry, RetryPolicy) else RetryPolicy(budget=6.0)
+        self.resilience = ResilientCaller(policy, endpoint="openai") if retry is not False else None
+
+        if phrase_cache:
+            if speech_io.PHRASE_CACHE is None:
+                speech_io.enable_phrase_cache()
+            speech_io.prewarm_phrases(goal=goal)
 
     # ----- prompt builders --------------
     def _system_prompt(self) -> str:
         return self._system_tpl.format(goal=self.goal)
 
     def _msgs(self) -> List[Dict[str, str]]:
-        msgs = [{"role": "system", "content": self._system_prompt()}]
-        msgs.extend(self._examples)
-        msgs.extend(
-            {"role": "assistant" if t.role == "robot" else "user", "content": t.text}
-            for t in self.history[-self.max_history :]
+        return self.context.messages()
+
+    def _add_turn(self, role: str, text: str) -> None:
+        self.history.append(Turn(role, text))
+        self.context.append("assistant" if role == "robot" else "user", text)
+
+    def _summarize(self, previous: str, dropped: List[Dict[str, str]]) -> str:
+        """Resumen rodante de los turnos que salen del presupuesto."""
+        lines = "\n".join(f"{m['role']}: {m['content']}" for m in dropped)
+        return self._ask_llm(
+            [
+                {
+                    "role": "system",
+                    "content": "Resume en 2-3 frases la negociación, conservando "
+                    "motivos de la persona y lo ya ofrecido por el robot.",
+                },
+                {"role": "user", "content": f"Resumen previo: {previous or '(ninguno)'}\n{lines}"},
+            ],
+            max_tokens=80,
+            fallback=previous,
         )
-        return msgs
 
     # ----- IO ---------------------------
     def _speak(self, txt: str):
@@ -102,31 +241,124 @@ class ConversationManager:
     # ----- greeting ---------------------
     def greet(self):
         if not self.greeted:
-            self._speak(
-                f"Hola, soy Tiago, el robot asistente del edificio. Mi misión es {self.goal}."
+            tpl = self._phrases.get(
+                "greeting", "Hola, soy Tiago, el robot asistente del edificio. Mi misión es {goal}."
             )
+            self._speak(tpl.format(goal=self.goal))
             self.greeted = True
 
     # ----- generic LLM call -------------
-    def _ask_llm(self, messages: List[Dict[str, str]], max_tokens=60) -> str:
-        r = self.client.chat.completions.create(
-            model=self.model, messages=messages, max_tokens=max_tokens
+    def _create(self, **kwargs):
+        """``chat.completions.create`` con reintentos y circuito (ver ``resilience``)."""
+        if self.resilience is None:
+            return self.client.chat.completions.create(model=self.model, **kwargs)
+        return self.resilience.call(
+            lambda timeout: self.client.chat.completions.create(model=self.model, timeout=timeout, **kwargs)
         )
+
+    def _unavailable(self, exc: Exception) -> None:
+        print(f"[LLM no disponible] {type(exc).__name__}: {exc}")
+        telemetry.count("conversation.fallbacks", error=type(exc).__name__)
+
+    def _fallback_phrase(self) -> str:
+        """Petición fija para seguir la charla sin LLM (las frases con pregunta)."""
+        common = self._phrases.get("common") or []
+        return random.choice([p for p in common if "?" in p] or ["Disculpa, ¿me dejas pasar?"])
+
+    def _ask_llm(self, messages: List[Dict[str, str]], max_tokens=60, fallback: str | None = None) -> str:
+        """Texto de la respuesta; con ``fallback`` un fallo del LLM lo devuelve en vez de lanzar."""
+        self.llm_calls += 1
+        try:
+            with telemetry.span("conversation.llm", call="text"):
+                r = self._create(messages=messages, max_tokens=max_tokens)
+        except Exception as exc:
+            if fallback is None:
+                raise
+            self._unavailable(exc)
+            return fallback
+        telemetry.record_usage(usage_dict(getattr(r, "usage", None)), source="conversation")
         return r.choices[0].message.content.strip()
 
+    def _ask_llm_stream(self, messages: List[Dict[str, str]], max_tokens=60) -> Iterator[str]:
+        self.llm_calls += 1
+        # generador: se mide a mano (un span no puede cruzar hilos)
+        t0 = time.perf_counter()
+        try:
+            stream = self._create(
+                messages=messages,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+        except Exception as exc:
+            self._unavailable(exc)
+            yield self._fallback_phrase()
+            return
+        yielded = False
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    telemetry.record_usage(usage_dict(chunk.usage), source="conversation")
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yielded = True
+                    yield chunk.choices[0].delta.content
+        except Exception as exc:
+            # corte a mitad del stream (reset, timeout): lo ya dicho se queda
+            self._unavailable(exc)
+            if not yielded:
+                yield self._fallback_phrase()
+            return
+        telemetry.record("conversation.llm", time.perf_counter() - t0, call="stream")
+
     # ----- main robot turn --------------
-    def robot_turn(self):
-        txt = self._ask_llm(self._msgs())
-        self.history.append(Turn("robot", txt))
-        self._speak(txt)
+    def robot_turn(self, stream: bool | None = None):
+        with telemetry.span("conversation.robot_turn"):
+            txt = self._robot_turn(stream)
+        if self.last_time_to_first_audio is not None:
+            telemetry.observe("conversation.time_to_first_audio", self.last_time_to_first_audio)
+        return txt
+
+    def _robot_turn(self, stream: bool | None = None):
+        # el stream se crea antes de pedir al LLM: la métrica incluye la generación
+        if stream if stream is not None else self.stream_speech:
+            out = speech_io.speak_stream(self._ask_llm_stream(self._msgs()))
+            txt = out.text.strip()
+            self.last_time_to_first_audio = out.time_to_first_audio
+        else:
+            t0 = time.perf_counter()
+            txt = self._ask_llm(self._msgs(), fallback=self._fallback_phrase())
+            wav, rate = speech_io.synthesize(_clean(txt))
+            self.last_time_to_first_audio = time.perf_counter() - t0
+            speech_io.play(wav, rate)
+        print(f"[Robot] {txt}  (primer audio {self.last_time_to_first_audio or 0:.2f}s)")
+        self._add_turn("robot", txt)
         return txt
 
+    def _ask_structured(self) -> StructuredReply:
+        """Una llamada: intención de la última respuesta + siguiente frase."""
+        msgs = self.context.messages(extra=[{"role": "system", "content": self._structured_system}])
+        self.llm_calls += 1
+        try:
+            with telemetry.span("conversation.llm", call="structured"):
+                r = self._create(messages=msgs, max_tokens=120, response_format={"type": "json_object"})
+        except Exception as exc:
+            self._unavailable(exc)
+            return StructuredReply("neutral", self._fallback_phrase(), None)
+        telemetry.record_usage(usage_dict(getattr(r, "usage", None)), source="conversation")
+        return parse_structured(r.choices[0].message.content)
+
     # ----- listen -----------------------
     def listen(self, secs=5) -> str | None:
-        txt = speech_io.listen(seconds=secs) or ""
+        with telemetry.span("conversation.listen", vad=bool(self.vad)):
+            if self.vad:
+                heard = speech_io.listen_streaming(max_seconds=secs)
+                txt, self.last_listen_elapsed = heard.text or "", heard.elapsed
+            else:
+                txt = speech_io.listen(seconds=secs) or ""
+                self.last_listen_elapsed = float(secs)
         if txt:
             txt = txt.strip()
-            self.history.append(Turn("human", txt))
+            self._add_turn("human", txt)
             print(f"[Humano] {txt}")
             return txt
         print("[Humano] (silencio)")
@@ -146,11 +378,18 @@ class ConversationManager:
                 {"role": "user", "content": human},
             ],
             max_tokens=1,
+            fallback="neutral",
         )
         return cls.lower().strip()
 
     # ----- despedida via LLM ------------
     def _farewell_with_tag(self, tag: str):
+        canned = (self._phrases.get("farewell") or {}).get(tag)
+        if (self.canned_farewells or self.single_call) and canned:
+            txt = random.choice(canned)
+            speech_io.speak(_clean(txt))       # frase fija: sale de la caché
+            print(f"[Robot] {txt} {tag}")
+            return
         txt = self._ask_llm(
             [
                 {
@@ -160,6 +399,7 @@ class ConversationManager:
                 }
             ],
             max_tokens=30,
+            fallback=random.choice(canned) if canned else "",
         )
         if tag.lower() not in txt.lower():
             txt += f" {tag}"
@@ -167,6 +407,8 @@ class ConversationManager:
 
     # ----- main loop --------------------
     def interactive_turn(self, listen_secs=5) -> bool:
+        if self.single_call:
+            return self._single_call_turn(listen_secs)
 
         if not self.greeted:
             self.greet()
@@ -181,8 +423,12 @@ class ConversationManager:
         human = self.listen(listen_secs)
 
         if human:
-            cls = self._classify(human)
-            print(f"[Clasificación LLM] → {cls}")  # <-- nuevo print
+            cls = fast_classify(human) if self.fast_path else None
+            if cls is not None:
+                print(f"[Clasificación reglas] → {cls}")
+            else:
+                cls = self._classify(human)
+                print(f"[Clasificación LLM] → {cls}")  # <-- nuevo print
             if cls.startswith("pos"):
                 self.final_result = POS_TAG
                 self._farewell_with_tag(POS_TAG)
@@ -202,8 +448,8 @@ class ConversationManager:
             self.silence_elapsed = 0
             return True
 
-        # silencio
-        self.silence_elapsed += listen_secs
+        # silencio (tiempo real: con VAD se corta antes de ``listen_secs``)
+        self.silence_elapsed += self.last_listen_elapsed
         if self.silence_elapsed >= self.silence_limit:
             self.final_result = SIL_TAG
             self._farewell_with_tag(SIL_TAG)
@@ -218,6 +464,63 @@ class ConversationManager:
 
         return True
 
+    def _finish(self, tag: str) -> bool:
+        self.final_result = tag
+        self._farewell_with_tag(tag)
+        print(f"--> Resultado final: {self.final_result}")
+        return False
+
+    def _single_call_turn(self, listen_secs=5) -> bool:
+        """Como :meth:`interactive_turn`, con una llamada por respuesta humana."""
+        if not self.greeted:
+            self.greet()
+
+        if self._next_utterance is None:  # apertura: aún no hay respuesta
+            self._next_utterance = self._ask_structured().utterance
+        txt, self._next_utterance = self._next_utterance, None
+        self._add_turn("robot", txt)
+        self._speak(txt)
+
+        human = self.listen(listen_secs)
+        if not human:
+            self.silence_elapsed += self.last_listen_elapsed
+            if self.silence_elapsed >= self.silence_limit:
+                return self._finish(SIL_TAG)
+            if self.neg_start and time.time() - self.neg_start >= self.max_elapsed_neg:
+                return self._finish(NEG_TAG)
+            return True
+        self.silence_elapsed = 0
+
+        fast = fast_classify(human) if self.fast_path else None
+        if fast == "positive":
+            print("[Clasificación reglas] → positive")
+            return self._finish(POS_TAG)
+
+        reply = None
+        if fast is None:
+            reply = self._ask_structured()
+            print(f"[Clasificación LLM] → {reply.intent}")
+            if reply.intent == "positive" or reply.tag == POS_TAG:
+                if not reply.utterance:  # sin despedida: la normal, no la etiqueta en voz alta
+                    return self._finish(POS_TAG)
+                self.final_result = POS_TAG
+                self._speak(reply.utterance)
+                print(f"--> Resultado final: {self.final_result}")
+                return False
+        else:
+            print(f"[Clasificación reglas] → {fast}")
+
+        if fast == "negative" or (reply is not None and reply.intent == "negative"):
+            self.negatives += 1
+            if self.negatives == 1:
+                self.neg_start = time.time()
+            if self.negatives >= self.max_negative:
+                return self._finish(NEG_TAG)
+
+        # la siguiente frase ya viene en ``reply``; si hubo atajo, se pide ahora
+        self._next_utterance = reply.utterance if reply is not None else None
+        return True
+
     # ----- dump -------------------------
     def dump(self) -> str:
         return "\n".join(f"{t.role}: {t.text}" for t in self.history)
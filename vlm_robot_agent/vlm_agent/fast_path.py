@@ -0,0 +1,237 @@
+"""
+vlm_robot_agent/vlm_agent/fast_path.py
+======================================
+Local (CPU) gate in front of :meth:`Perception.perceive`.
+
+In a clear corridor almost every tick returns the same answer: "forward".
+**SceneGate** uses cheap signals to decide whether the VLM must be asked or
+the last navigation decision can simply be repeated:
+
+    • scene change : mean difference (global brightness removed) between a
+                     grey thumbnail of the frame and that of the last keyframe,
+    • free floor   : edge density in the lower‑middle third,
+    • people       : OpenCV's HOG detector (or any ``detector``, e.g. a
+                     small ONNX model).
+
+The VLM is called when there is no keyframe, when the last observation was
+not "clear" (status other than OK, a person or the goal in sight), every
+``keyframe_interval`` ticks or ``max_age`` seconds, when the scene changed
+or when a person is detected.  With a free floor more change is tolerated
+(the robot moves forward and the corridor "moves"), as long as the detector
+confirms nobody is there.
+
+>>> gate = SceneGate()
+>>> decision = gate.check(frame, channel_order="BGR")
+>>> if decision.call_vlm:
+...     obs = perception.perceive(frame, channel_order="BGR")
+...     gate.keyframe(obs)
+
+``RobotAgent(fast_path=True)`` does this on every navigation tick.
+"""
+
+from __future__ import annotations
+
+import base64
+import io
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from ..vlm_inference import telemetry
+from ..vlm_inference.encoding import EncodedImage
+
+__all__ = ["GateConfig", "SceneSignals", "GateDecision", "SceneGate", "hog_person_detector"]
+
+logger = logging.getLogger("vlm_fast_path")
+
+# grey uint8 (H×W) → number of people detected
+PersonDetector = Callable[[np.ndarray], int]
+
+
+@dataclass
+class GateConfig:
+    width: int = 320                        # working width (detector / floor)
+    thumb_size: Tuple[int, int] = (32, 24)  # thumbnail for the scene change
+    change_threshold: float = 0.035         # mean change (0‑1) below = "same scene"
+    clear_change_limit: float = 0.10        # change tolerated with a free floor
+    floor_edge_threshold: float = 0.05      # edge fraction below = "free floor"
+    edge_strength: int = 40                 # grey step that counts as an edge
+    keyframe_interval: int = 6              # max. consecutive reused ticks
+    max_age: float = 4.0                    # s since the last VLM call
+    detect_people: bool = True
+
+
+@dataclass
+class SceneSignals:
+    change: float       # difference from the keyframe (0‑1); 1.0 without keyframe
+    floor_edges: float  # edge fraction in the floor region
+    persons: int        # -1 = detector not run / not available
+
+
+@dataclass
+class GateDecision:
+    call_vlm: bool
+    reason: str         # "reuse", "no_keyframe", "keyframe_interval", "stale", …
+    signals: Optional[SceneSignals] = None
+
+
+def hog_person_detector(*, win_stride: Tuple[int, int] = (8, 8), scale: float = 1.1, min_weight: float = 0.5):
+    """OpenCV's default HOG + SVM people detector (``None`` without cv2)."""
+    try:
+        import cv2  # type: ignore
+    except ImportError:
+        return None
+    hog = cv2.HOGDescriptor()
+    hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(gray: np.ndarray) -> int:
+        _, weights = hog.detectMultiScale(gray, winStride=win_stride, padding=(8, 8), scale=scale)
+        return int(np.sum(np.asarray(weights).ravel() > min_weight))
+
+    return detect
+
+
+def observation_is_clear(obs: Dict[str, Any]) -> bool:
+    """Whether a decision may be reused: status OK, no person and the goal not in sight."""
+    obstacles = " ".join(str(o).lower() for o in obs.get("obstacles", []))
+    return obs.get("status") == "OK" and "person" not in obstacles and not obs.get("goal_observed")
+
+
+class SceneGate:
+    """Decides per tick whether to call the VLM or reuse the last decision."""
+
+    def __init__(self, config: Optional[GateConfig] = None, *, detector: Optional[PersonDetector] = None) -> None:
+        self.config = config or GateConfig()
+        self._detector = detector
+        self._detector_ready = detector is not None
+        self._key: Optional[np.ndarray] = None
+        self._key_time = 0.0
+        self._reused = 0
+        self._clear = False
+        self._gray: Optional[np.ndarray] = None
+        self._thumb: Optional[np.ndarray] = None
+        self.decisions: Counter = Counter()
+
+    # ------------------------------------------------------------------
+    def check(self, img: Any, channel_order: str = "RGB") -> GateDecision:
+        """Measure the frame and decide; every VLM call must be followed by ``keyframe``."""
+        decision = self._decide(img, channel_order)
+        if decision.call_vlm:
+            self._reused = 0
+        else:
+            self._reused += 1
+        self.decisions[decision.reason] += 1
+        telemetry.count("gate.decisions", reason=decision.reason)
+        return decision
+
+    def keyframe(self, observation: Dict[str, Any]) -> None:
+        """Take the last measured frame as the reference after a VLM reply."""
+        self._key = self._thumb
+        self._key_time = time.monotonic()
+        self._clear = observation_is_clear(observation)
+
+    def reset(self) -> None:
+        self._key = None
+        self._reused = 0
+
+    def stats(self) -> Dict[str, float]:
+        total = sum(self.decisions.values())
+        out: Dict[str, float] = dict(self.decisions)
+        out["checks"] = total
+        out["reuse_ratio"] = self.decisions["reuse"] / total if total else 0.0
+        return out
+
+    def measure(self, img: Any, channel_order: str = "RGB", *, detect: bool = True) -> SceneSignals:
+        """Signals of the frame (which is kept as the keyframe candidate)."""
+        gray = self._gray = _to_gray(img, channel_order, self.config.width)
+        small = np.asarray(
+            Image.fromarray(gray).resize(self.config.thumb_size, Image.BILINEAR), dtype=np.float32
+        ) / 255.0
+        small -= small.mean()  # insensitive to global brightness changes
+        self._thumb = small
+        change = float(np.mean(np.abs(small - self._key))) if self._key is not None else 1.0
+        persons = self._count_people(gray) if detect else -1
+        return SceneSignals(change=change, floor_edges=self._floor_edges(gray), persons=persons)
+
+    def count_people(self) -> int:
+        """People in the last measured frame (-1 without detector)."""
+        return self._count_people(self._gray) if self._gray is not None else -1
+
+    # ------------------------------------------------------------------
+    def _decide(self, img: Any, channel_order: str) -> GateDecision:
+        cfg = self.config
+        signals = self.measure(img, channel_order, detect=False)
+        if self._key is None:
+            return GateDecision(True, "no_keyframe", signals)
+        if not self._clear:
+            return GateDecision(True, "last_not_clear", signals)
+        if self._reused >= cfg.keyframe_interval:
+            return GateDecision(True, "keyframe_interval", signals)
+        if time.monotonic() - self._key_time > cfg.max_age:
+            return GateDecision(True, "stale", signals)
+
+        unchanged = signals.change < cfg.change_threshold
+        floor_free = signals.floor_edges < cfg.floor_edge_threshold
+        if not unchanged and not (floor_free and signals.change < cfg.clear_change_limit):
+            return GateDecision(True, "scene_change", signals)
+
+        # the detector only runs when the decision would otherwise be reused
+        signals.persons = self._count_people(self._gray)
+        if signals.persons > 0:
+            return GateDecision(True, "person", signals)
+        if signals.persons < 0 and not unchanged:
+            return GateDecision(True, "scene_change", signals)  # no detector: identical scenes only
+        return GateDecision(False, "reuse", signals)
+
+    def _count_people(self, gray: np.ndarray) -> int:
+        if not self.config.detect_people:
+            return -1
+        if not self._detector_ready:
+            self._detector = hog_person_detector()
+            self._detector_ready = True
+            if self._detector is None:
+                logger.warning("OpenCV not available: fast path runs without person detector")
+        return self._detector(gray) if self._detector is not None else -1
+
+    def _floor_edges(self, gray: np.ndarray) -> float:
+        h, w = gray.shape
+        roi = gray[2 * h // 3 :, w // 3 : 2 * w // 3].astype(np.int16)
+        gx = np.abs(np.diff(roi, axis=1))[:-1, :]
+        gy = np.abs(np.diff(roi, axis=0))[:, :-1]
+        return float(np.mean(np.maximum(gx, gy) > self.config.edge_strength))
+
+
+def _to_gray(img: Any, channel_order: str, width: int) -> np.ndarray:
+    """Grey uint8 image ~``width`` px wide from any input ``infer`` accepts."""
+    if isinstance(img, np.ndarray):
+        step = max(1, -(-img.shape[1] // width))  # ceil: never wider than ``width``
+        arr = img[::step, ::step]
+        if arr.ndim == 3:
+            c = arr[..., :3].astype(np.float32)
+            r, b = (c[..., 2], c[..., 0]) if channel_order.upper() == "BGR" else (c[..., 0], c[..., 2])
+            arr = 0.299 * r + 0.587 * c[..., 1] + 0.114 * b
+        return np.ascontiguousarray(arr, dtype=np.uint8)
+
+    if isinstance(img, EncodedImage):
+        img = base64.b64decode(img.data_url.split(",", 1)[1])
+    opened = True
+    if isinstance(img, (bytes, bytearray, memoryview)):
+        img = Image.open(io.BytesIO(bytes(img)))
+    elif isinstance(img, (str, Path)):
+        img = Image.open(img)
+    elif isinstance(img, Image.Image):
+        opened = False  # the caller's image: never drafted in place
+    else:
+        raise TypeError(f"Unsupported image type: {type(img)}")
+
+    if opened and img.format == "JPEG" and getattr(img, "tile", None):
+        img.draft("L", (width, width))  # decode at 1/2, 1/4 … scale (DCT)
+    if img.width > width:
+        img = img.resize((width, max(1, img.height * width // img.width)), Image.BILINEAR)
+    return np.asarray(img.convert("L"))
@@ -3,30 +3,64 @@ vlm_robot_agent/io/speech_io.py
 ===============================
 • TTS  : Coqui-TTS VITS español (rápido, offline)
 • STT  : Whisper-tiny (offline, sin warning FP16)
+• VAD  : escucha en streaming que corta al terminar la frase (ver vad.py)
+• Voz en streaming: :class:`SpeechStream` sintetiza por frases/cláusulas
+  mientras el LLM sigue generando y las encola en una salida continua.
+• Caché de frases: :func:`enable_phrase_cache` evita re-sintetizar frases
+  repetidas (ver tts_cache.py).
+• Síntesis y transcripción se miden con spans ``speech.*`` (ver telemetry).
+
+Los modelos (y ``sounddevice`` / ``torch``) se cargan de forma perezosa en el
+primer uso, así importar este módulo – y por tanto construir un RobotAgent
+que sólo navega – no paga el arranque de Whisper ni de Coqui.  Para no pagar
+esa latencia en la primera frase, :func:`warm_up` los carga en un hilo de
+fondo al arrancar:
+
+>>> speech_io.warm_up()          # devuelve enseguida
+>>> speech_io.speak("Hola")      # espera a que termine la carga si hace falta
 """
 
 from __future__ import annotations
 from pathlib import Path
-import tempfile, os, warnings
+from typing import Any, Iterable, List, NamedTuple
+import queue, re, threading, time, warnings
 
-import sounddevice as sd
-import soundfile as sf
 import numpy as np
 
+from ...vlm_inference import telemetry
+from .tts_cache import DEFAULT_DIR as TTS_CACHE_DIR, TTSCache, load_phrases
+from .vad import EnergyVAD, RingBuffer
+
 # ------------------ CONFIG RÁPIDA ------------------
 GPU: bool = False          # True si dispones de GPU
 TTS_SPEED: float = 1.3     # 1.0 = normal, >1 = más rápido
+TTS_MODEL: str = "tts_models/es/css10/vits"
+STT_MODEL: str = "tiny"    # ~60 MB CPU
 # ---------------------------------------------------
 
+
+def _sd():
+    import sounddevice as sd  # carga PortAudio: sólo cuando hay audio
+    return sd
+
+
+def _sf():
+    import soundfile as sf
+    return sf
+
+
 # -------------------  T  T  S  ---------------------
-from TTS.api import TTS
-_TTS: TTS | None = None
+_TTS: Any | None = None
+_TTS_LOCK = threading.Lock()
 
 
-def _get_tts() -> TTS:
+def _get_tts():
     global _TTS
     if _TTS is None:
-        _TTS = TTS("tts_models/es/css10/vits", gpu=GPU)
+        with _TTS_LOCK:
+            if _TTS is None:
+                from TTS.api import TTS
+                _TTS = TTS(TTS_MODEL, gpu=GPU)
     return _TTS
 
 
@@ -34,36 +68,230 @@ def _clean(text: str) -> str:
     return text.replace("¿", "").replace("¡", "")
 
 
-def speak(text: str, *, block: bool = True) -> None:
+PHRASE_CACHE: TTSCache | None = None
+
+
+def enable_phrase_cache(directory: str | Path | None = TTS_CACHE_DIR, **kwargs) -> TTSCache:
+    """Activa la caché de audio para :func:`synthesize` (y ``speak``).
+
+    ``directory=None`` deja sólo el nivel en memoria.
+    """
+    global PHRASE_CACHE
+    PHRASE_CACHE = TTSCache(directory, **kwargs)
+    return PHRASE_CACHE
+
+
+def prewarm_phrases(phrases: Iterable[str] | None = None, *, goal: str = "", background: bool = True):
+    """Sintetiza por adelantado las frases fijas (por defecto las de
+    ``conversation_prompts.json``).  Activa la caché si no lo estaba."""
+    cache = PHRASE_CACHE or enable_phrase_cache()
+    todo = list(phrases) if phrases is not None else load_phrases(goal=goal)
+
+    def _run() -> int:
+        try:
+            return cache.prewarm(todo, TTS_MODEL, TTS_SPEED, _synthesize)
+        except Exception as exc:
+            warnings.warn(f"phrase prewarm failed: {exc!r}", RuntimeWarning)
+            return 0
+
+    if not background:
+        return _run()
+    th = threading.Thread(target=_run, name="tts-prewarm", daemon=True)
+    th.start()
+    return th
+
+
+def synthesize(text: str) -> tuple[np.ndarray, int]:
+    """Texto → (muestras float32, frecuencia de muestreo)."""
+    if PHRASE_CACHE is not None:
+        return PHRASE_CACHE.get_or_synthesize(text, TTS_MODEL, TTS_SPEED, _synthesize)
+    return _synthesize(text)
+
+
+def _synthesize(text: str) -> tuple[np.ndarray, int]:
     tts = _get_tts()
-    wav = tts.tts(_clean(text), speed=TTS_SPEED)   # ← aceleramos síntesis
-    sd.play(wav, tts.synthesizer.output_sample_rate)
+    with telemetry.span("speech.synthesize"):
+        wav = tts.tts(_clean(text), speed=TTS_SPEED)   # ← aceleramos síntesis
+    return np.asarray(wav, dtype=np.float32), tts.synthesizer.output_sample_rate
+
+
+def play(wav: np.ndarray, samplerate: int, *, block: bool = True) -> None:
+    sd = _sd()
+    sd.play(wav, samplerate)
     if block:
         sd.wait()
 
 
+def speak(text: str, *, block: bool = True) -> None:
+    play(*synthesize(text), block=block)
+
+
 def tts_to_file(text: str, path: str | Path) -> Path:
-    tts = _get_tts()
-    wav = tts.tts(_clean(text), speed=TTS_SPEED)
+    wav, rate = synthesize(text)
     path = Path(path)
-    sf.write(str(path), wav, tts.synthesizer.output_sample_rate)
+    _sf().write(str(path), wav, rate)
     return path
 
 
+# ---------------  V O Z   E N   S T R E A M I N G  ---------------
+_SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s")
+_CLAUSE_END = re.compile(r"[,;:]\s")
+
+
+class SentenceChunker:
+    """Corta texto que llega por trozos en frases (o cláusulas largas).
+
+    Una frase se emite en cuanto aparece su puntuación final seguida de
+    espacio; una coma / punto y coma corta sólo si el trozo ya tiene
+    ``min_clause`` caracteres, para no sintetizar fragmentos diminutos.
+    """
+
+    def __init__(self, *, min_clause: int = 25) -> None:
+        self.min_clause = min_clause
+        self._buf = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buf += delta
+        out: List[str] = []
+        while True:
+            m = _SENTENCE_END.search(self._buf)
+            if m is None:
+                m = next((c for c in _CLAUSE_END.finditer(self._buf) if c.start() >= self.min_clause), None)
+            if m is None:
+                return out
+            chunk, self._buf = self._buf[: m.end()].strip(), self._buf[m.end():]
+            if chunk:
+                out.append(chunk)
+
+    def flush(self) -> List[str]:
+        chunk, self._buf = self._buf.strip(), ""
+        return [chunk] if chunk else []
+
+
+class SpeechStream:
+    """Texto por trozos → síntesis en un hilo → audio continuo en otro.
+
+    >>> with SpeechStream() as out:
+    ...     for delta in llm_stream:
+    ...         out.feed(delta)
+    >>> out.time_to_first_audio     # s desde la creación hasta el primer audio
+
+    ``close()`` (o salir del ``with``) sintetiza el resto y, con
+    ``block=True``, espera a que termine de sonar.
+    """
+
+    _DONE = object()
+
+    def __init__(self, *, block: bool = True, min_clause: int = 25) -> None:
+        self.block = block
+        self.chunker = SentenceChunker(min_clause=min_clause)
+        self.text = ""
+        self.time_to_first_audio: float | None = None
+        self._t0 = time.perf_counter()
+        self._texts: "queue.Queue[Any]" = queue.Queue()
+        self._audio: "queue.Queue[Any]" = queue.Queue()
+        self.error: BaseException | None = None
+        self._synth_thread = threading.Thread(target=self._synth_loop, name="tts-synth", daemon=True)
+        self._play_thread = threading.Thread(target=self._play_loop, name="tts-play", daemon=True)
+        self._synth_thread.start()
+        self._play_thread.start()
+
+    def feed(self, delta: str) -> None:
+        self.text += delta
+        for chunk in self.chunker.feed(delta):
+            self._texts.put(chunk)
+
+    def close(self) -> None:
+        for chunk in self.chunker.flush():
+            self._texts.put(chunk)
+        self._texts.put(self._DONE)
+        if self.block:
+            self.wait()
+
+    def wait(self) -> None:
+        self._synth_thread.join()
+        self._play_thread.join()
+
+    def __enter__(self) -> "SpeechStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    def _synth_loop(self) -> None:
+        try:
+            while (item := self._texts.get()) is not self._DONE:
+                self._audio.put(synthesize(item))
+        except Exception as exc:
+            self.error = exc
+            warnings.warn(f"streamed TTS failed: {exc!r}", RuntimeWarning)
+        finally:
+            self._audio.put(self._DONE)
+
+    def _play_loop(self) -> None:
+        out = None
+        try:
+            while (item := self._audio.get()) is not self._DONE:
+                wav, rate = item
+                if out is None:
+                    out = _sd().OutputStream(samplerate=rate, channels=1, dtype="float32")
+                    out.start()
+                if self.time_to_first_audio is None:
+                    self.time_to_first_audio = time.perf_counter() - self._t0
+                out.write(wav.reshape(-1, 1))
+        except Exception as exc:
+            self.error = exc
+            warnings.warn(f"audio output failed: {exc!r}", RuntimeWarning)
+        finally:
+            if out is not None:
+                out.stop()
+                out.close()
+
+
+def speak_stream(deltas: Iterable[str], *, block: bool = True) -> SpeechStream:
+    """Habla un texto que llega por trozos (p. ej. un stream del LLM)."""
+    stream = SpeechStream(block=block)
+    try:
+        for delta in deltas:
+            stream.feed(delta)
+    finally:
+        stream.close()  # si ``deltas`` falla, los hilos de síntesis/audio terminan igual
+    return stream
+
+
 # -------------------  S  T  T  ---------------------
-import whisper
-warnings.filterwarnings(
-    "ignore",
-    message="FP16 is not supported on CPU; using FP32 instead",
-    category=UserWarning,
-)
+_STT: Any | None = None
+_STT_LOCK = threading.Lock()
+
+
+def _get_stt():
+    global _STT
+    if _STT is None:
+        with _STT_LOCK:
+            if _STT is None:
+                import torch
+                import whisper
+                warnings.filterwarnings(
+                    "ignore",
+                    message="FP16 is not supported on CPU; using FP32 instead",
+                    category=UserWarning,
+                )
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                _STT = whisper.load_model(STT_MODEL, device=device)
+    return _STT
 
-  
-device = "cuda" if torch.cuda.is_available() else "cpu"
-_STT = whisper.load_model("tiny", device=device) # ~60 MB CPU
 
 def transcribe_file(path: str | Path) -> str:
-    return _STT.transcribe(str(path), language="es", fp16=False)["text"].strip()
+    return _get_stt().transcribe(str(path), language="es", fp16=False)["text"].strip()
+
+
+def transcribe(audio: np.ndarray) -> str:
+    """Transcribe muestras float32 mono a 16 kHz sin pasar por disco."""
+    audio = np.ascontiguousarray(audio, dtype=np.float32).ravel()
+    stt = _get_stt()
+    with telemetry.span("speech.transcribe"):
+        return stt.transcribe(audio, language="es", fp16=False)["text"].strip()
 
 
 def listen(
@@ -72,13 +300,104 @@ def listen(
     samplerate: int = 16_000,
     channels: int = 1,
 ) -> str | None:
+    """Graba una ventana fija de ``seconds``; ver :func:`listen_streaming`."""
+    sd = _sd()
     audio = sd.rec(int(seconds * samplerate), samplerate, channels, dtype="float32")
     sd.wait()
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        sf.write(tmp.name, audio, samplerate)
-        text = transcribe_file(tmp.name)
-    os.unlink(tmp.name)
-    return text or None
+    return transcribe(audio[:, 0]) or None
+
+
+class Utterance(NamedTuple):
+    text: str | None   # None = silencio
+    elapsed: float     # segundos realmente escuchados
+
+
+def listen_streaming(
+    max_seconds: float = 5.0,
+    *,
+    samplerate: int = 16_000,
+    no_speech_timeout: float = 2.5,
+    vad: EnergyVAD | None = None,
+) -> Utterance:
+    """Escucha hasta que el VAD detecta fin de frase (o ``max_seconds``).
+
+    El callback de ``sd.InputStream`` escribe en un :class:`RingBuffer` y el
+    hilo llamante pasa los bloques al VAD.  Si en ``no_speech_timeout``
+    segundos no empieza ninguna frase se devuelve silencio sin esperar al
+    máximo.  El audio va directo a Whisper como ndarray (Whisper espera
+    16 kHz).
+    """
+    sd = _sd()
+    vad = vad or EnergyVAD(samplerate)
+    vad.reset()
+    ring = RingBuffer(int(max_seconds * samplerate))
+    blocks: "queue.Queue[np.ndarray]" = queue.Queue()
+
+    def _callback(indata, frames, time_info, status) -> None:
+        mono = indata[:, 0]
+        ring.write(mono)
+        blocks.put(mono.copy())
+
+    t0 = time.monotonic()
+    with sd.InputStream(
+        samplerate=samplerate,
+        channels=1,
+        dtype="float32",
+        blocksize=vad.frame_len,
+        callback=_callback,
+    ):
+        while True:
+            elapsed = time.monotonic() - t0
+            if elapsed >= max_seconds:
+                break
+            if not vad.started and elapsed >= no_speech_timeout:
+                break
+            try:
+                block = blocks.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if vad.push(block):
+                break
+    elapsed = time.monotonic() - t0
+
+    if not vad.started:
+        return Utterance(None, elapsed)
+    return Utterance(transcribe(ring.read()) or None, elapsed)
+
+
+# -------------------  W A R M - U P  ---------------
+_WARM: threading.Thread | None = None
+
+
+def warm_up(*, tts: bool = True, stt: bool = True, background: bool = True) -> threading.Thread | None:
+    """Carga TTS / STT ya (en un hilo daemon si ``background``).
+
+    Es idempotente: mientras carga, otra llamada devuelve el mismo hilo.  Los errores
+    de carga sólo se registran; el primer uso real los volverá a lanzar.
+    """
+    global _WARM
+
+    def _load() -> None:
+        # TTS primero: el saludo habla antes de escuchar
+        for wanted, loader in ((tts, _get_tts), (stt, _get_stt)):
+            if not wanted:
+                continue
+            try:
+                loader()
+            except Exception as exc:  # p. ej. paquete no instalado
+                warnings.warn(f"speech warm-up failed: {exc!r}", RuntimeWarning)
+
+    if not background:
+        _load()
+        return None
+    if _WARM is None or not _WARM.is_alive():
+        _WARM = threading.Thread(target=_load, name="speech-warm-up", daemon=True)
+        _WARM.start()
+    return _WARM
+
+
+def is_warm() -> bool:
+    return _TTS is not None and _STT is not None
 
 
 # -------------------  D E M O  ---------------------
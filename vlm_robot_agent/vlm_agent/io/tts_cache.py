@@ -0,0 +1,241 @@
+"""
+vlm_robot_agent/io/tts_cache.py
+===============================
+Caché de audio sintetizado, direccionada por contenido.
+
+El robot repite las mismas frases todo el día (saludo, despedidas, "¿me
+deja pasar?").  **TTSCache** guarda el audio bajo una clave
+``blake2b(texto normalizado | modelo de voz | velocidad)`` en dos niveles:
+
+    • memoria : LRU limitada por bytes (``max_memory_bytes``),
+    • disco   : un FLAC 16‑bit por frase en ``directory``, con desalojo del
+                menos usado recientemente al superar ``max_disk_bytes``.
+
+>>> cache = TTSCache("~/.cache/vlm_robot_agent/tts")
+>>> wav, rate = cache.get_or_synthesize("Hola", "tts_models/es/css10/vits", 1.3, synth)
+>>> cache.prewarm(load_phrases(goal="la oficina 12"), "tts_models/es/css10/vits", 1.3, synth)
+
+``speech_io.enable_phrase_cache()`` la engancha a ``speak`` / ``synthesize``.
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from importlib import resources
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import hashlib, json, os, re, threading, unicodedata
+
+import numpy as np
+
+__all__ = ["TTSCache", "normalize_text", "load_phrases"]
+
+Audio = Tuple[np.ndarray, int]
+PROMPT_FILE = "conversation_prompts.json"
+DEFAULT_DIR = Path.home() / ".cache" / "vlm_robot_agent" / "tts"
+
+
+def normalize_text(text: str) -> str:
+    """NFC, sin ¿¡, espacios colapsados y minúsculas."""
+    text = unicodedata.normalize("NFC", text).replace("¿", "").replace("¡", "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def load_phrases(*, goal: str = "", prompt_file: str = PROMPT_FILE) -> List[str]:
+    """Frases fijas de la clave ``"phrases"`` del JSON de conversación.
+
+    Aplana saludo, despedidas por etiqueta y frases comunes; ``{goal}`` se
+    sustituye por ``goal``.
+    """
+    with resources.files("vlm_robot_agent.prompts").joinpath(prompt_file).open(
+        "r", encoding="utf-8"
+    ) as f:
+        data = json.load(f).get("phrases") or {}
+
+    out: List[str] = []
+
+    def _walk(node) -> None:
+        if isinstance(node, str):
+            out.append(node.format(goal=goal))
+        elif isinstance(node, dict):
+            for v in node.values():
+                _walk(v)
+        elif isinstance(node, list):
+            for v in node:
+                _walk(v)
+
+    _walk(data)
+    return out
+
+
+class TTSCache:
+    """LRU en memoria + FLAC en disco, ambos limitados por tamaño."""
+
+    def __init__(
+        self,
+        directory: str | Path | None = DEFAULT_DIR,
+        *,
+        max_memory_bytes: int = 32 * 1024 * 1024,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self.directory = Path(directory).expanduser() if directory is not None else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._mem: "OrderedDict[str, Audio]" = OrderedDict()
+        self._mem_bytes = 0
+        self._disk: Dict[str, int] = {}
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for p in self.directory.glob("*.flac"):
+                size = p.stat().st_size
+                self._disk[p.stem] = size
+                self._disk_bytes += size
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def key(text: str, model: str, speed: float) -> str:
+        raw = f"{normalize_text(text)}|{model}|{speed:.3f}".encode()
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def get(self, text: str, model: str, speed: float) -> Optional[Audio]:
+        k = self.key(text, model, speed)
+        with self._lock:
+            hit = self._mem.get(k)
+            if hit is not None:
+                self._mem.move_to_end(k)
+                self.memory_hits += 1
+                return hit
+            on_disk = k in self._disk
+        if on_disk:
+            audio = self._read(k)
+            if audio is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(k, audio)
+                return audio
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text: str, model: str, speed: float, wav: np.ndarray, rate: int) -> None:
+        k = self.key(text, model, speed)
+        audio = (np.asarray(wav, dtype=np.float32), int(rate))
+        with self._lock:
+            self._remember(k, audio)
+        self._write(k, audio)
+
+    def get_or_synthesize(
+        self, text: str, model: str, speed: float, synth: Callable[[str], Audio]
+    ) -> Audio:
+        audio = self.get(text, model, speed)
+        if audio is None:
+            audio = synth(text)
+            self.put(text, model, speed, *audio)
+        return audio
+
+    def prewarm(
+        self, phrases: Iterable[str], model: str, speed: float, synth: Callable[[str], Audio]
+    ) -> int:
+        """Sintetiza las frases que falten; devuelve cuántas se sintetizaron."""
+        done = 0
+        for phrase in phrases:
+            k = self.key(phrase, model, speed)
+            if k in self._mem or k in self._disk:
+                continue
+            self.put(phrase, model, speed, *synth(phrase))
+            done += 1
+        return done
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            self._mem_bytes = 0
+            for k in list(self._disk):
+                self._unlink(k)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "memory_entries": len(self._mem),
+            "memory_bytes": self._mem_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    # ------------------------------------------------------------------
+    def _remember(self, k: str, audio: Audio) -> None:
+        """Inserta en la LRU de memoria (con el lock tomado)."""
+        if k in self._mem:
+            self._mem_bytes -= self._mem.pop(k)[0].nbytes
+        self._mem[k] = audio
+        self._mem_bytes += audio[0].nbytes
+        while self._mem_bytes > self.max_memory_bytes and len(self._mem) > 1:
+            _, (old, _) = self._mem.popitem(last=False)
+            self._mem_bytes -= old.nbytes
+            self.evictions += 1
+
+    def _path(self, k: str) -> Path:
+        return self.directory / f"{k}.flac"  # type: ignore[operator]
+
+    def _read(self, k: str) -> Optional[Audio]:
+        import soundfile as sf
+        path = self._path(k)
+        try:
+            wav, rate = sf.read(str(path), dtype="float32")
+            os.utime(path)  # mtime = último uso, para el desalojo
+        except (OSError, RuntimeError):
+            with self._lock:
+                self._forget(k)
+            return None
+        return wav, rate
+
+    def _write(self, k: str, audio: Audio) -> None:
+        if self.directory is None:
+            return
+        import soundfile as sf
+        path = self._path(k)
+        tmp = path.with_suffix(".tmp")
+        sf.write(str(tmp), np.clip(audio[0], -1.0, 1.0), audio[1], format="FLAC", subtype="PCM_16")
+        os.replace(tmp, path)
+        size = path.stat().st_size
+        with self._lock:
+            self._disk_bytes += size - self._disk.get(k, 0)
+            self._disk[k] = size
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+
+        def _mtime(k: str) -> float:
+            try:
+                return self._path(k).stat().st_mtime
+            except OSError:
+                return 0.0
+
+        for k in sorted(self._disk, key=_mtime):
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            self._unlink(k)
+            self.evictions += 1
+
+    def _unlink(self, k: str) -> None:
+        try:
+            self._path(k).unlink()
+        except OSError:
+            pass
+        self._forget(k)
+
+    def _forget(self, k: str) -> None:
+        self._disk_bytes -= self._disk.pop(k, 0)
@@ -0,0 +1,122 @@
+"""
+vlm_robot_agent/io/vad.py
+=========================
+• RingBuffer : búfer circular float32 para el callback de ``sd.InputStream``
+• EnergyVAD  : detector de voz por energía (dBFS) con suelo de ruido adaptativo
+
+El VAD se alimenta con bloques de cualquier tamaño; internamente trabaja en
+tramas de ``frame_ms``.  Marca ``started`` tras ``min_speech_ms`` de voz
+continua y ``ended`` cuando, ya iniciada la frase, lleva ``hangover_ms`` en
+silencio – eso es el fin de la intervención.
+
+>>> vad = EnergyVAD(16_000)
+>>> vad.push(block)      # bloques float32 mono
+>>> vad.started, vad.ended
+"""
+
+from __future__ import annotations
+import threading
+
+import numpy as np
+
+__all__ = ["RingBuffer", "EnergyVAD"]
+
+
+class RingBuffer:
+    """Búfer circular de muestras; conserva los últimos ``capacity`` valores."""
+
+    def __init__(self, capacity: int) -> None:
+        self._buf = np.zeros(capacity, dtype=np.float32)
+        self._pos = 0
+        self._full = False
+        self._lock = threading.Lock()
+
+    def write(self, samples: np.ndarray) -> None:
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        n = len(self._buf)
+        if len(samples) >= n:
+            samples = samples[-n:]
+        with self._lock:
+            end = self._pos + len(samples)
+            if end <= n:
+                self._buf[self._pos:end] = samples
+            else:
+                first = n - self._pos
+                self._buf[self._pos:] = samples[:first]
+                self._buf[: end - n] = samples[first:]
+            self._full = self._full or end >= n
+            self._pos = end % n
+
+    def read(self) -> np.ndarray:
+        """Copia contigua de lo almacenado, de más antiguo a más reciente."""
+        with self._lock:
+            if not self._full:
+                return self._buf[: self._pos].copy()
+            return np.concatenate((self._buf[self._pos:], self._buf[: self._pos]))
+
+    def __len__(self) -> int:
+        return len(self._buf) if self._full else self._pos
+
+
+class EnergyVAD:
+    """VAD por energía RMS.
+
+    Una trama es voz si su nivel supera ``threshold_db`` y además
+    ``margin_db`` sobre el suelo de ruido (media móvil de las tramas de
+    silencio).
+    """
+
+    def __init__(
+        self,
+        samplerate: int = 16_000,
+        *,
+        frame_ms: int = 30,
+        threshold_db: float = -45.0,
+        margin_db: float = 10.0,
+        min_speech_ms: int = 150,
+        hangover_ms: int = 700,
+    ) -> None:
+        self.samplerate = samplerate
+        self.frame_len = int(samplerate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self._min_speech = max(1, min_speech_ms // frame_ms)
+        self._hangover = max(1, hangover_ms // frame_ms)
+        self.reset()
+
+    def reset(self) -> None:
+        self.noise_db = self.threshold_db - self.margin_db
+        self.started = False
+        self.ended = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(np.square(frame), dtype=np.float64)))
+        db = 20.0 * np.log10(rms + 1e-10)
+        speech = db > max(self.threshold_db, self.noise_db + self.margin_db)
+        if not speech:
+            self.noise_db = 0.95 * self.noise_db + 0.05 * db
+        return speech
+
+    def push(self, block: np.ndarray) -> bool:
+        """Procesa ``block``; devuelve True si la frase acaba de terminar."""
+        data = np.concatenate((self._pending, np.asarray(block, dtype=np.float32).ravel()))
+        n = self.frame_len
+        usable = len(data) - len(data) % n
+        self._pending = data[usable:]
+        for i in range(0, usable, n):
+            if self.ended:
+                break
+            if self.is_speech(data[i : i + n]):
+                self._speech_run += 1
+                self._silence_run = 0
+                if self._speech_run >= self._min_speech:
+                    self.started = True
+            else:
+                self._speech_run = 0
+                self._silence_run += 1
+                if self.started and self._silence_run >= self._hangover:
+                    self.ended = True
+        return self.ended
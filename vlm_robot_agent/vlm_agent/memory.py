@@ -2,24 +2,67 @@
 # vlm_robot_agent/vlm_agent/memory.py
 # ---------------------------------------------------------------------------
 
-from collections import deque
-from typing import Deque, Dict, Any
+import sys
+from typing import Any, Dict, Iterator, Optional, Tuple
 from .actions import Action
+from ..vlm_inference.history import ENVIRONMENTS, STATUSES, HistoryRing
+
+
+class MemoryRecord:
+    """
+    Par (observación, acción) compacto: estado y entorno como códigos
+    internados, sin ``suggested_actions`` (ya resumidas en la acción).
+    """
+    __slots__ = ("action", "status", "environment", "goal_observed", "obstacles", "description")
+
+    def __init__(self, observation: Optional[Dict[str, Any]], action: Action) -> None:
+        obs = observation or {}
+        self.action = action
+        self.status = STATUSES.code(str(obs.get("status", "OK")))
+        self.environment = ENVIRONMENTS.code(str(obs.get("current_environment_type", "UNKNOWN")))
+        self.goal_observed = bool(obs.get("goal_observed", False))
+        self.obstacles: Tuple[Any, ...] = tuple(
+            sys.intern(o) if isinstance(o, str) else o for o in obs.get("obstacles") or ()
+        )
+        self.description: str = obs.get("description", "")
+
+    @property
+    def obs(self) -> Dict[str, Any]:
+        # Vista dict de la observación (compatibilidad con ``item["obs"]``)
+        return {
+            "status": STATUSES.text(self.status),
+            "description": self.description,
+            "obstacles": list(self.obstacles),
+            "current_environment_type": ENVIRONMENTS.text(self.environment),
+            "goal_observed": self.goal_observed,
+        }
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "obs":
+            return self.obs
+        if key == "action":
+            return self.action
+        raise KeyError(key)
+
 
 class Memory:
     """
     Almacena (máx N) pares (observación, acción) para dar contexto al VLM.
+    Anillo preasignado: cada línea del resumen se formatea una sola vez, al
+    añadir el par.
     """
     def __init__(self, size: int = 10) -> None:
-        self.buffer: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self.buffer: HistoryRing[MemoryRecord] = HistoryRing(size)
 
-    def add(self, observation: Dict[str, Any], action: Action) -> None:
-        self.buffer.append({"obs": observation, "action": action})
+    def add(self, observation: Optional[Dict[str, Any]], action: Action) -> None:
+        self.buffer.append(MemoryRecord(observation, action), f"{action.kind} → {action.params}")
 
     def summary(self) -> str:
-        # Genera resumen tipo bullet list para añadir al prompt
-        lines = []
-        for idx, item in enumerate(self.buffer):
-            act = item["action"]
-            lines.append(f"{idx+1}. {act.kind} → {act.params}")
-        return "\n".join(lines)
+        # Resumen tipo bullet list para añadir al prompt ("" si está vacía)
+        return self.buffer.text() if len(self.buffer) else ""
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __iter__(self) -> Iterator[MemoryRecord]:
+        return iter(self.buffer)
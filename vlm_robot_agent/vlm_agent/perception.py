@@ -3,14 +3,19 @@
 # ---------------------------------------------------------------------------
 from __future__ import annotations
 
-from typing import Dict, Any, Union
+from typing import Callable, Dict, Any, Optional, Union
 from pathlib import Path
 
 from PIL import Image
 import numpy as np
 
 try:
-    from ..vlm_inference.inference import VLMInference  # type: ignore
+    from ..vlm_inference.inference import ImageInput, VLMInference  # type: ignore
+    from ..vlm_inference.async_inference import AsyncVLMInference  # type: ignore
+    from ..vlm_inference.cache import FrameCache  # type: ignore
+    from ..vlm_inference.encoding import EncodedImage, EncodeOptions, ImageEncoder  # type: ignore
+    from ..vlm_inference.hedging import HedgePolicy  # type: ignore
+    from ..vlm_inference import telemetry  # type: ignore
 except ImportError as exc:
     # Helpful error if package layout is wrong.
     raise ImportError(
@@ -28,44 +33,116 @@ Observation = Dict[str, Any]
 class Perception:
     """High‑level perception interface.
 
+    A single :class:`VLMInference` engine serves both modes: it keeps one
+    prompt template and one history buffer per mode ("navigation" uses
+    ``navigation_prompts.json``, "interaction" ``interaction_prompts.json``)
+    over a shared, pooled HTTP client.
+
     Parameters
     ----------
     goal_text : str
-        The current high‑level goal – is baked into the prompt of each
-        *VLMInference* instance.
+        The current high‑level goal – is baked into the prompt of every mode.
     provider : str, default "openai"
-        Inference backend; passed straight to :class:`VLMInference`.
+        Inference backend from the registry in ``vlm_inference.backends``
+        ("openai", "local", "stub" …); passed straight to :class:`VLMInference`.
+    backend_options : dict | None, default None
+        Extra keyword arguments for the backend (``base_url``, stub
+        ``latency`` …).
     history_size : int, default 10
-        Length of the circular buffer inside each :class:`VLMInference`.
+        Length of the circular buffer kept per mode.
+    frame_cache : dict | None, default None
+        If given, the engine gets a :class:`FrameCache` built with these
+        keyword arguments (``max_entries``, ``ttl``, ``max_distance`` …).
+    async_mode : bool, default False
+        Build an :class:`AsyncVLMInference` engine; use :meth:`aperceive` then.
+    encode_options : dict | None, default None
+        Keyword arguments for :class:`EncodeOptions` (``max_side``,
+        ``quality``, ``fmt``, ``detail`` …).
+    hedge : dict | None, default None
+        Keyword arguments for :class:`HedgePolicy` (``delay_quantile``,
+        ``max_hedges``, ``budget_per_minute`` …); enables hedged requests.
+    structured_output : bool, default False
+        Constrain replies to the output JSON schema and validate them
+        (see :meth:`parse_stats`).
+    repair : bool, default False
+        Run the local JSON fixer on malformed replies; truncated replies
+        keep only their complete values.
     """
 
-    def __init__(self, *, goal_text: str, provider: str = "openai", history_size: int = 10):
-        self._navigation_engine = VLMInference(
-            goal=goal_text,
-            provider=provider,
-            history_size=history_size,
-        )
-        self._interaction_engine = VLMInference(
+    def __init__(
+        self,
+        *,
+        goal_text: str,
+        provider: str = "openai",
+        history_size: int = 10,
+        frame_cache: Dict[str, Any] | None = None,
+        async_mode: bool = False,
+        encode_options: Dict[str, Any] | None = None,
+        hedge: Dict[str, Any] | None = None,
+        backend_options: Dict[str, Any] | None = None,
+        structured_output: bool = False,
+        repair: bool = False,
+    ):
+        engine_cls = AsyncVLMInference if async_mode else VLMInference
+        self.async_mode = async_mode
+        self.engine = engine_cls(
             goal=goal_text,
             provider=provider,
             history_size=history_size,
+            cache=FrameCache(**frame_cache) if frame_cache is not None else None,
+            encoder=ImageEncoder(EncodeOptions(**(encode_options or {}))),
+            hedge=HedgePolicy(**hedge) if hedge is not None else None,
+            backend_options=backend_options,
+            structured_output=structured_output,
+            repair=repair,
         )
 
     # ------------------------------------------------------------------
     def perceive(
         self,
-        img: Union[str, Path, Image.Image, np.ndarray],
+        img: ImageInput,
         *,
         mode: str = "navigation",  # "navigation" | "interaction"
+        channel_order: str = "RGB",  # layout of ndarray input: "RGB" | "BGR"
+        on_action: Optional[Callable[[Dict[str, Any]], None]] = None,
     ) -> Observation:
         """Run VLM inference and standardise its output.
 
         *No* domain logic lives here – we simply normalise the JSON so downstream
         modules need not worry about slight variations in the model output.
+        Besides paths / PIL images, ``img`` may be a raw ndarray (OpenCV BGR
+        frames with ``channel_order="BGR"``), pre‑encoded JPEG ``bytes`` or the
+        :class:`EncodedImage` returned by :meth:`prepare`.
+
+        ``on_action`` streams the completion and receives each suggested
+        action as soon as it has been generated.
+        """
+        with telemetry.span("perception.perceive", mode=mode):
+            result = self.engine.infer(img, channel_order=channel_order, mode=mode, on_action=on_action)
+        return self.to_observation(result)
+
+    def prepare(self, img: ImageInput, *, channel_order: str = "RGB") -> EncodedImage:
+        """Encode a frame ahead of :meth:`perceive` (e.g. on a pipeline thread)."""
+        return self.engine.prepare(img, channel_order=channel_order)
+
+    async def aperceive(
+        self,
+        img: ImageInput,
+        *,
+        mode: str = "navigation",
+        channel_order: str = "RGB",
+    ) -> Optional[Observation]:
+        """Async counterpart of :meth:`perceive` (requires ``async_mode=True``).
+
+        Returns ``None`` when the request was superseded by a newer frame.
         """
-        engine = self._navigation_engine if mode == "navigation" else self._interaction_engine
-        result = engine.infer(img)
+        with telemetry.span("perception.perceive", mode=mode):
+            result = await self.engine.infer(img, channel_order=channel_order, mode=mode)
+        return None if result is None else self.to_observation(result)
 
+    @staticmethod
+    def to_observation(result: Dict[str, Any]) -> Observation:
+        """Normalise a raw :class:`InferenceResult` into an observation dict."""
         # Flatten / coerce the TypedDict coming from VLMInference into a simple dict.
         observation: Observation = {
             "status": getattr(result["status"], "value", result["status"]),
@@ -80,6 +157,22 @@ class Perception:
         }
         return observation
 
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit / miss / eviction counters of the frame cache (empty if off)."""
+        return self.engine.cache.stats() if self.engine.cache is not None else {}
+
+    def usage_stats(self) -> Dict[str, float]:
+        """API token usage of the engine, incl. ``cached_tokens`` / ``cached_ratio``."""
+        return self.engine.usage_stats()
+
+    def parse_stats(self) -> Dict[str, float]:
+        """Replies parsed as‑is / repaired / rejected by the engine."""
+        return self.engine.parse_stats()
+
+    def hedge_stats(self) -> Dict[str, float]:
+        """Primary / hedge win counters of the hedging policy (empty if off)."""
+        return self.engine.hedger.stats() if self.engine.hedger is not None else {}
+
     def is_visible(self, img: Union[str, Path, Image.Image, np.ndarray]) -> bool:
         """Devuelve True si el objetivo (target) es observado en la imagen."""
         observation = self.perceive(img, mode="navigation")
@@ -0,0 +1,246 @@
+# ---------------------------------------------------------------------------
+# vlm_robot_agent/vlm_agent/pipeline.py
+# ---------------------------------------------------------------------------
+"""Latest‑frame‑wins perception pipeline.
+
+Four threads – *capture → encode → infer → actuate* – joined by
+:class:`LatestSlot` single‑slot queues.  A slot only ever holds the newest
+value: a producer overwrites whatever the consumer has not taken yet, so the
+infer stage always works on the freshest frame and the decision rate is bound
+only by model latency.  Every stage blocks on a condition variable while idle
+(no busy polling).
+
+>>> pipe = PerceptionPipeline(
+...     capture=cam.read_new,            # blocks until a new frame (or None)
+...     encode=to_pil,                   # optional pre-processing
+...     infer=agent.step,                # None result = nothing to actuate
+...     actuate=robot.execute,
+... )
+>>> pipe.start(); ...; pipe.stop()
+>>> pipe.timings()["infer"]["mean"]
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+from ..vlm_inference import telemetry
+
+__all__ = ["LatestSlot", "StageStats", "PerceptionPipeline"]
+
+T = TypeVar("T")
+
+logger = logging.getLogger("vlm_pipeline")
+
+
+class LatestSlot(Generic[T]):
+    """Bounded single‑slot queue where :meth:`put` overwrites the pending value."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._item: Optional[T] = None
+        self._full = False
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item: T) -> bool:
+        """Store ``item``; returns ``True`` if an unconsumed value was dropped."""
+        with self._cond:
+            dropped = self._full
+            if dropped:
+                self.dropped += 1
+            self._item, self._full = item, True
+            self._cond.notify()
+            return dropped
+
+    def get(self, timeout: Optional[float] = None) -> Optional[T]:
+        """Block until a value is available; ``None`` on timeout or close."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._full or self._closed, timeout):
+                return None
+            if not self._full:
+                return None
+            item, self._item, self._full = self._item, None, False
+            return item
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+@dataclass
+class StageStats:
+    """Per‑stage timing counters (seconds)."""
+
+    count: int = 0
+    total: float = 0.0
+    last: float = 0.0
+    max: float = 0.0
+
+    def add(self, dt: float) -> None:
+        self.count += 1
+        self.total += dt
+        self.last = dt
+        self.max = max(self.max, dt)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {"count": self.count, "mean": self.mean, "last": self.last, "max": self.max}
+
+
+class PerceptionPipeline:
+    """Run capture / encode / infer / actuate as independent threads.
+
+    Parameters
+    ----------
+    capture : callable
+        Returns the next frame, blocking until one is available; ``None``
+        means "nothing new yet".
+    infer : callable
+        Turns an (encoded) frame into a decision; ``None`` skips actuation
+        (e.g. while a conversation owns the robot).
+    actuate : callable, optional
+        Executes a decision.
+    encode : callable, optional
+        Pre‑processing run on its own thread (colour conversion, JPEG…).
+    idle_sleep : float, default 0.01
+        Back‑off when ``capture`` returns ``None`` without blocking.
+    """
+
+    STAGES = ("capture", "encode", "infer", "actuate")
+
+    def __init__(
+        self,
+        *,
+        capture: Callable[[], Any],
+        infer: Callable[[Any], Any],
+        actuate: Optional[Callable[[Any], None]] = None,
+        encode: Optional[Callable[[Any], Any]] = None,
+        idle_sleep: float = 0.01,
+    ) -> None:
+        self._capture = capture
+        self._encode = encode or (lambda frame: frame)
+        self._infer = infer
+        self._actuate = actuate or (lambda decision: None)
+        self.idle_sleep = idle_sleep
+
+        # each slot carries (capture timestamp, payload)
+        self._frames: LatestSlot[Tuple[float, Any]] = LatestSlot()
+        self._encoded: LatestSlot[Tuple[float, Any]] = LatestSlot()
+        self._decisions: LatestSlot[Tuple[float, Any]] = LatestSlot()
+
+        self._stats: Dict[str, StageStats] = {name: StageStats() for name in self.STAGES}
+        self._stats["frame_to_decision"] = StageStats()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+        self.latest_frame: Any = None
+        self.latest_decision: Any = None
+
+    # ------------------------------------------------------------------
+    def start(self) -> "PerceptionPipeline":
+        if self._threads:
+            return self
+        self._stop.clear()
+        for name, target in (
+            ("capture", self._capture_loop),
+            ("encode", self._encode_loop),
+            ("infer", self._infer_loop),
+            ("actuate", self._actuate_loop),
+        ):
+            t = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        for slot in (self._frames, self._encoded, self._decisions):
+            slot.close()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads.clear()
+
+    def timings(self) -> Dict[str, Dict[str, float]]:
+        """Mean / last / max seconds per stage plus frames dropped per slot."""
+        with self._lock:
+            out = {name: s.as_dict() for name, s in self._stats.items()}
+        out["dropped"] = {
+            "encode": self._frames.dropped,
+            "infer": self._encoded.dropped,
+            "actuate": self._decisions.dropped,
+        }
+        return out
+
+    # ------------------------------------------------------------------
+    def _record(self, stage: str, dt: float) -> None:
+        with self._lock:
+            self._stats[stage].add(dt)
+        telemetry.record(f"pipeline.{stage}", dt)
+
+    def _capture_loop(self) -> None:
+        while not self._stop.is_set():
+            t0 = time.perf_counter()
+            frame = self._capture()
+            if frame is None:
+                self._stop.wait(self.idle_sleep)
+                continue
+            self._record("capture", time.perf_counter() - t0)
+            self.latest_frame = frame
+            self._frames.put((time.perf_counter(), frame))
+
+    def _encode_loop(self) -> None:
+        while not self._stop.is_set():
+            item = self._frames.get()
+            if item is None:
+                continue
+            stamp, frame = item
+            t0 = time.perf_counter()
+            try:
+                payload = self._encode(frame)
+            except Exception:
+                logger.exception("Encode stage failed")
+                continue
+            self._record("encode", time.perf_counter() - t0)
+            self._encoded.put((stamp, payload))
+
+    def _infer_loop(self) -> None:
+        while not self._stop.is_set():
+            item = self._encoded.get()
+            if item is None:
+                continue
+            stamp, payload = item
+            t0 = time.perf_counter()
+            try:
+                decision = self._infer(payload)
+            except Exception:
+                logger.exception("Infer stage failed")
+                continue
+            self._record("infer", time.perf_counter() - t0)
+            if decision is not None:
+                self._decisions.put((stamp, decision))
+
+    def _actuate_loop(self) -> None:
+        while not self._stop.is_set():
+            item = self._decisions.get()
+            if item is None:
+                continue
+            stamp, decision = item
+            t0 = time.perf_counter()
+            try:
+                self._actuate(decision)
+            except Exception:
+                logger.exception("Actuate stage failed")
+                continue
+            done = time.perf_counter()
+            self._record("actuate", done - t0)
+            self._record("frame_to_decision", done - stamp)
+            self.latest_decision = decision
@@ -33,12 +33,26 @@ class Planner:
     def decide(self, observation: Dict[str, Any]) -> Action:
         """
         Basado en la observación actual, devuelve la siguiente acción.
+        - Si la percepción falló (status ERROR, p. ej. VLM caído o circuito
+          abierto), se detiene: nunca se avanza a ciegas.
         - Si detecta una persona bloqueando, genera una interacción.
         - En caso contrario, genera un comando de navegación hacia adelante.
         """
         status = observation.get("status", "")
         obstacles = observation.get("obstacles", [])
 
+        # 0) Sin percepción fiable → parada segura local
+        if status == "ERROR":
+            return Action(
+                kind=ActionKind.NAVIGATION,
+                params={
+                    "direction": NavigationDirection.STOP,
+                    "angle": 0.0,
+                    "distance": 0.0,
+                    "reason": observation.get("description", ""),
+                }
+            )
+
         # 1) Si hay persona en el camino → interacción hablada
         if "person" in obstacles:
             return Action(
@@ -0,0 +1,205 @@
+# ---------------------------------------------------------------------------
+# vlm_robot_agent/vlm_agent/scheduler.py
+# ---------------------------------------------------------------------------
+"""Adaptive VLM query rate: decide which ticks need a fresh inference.
+
+Querying the model on every tick pays a full round trip even when nothing
+changed.  :class:`QueryScheduler` looks at cheap signals and only asks for an
+inference when one of them fires, in this order:
+
+    • ``first``        – nothing has been queried yet,
+    • ``interaction``  – the last action was not a navigation command,
+    • ``status``       – the last reply was not OK (BLOCKED, NEED_HELP, …);
+                         spaced by ``retry_interval``,
+    • ``stale``        – the last reply is older than ``max_staleness``,
+    • ``distance``     – odometry travelled since the last query reached
+                         ``max_distance`` (default: the commanded distance),
+    • ``scene_change`` – the frame differs from the last queried one by
+                         ``change_threshold`` or more,
+    • ``person``       – the gate's person detector fired.
+
+``distance`` and ``scene_change`` are *soft* triggers: they are held back
+while the last query is younger than ``min_interval`` (reason
+``rate_limit``), which caps the cost per deployment.  On every other tick
+the last navigation action is reused – extrapolated with odometry, i.e. the
+distance left of the commanded one – except while the last reply was not OK
+(``retry_wait``): then the robot holds position with a STOP until the next
+query.
+
+>>> scheduler = QueryScheduler(SchedulePolicy(max_staleness=2.0, min_interval=0.5))
+>>> agent = RobotAgent(goal_text="…", scheduler=scheduler)
+>>> action = agent.step(frame, odometry=(x, y))
+
+Every decision is counted as ``scheduler.decisions{reason=…}`` and the time
+between queries is observed as ``scheduler.query_interval``; :meth:`stats`
+also reports the policy in force.
+"""
+from __future__ import annotations
+
+import math
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+from .action_types import ActionKind, NavigationDirection
+from .actions import Action
+from .fast_path import GateConfig, SceneGate
+from ..vlm_inference import telemetry
+
+__all__ = ["SchedulePolicy", "ScheduleDecision", "QueryScheduler", "Odometry"]
+
+_REUSE_REASONS = ("reuse", "rate_limit", "retry_wait")
+
+# Cumulative distance travelled [m] or planar position (x, y) [m].
+Odometry = Union[float, Sequence[float]]
+
+
+@dataclass
+class SchedulePolicy:
+    change_threshold: float = 0.05          # mean thumbnail difference (0-1)
+    max_staleness: float = 3.0              # s; always re-query after this
+    max_distance: Optional[float] = None    # m; None = the commanded distance
+    min_interval: float = 0.0               # s between soft-triggered queries
+    retry_interval: float = 0.0             # s between queries while not OK
+    ok_statuses: Tuple[str, ...] = ("OK",)
+    extrapolate: bool = True                # shorten reused moves by odometry
+
+
+@dataclass
+class ScheduleDecision:
+    query: bool
+    reason: str
+    change: float = 0.0         # scene change vs. the last queried frame
+    age: float = 0.0            # s since the last query
+    travelled: float = 0.0      # m since the last query (0 without odometry)
+
+
+def _distance(a: Optional[Odometry], b: Optional[Odometry]) -> float:
+    if a is None or b is None:
+        return 0.0
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(float(a) - float(b))
+    return math.dist(tuple(a)[:2], tuple(b)[:2])
+
+
+class QueryScheduler:
+    """Decides per tick between a fresh VLM query and the last action.
+
+    Parameters
+    ----------
+    policy : SchedulePolicy, optional
+        Trigger thresholds; defaults are tuned for ~0.5 m/s indoors.
+    gate : SceneGate, optional
+        Measures scene change (and detects people when its config says so).
+        Defaults to a gate without person detector.
+    """
+
+    def __init__(self, policy: Optional[SchedulePolicy] = None, *, gate: Optional[SceneGate] = None) -> None:
+        self.policy = policy or SchedulePolicy()
+        self.gate = gate or SceneGate(GateConfig(detect_people=False))
+        self.decisions: Counter = Counter()
+        self._t_query: Optional[float] = None
+        self._odom: Optional[Odometry] = None
+        self._status = "OK"
+        self._action: Optional[Action] = None
+        self._travelled = 0.0
+
+    # ------------------------------------------------------------------
+    def decide(self, img: Any, *, channel_order: str = "RGB", odometry: Optional[Odometry] = None) -> ScheduleDecision:
+        """Measure the frame and decide; call :meth:`committed` after a query."""
+        decision = self._decide(img, channel_order, odometry)
+        self.decisions[decision.reason] += 1
+        telemetry.count("scheduler.decisions", reason=decision.reason)
+        if decision.query and self._t_query is not None:
+            telemetry.observe("scheduler.query_interval", decision.age)
+        return decision
+
+    def committed(self, observation: Dict[str, Any], action: Action, *, odometry: Optional[Odometry] = None) -> None:
+        """Register the result of a fresh query as the new reference."""
+        self.gate.keyframe(observation)
+        self._t_query = time.monotonic()
+        self._odom = odometry
+        self._status = str(observation.get("status", "OK"))
+        self._action = action
+        self._travelled = 0.0
+
+    def extrapolate(self, action: Optional[Action] = None) -> Action:
+        """Copy of ``action`` (default: the last queried one) minus the distance covered.
+
+        While the last reply was not OK the reused action is a STOP: a
+        BLOCKED / NEED_HELP scene must not be driven into blindly.
+        """
+        action = action or self._action
+        if action is None:
+            raise RuntimeError("extrapolate() before any committed query")
+        if self._status not in self.policy.ok_statuses:
+            return Action(
+                kind=ActionKind.NAVIGATION,
+                params={
+                    "direction": NavigationDirection.STOP,
+                    "angle": 0.0,
+                    "distance": 0.0,
+                    "reason": f"waiting to re-query ({self._status})",
+                },
+            )
+        params = dict(action.params)
+        distance = params.get("distance")
+        if self.policy.extrapolate and self._travelled and isinstance(distance, (int, float)):
+            params["distance"] = round(max(0.0, distance - self._travelled), 3)
+        return Action(kind=action.kind, params=params)
+
+    def reset(self) -> None:
+        self.gate.reset()
+        self._t_query = None
+        self._action = None
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.decisions.values())
+        reused = total - self.queries
+        return {
+            **self.decisions,
+            "ticks": total,
+            "queries": self.queries,
+            "reuse_ratio": reused / total if total else 0.0,
+            "policy": asdict(self.policy),
+        }
+
+    @property
+    def queries(self) -> int:
+        return sum(n for reason, n in self.decisions.items() if reason not in _REUSE_REASONS)
+
+    # ------------------------------------------------------------------
+    def _decide(self, img: Any, channel_order: str, odometry: Optional[Odometry]) -> ScheduleDecision:
+        policy = self.policy
+        change = self.gate.measure(img, channel_order, detect=False).change
+        if self._t_query is None or self._action is None:
+            return ScheduleDecision(True, "first", change)
+
+        age = time.monotonic() - self._t_query
+        travelled = self._travelled = _distance(odometry, self._odom)
+
+        def decision(query: bool, reason: str) -> ScheduleDecision:
+            return ScheduleDecision(query, reason, change, age, travelled)
+
+        if self._action.kind != ActionKind.NAVIGATION:
+            return decision(True, "interaction")
+        if self._status not in policy.ok_statuses:
+            return decision(age >= policy.retry_interval, "status" if age >= policy.retry_interval else "retry_wait")
+        if age >= policy.max_staleness:
+            return decision(True, "stale")
+
+        soft = None
+        limit = policy.max_distance
+        if limit is None:
+            limit = self._action.params.get("distance")
+        if odometry is not None and isinstance(limit, (int, float)) and travelled >= limit:
+            soft = "distance"
+        elif change >= policy.change_threshold:
+            soft = "scene_change"
+        if soft is not None:
+            return decision(True, soft) if age >= policy.min_interval else decision(False, "rate_limit")
+
+        if self.gate.count_people() > 0:
+            return decision(True, "person")
+        return decision(False, "reuse")
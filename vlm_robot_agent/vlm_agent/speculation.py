@@ -0,0 +1,133 @@
+# ---------------------------------------------------------------------------
+# vlm_robot_agent/vlm_agent/speculation.py
+# ---------------------------------------------------------------------------
+"""Speculative prefetch of the next inference while an action executes.
+
+Right after :meth:`RobotAgent.step` returns an action, a frame is grabbed and
+the next VLM request is fired in the background, assuming the robot executes
+that action (the engine history already contains its entry).  On the next
+tick the caller reports what was actually executed:
+
+    • it matches the prediction → the prefetched result is used directly;
+    • it differs (action aborted, clipped, overridden) → the result is dropped
+      and a fresh inference runs as usual.
+
+Speculative requests run with ``record_history=False``; only an accepted
+result is committed to the engine history.  They never touch the engine's
+``last_*`` fields (which belong to the foreground tick): prompt, raw reply,
+timings and usage are kept in the speculation's own :class:`CallContext`
+(``context`` after a successful :meth:`SpeculativePrefetcher.resolve`).
+"""
+from __future__ import annotations
+
+import logging
+import math
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from .actions import Action
+from ..vlm_inference.inference import CallContext
+
+__all__ = ["SpeculativePrefetcher", "actions_match"]
+
+logger = logging.getLogger("vlm_speculation")
+
+# Params that do not change where the robot ends up.
+_IGNORED_PARAMS = {"utterance"}
+
+
+def _norm(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+def actions_match(a: Action, b: Action, *, tol: float = 1e-3) -> bool:
+    """Whether two actions are the same command (enum/str and float tolerant)."""
+    if _norm(a.kind) != _norm(b.kind):
+        return False
+    keys = (set(a.params) | set(b.params)) - _IGNORED_PARAMS
+    for k in keys:
+        va, vb = _norm(a.params.get(k)), _norm(b.params.get(k))
+        if isinstance(va, (int, float)) and isinstance(vb, (int, float)):
+            if not math.isclose(va, vb, abs_tol=tol):
+                return False
+        elif va != vb:
+            return False
+    return True
+
+
+@dataclass
+class _Pending:
+    future: Future
+    predicted: Action
+    mode: str
+    context: CallContext
+
+
+class SpeculativePrefetcher:
+    """Runs one speculative inference at a time on a background thread."""
+
+    def __init__(self, perception) -> None:
+        self.perception = perception
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vlm-speculate")
+        self._pending: Optional[_Pending] = None
+        self.context: Optional[CallContext] = None  # of the last used result
+
+        self.launched = 0
+        self.used = 0
+        self.discarded = 0
+
+    def launch(self, img, *, predicted: Action, mode: str, channel_order: str = "RGB") -> None:
+        """Start inferring ``img`` as if ``predicted`` is about to be executed."""
+        self.discard()
+        context = CallContext()
+        future = self._executor.submit(
+            self.perception.engine.infer,
+            img,
+            channel_order=channel_order,
+            mode=mode,
+            record_history=False,
+            context=context,
+        )
+        self._pending = _Pending(future, predicted, mode, context)
+        self.launched += 1
+
+    def resolve(self, executed: Optional[Action], mode: str) -> Optional[Dict[str, Any]]:
+        """Return the prefetched result if ``executed`` matches the prediction.
+
+        ``executed=None`` means the predicted action was executed as returned.
+        On any mismatch (action or mode) the speculation is discarded.
+        """
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return None
+        if pending.mode != mode or (executed is not None and not actions_match(executed, pending.predicted)):
+            self._drop(pending)
+            return None
+        result = pending.future.result()
+        if getattr(result.get("status"), "value", result.get("status")) == "ERROR":
+            self._drop(pending)
+            return None
+        self.used += 1
+        self.context = pending.context
+        return result
+
+    def discard(self) -> None:
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self._drop(pending)
+
+    def stats(self) -> Dict[str, int]:
+        return {"launched": self.launched, "used": self.used, "discarded": self.discarded}
+
+    def shutdown(self) -> None:
+        self.discard()
+        self._executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------
+    def _drop(self, pending: _Pending) -> None:
+        # a running request cannot be interrupted; its result is just ignored
+        pending.future.cancel()
+        self.discarded += 1
+        logger.debug("Speculation discarded (%s)", self.stats())
@@ -0,0 +1,163 @@
+"""# vlm_robot_agent/vlm_inference/async_inference.py
+================================
+asyncio‑native variant of :class:`VLMInference` built on ``AsyncOpenAI``.
+
+The blocking client stalls the control thread for the whole round trip.
+**AsyncVLMInference** exposes ``async infer()`` instead and implements
+*latest‑frame‑wins* semantics: when a newer frame arrives while a request is
+still in flight, the older request is cancelled and its caller receives
+``None`` – on a moving robot a stale answer is worse than no answer.
+
+>>> engine = AsyncVLMInference(goal="Find the bathroom")
+>>> result = await engine.infer(frame)
+>>> if result is None:          # superseded by a newer frame
+...     pass
+
+Image preparation and parsing are shared with the synchronous engine; image
+encoding runs in a worker thread so the event loop stays responsive.  With a
+hedge policy, cancelling the in‑flight request cancels its hedges too.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Optional, Tuple
+
+from . import telemetry
+from .backends import ChatPrompt
+from .encoding import EncodedImage
+from .hedging import HedgeTarget
+from .inference import DEFAULT_MODE, CallContext, ImageInput, InferenceResult, VLMInference, logger
+
+__all__ = ["AsyncVLMInference"]
+
+
+class AsyncVLMInference(VLMInference):
+    """Same pipeline as :class:`VLMInference`, awaited and cancellable."""
+
+    _asynchronous = True  # backends build AsyncOpenAI clients
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._seq = 0
+        self._inflight: asyncio.Task | None = None
+        super().__init__(*args, **kwargs)
+
+    # ---------------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------------
+
+    async def infer(  # type: ignore[override]
+        self, image: ImageInput, *, channel_order: str = "RGB", mode: str = DEFAULT_MODE
+    ) -> Optional[InferenceResult]:
+        """Run full cycle; ``None`` if a newer call superseded this one.
+
+        Accepts the same inputs as :meth:`VLMInference.infer`.  Any other
+        exception is turned into a status ERROR result, as in the synchronous
+        engine.
+        """
+        self._seq += 1
+        seq = self._seq
+        self.cancel_inflight()
+
+        ctx = CallContext()
+        try:
+            t0 = time.perf_counter()
+            img, owned, encoded = self._ingest(image, channel_order)
+            ctx.timings["decode"] = time.perf_counter() - t0
+            phash = self._phash(img) if img is not None else encoded.phash
+            cached = self._cache_lookup(phash, mode)
+            if cached is not None:
+                telemetry.count("vlm.cache_hits", mode=mode)
+                return cached
+
+            if self.resilience is not None:
+                self.resilience.check()
+            if encoded is None:
+                encoded = await asyncio.to_thread(self._encode_image, img, owned)
+                if seq != self._seq:
+                    return None
+                ctx.timings.update(encoded.timings)
+            prompt = ctx.prompt = self._build_prompt(mode, guides=encoded.annotated)
+
+            t0 = time.perf_counter()
+            if self.hedger is not None:
+                call = self._ahedged_llm(encoded, prompt, ctx)
+            else:
+                call = self._acall_llm(encoded, prompt, ctx)
+            task = asyncio.ensure_future(call)
+            self._inflight = task
+            try:
+                raw = await task
+            except asyncio.CancelledError:
+                if seq != self._seq:
+                    logger.debug("Inference #%d superseded by #%d", seq, self._seq)
+                    return None
+                raise
+            finally:
+                if self._inflight is task:
+                    self._inflight = None
+
+            if seq != self._seq:
+                return None
+            ctx.timings["request"] = time.perf_counter() - t0
+            result = self._complete(raw, phash, ctx, mode)
+            self._report_timings(ctx, mode)
+            return result
+        except Exception as exc:
+            logger.exception("Inference failed: %s", exc)
+            telemetry.count("vlm.errors", kind=type(exc).__name__, mode=mode)
+            return self._error_result(exc)
+        finally:
+            if seq == self._seq:  # a superseded call leaves ``last_*`` to the newer one
+                self._publish(ctx)
+
+    def cancel_inflight(self) -> None:
+        """Drop the request currently waiting on the API, if any."""
+        if self._inflight is not None and not self._inflight.done():
+            self._inflight.cancel()
+        self._inflight = None
+
+    async def aclose(self) -> None:
+        self.cancel_inflight()
+        await self.backend.aclose()
+
+    # ---------------------------------------------------------------------
+    # Backend call
+    # ---------------------------------------------------------------------
+
+    async def _ahedged_llm(self, image: EncodedImage, prompt: str | ChatPrompt, ctx: CallContext) -> str:
+        raw, won = await self.hedger.acall(
+            lambda target: self._ahedge_attempt(image, prompt, target), self._accept_attempt
+        )
+        ctx.usage = won.usage
+        return raw
+
+    async def _ahedge_attempt(
+        self, image: EncodedImage, prompt: str | ChatPrompt, target: HedgeTarget | None
+    ) -> Tuple[str, CallContext]:
+        attempt = CallContext(prompt=prompt)
+        return await self._acall_llm(image, prompt, attempt, target), attempt
+
+    async def _acall_llm(
+        self, image: EncodedImage, prompt: str | ChatPrompt, ctx: CallContext, target: HedgeTarget | None = None
+    ) -> str:
+        t0 = time.time()
+        messages = self._build_messages(image, prompt)
+
+        def attempt(timeout: Optional[float]):
+            return self.backend.agenerate(
+                messages,
+                model=(target.model if target is not None else None) or self.model,
+                max_tokens=2048,
+                client=target.client if target is not None else None,
+                response_format=self._response_format,
+                timeout=timeout,
+            )
+
+        if self.resilience is not None:
+            completion = await self.resilience.acall(attempt)
+        else:
+            completion = await attempt(None)
+        self._record_usage(ctx, completion.usage)
+        logger.debug("LLM latency %.2fs", time.time() - t0)
+        return completion.text
@@ -0,0 +1,472 @@
+"""# vlm_robot_agent/vlm_inference/backends.py
+================================
+Pluggable inference backends for :class:`VLMInference`.
+
+A backend turns *(encoded image, prompt)* into a model reply and the reply
+into a JSON object:
+
+    • ``encode(image, prompt)``   – build the request payload (chat messages),
+    • ``generate(request, …)``    – run it, return a :class:`Completion`
+      (``stream`` / ``agenerate`` for streamed and asyncio use),
+    • ``parse(raw)``              – strip fences / prefixes, ``json.loads``.
+
+``response_format`` (e.g. the JSON schema of :mod:`schema`) is forwarded to
+servers that support constrained decoding; other backends ignore it.
+``timeout`` (seconds) bounds one attempt; retries live in :mod:`resilience`.
+
+Backends are looked up by name in a small registry, so ``provider=`` on the
+engine selects one:
+
+    ``"openai"``  OpenAI or any OpenAI‑compatible server (``base_url=``) – a
+                  local llama.cpp / vLLM endpoint works unchanged;
+    ``"local"``   same, defaulting to ``http://localhost:8000/v1`` and no key;
+    ``"stub"``    deterministic in‑process replies with simulated latency,
+                  for tests and network‑free benchmarks;
+    ``"replay"``  the replies of a session recorded with
+                  :class:`replay.SessionRecorder`, served in order;
+    ``"gateway"`` a shared :class:`gateway.GatewayServer` that rate‑limits,
+                  prioritises and coalesces the requests of a robot fleet.
+
+>>> engine = VLMInference(goal="…", provider="openai", base_url="http://gpu-box:8000/v1")
+>>> engine = VLMInference(goal="…", provider="stub", backend_options={"latency": 0.4})
+
+Third‑party backends register themselves with :func:`register_backend`.
+
+The prompt is either a plain string (legacy layout: one user block with the
+image) or a :class:`ChatPrompt`, laid out prefix‑stable as *constant system
+message → goal → history + image* so providers can reuse a cached prefix.
+Token usage (``prompt_tokens``, ``completion_tokens``, ``cached_tokens``)
+travels with each reply – ``Completion.usage``, or the ``usage`` dict that
+``stream`` fills once the stream ends – never through backend state, so
+concurrent calls (speculation, hedges, gateway clients) cannot mix it up.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from .clients import pooled_http_limits, shared_openai_client
+from .encoding import EncodedImage
+
+__all__ = [
+    "ChatPrompt",
+    "Completion",
+    "Backend",
+    "OpenAIBackend",
+    "StubBackend",
+    "register_backend",
+    "create_backend",
+    "available_backends",
+    "strip_json_text",
+    "usage_dict",
+]
+
+_REGISTRY: Dict[str, Callable[..., "Backend"]] = {}
+
+
+@dataclass(frozen=True)
+class ChatPrompt:
+    """Prompt split by how often each part changes (rarely → every tick)."""
+
+    system: str   # constant per perception mode
+    goal: str     # constant per mission
+    history: str  # changes every tick, sent next to the image
+
+
+@dataclass(frozen=True)
+class Completion:
+    """Raw reply text of one request and the token usage it reported."""
+
+    text: str
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+def usage_dict(usage: Any) -> Dict[str, int]:
+    """Flatten an OpenAI ``usage`` object (``{}`` when absent)."""
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0,
+    }
+
+
+def register_backend(name: str) -> Callable[[Type["Backend"]], Type["Backend"]]:
+    """Class decorator adding a backend to the provider registry."""
+
+    def deco(cls: Type[Backend]) -> Type[Backend]:
+        _REGISTRY[name] = cls
+        return cls
+
+    return deco
+
+
+def create_backend(name: str, **kwargs: Any) -> "Backend":
+    try:
+        factory = _REGISTRY[name]
+    except KeyError:
+        raise NotImplementedError(
+            f"Unknown provider '{name}' (available: {', '.join(available_backends())})"
+        ) from None
+    return factory(**kwargs)
+
+
+def available_backends() -> List[str]:
+    return sorted(_REGISTRY)
+
+
+def strip_json_text(raw: str) -> str:
+    """Remove a ```` ``` ```` fence and an optional ``json`` prefix."""
+    clean = raw.strip()
+
+    # --- elimina bloque ``` … ``` si existe
+    if clean.startswith("```"):
+        clean = clean.split("```", 2)[1].strip()
+
+    # --- elimina prefijo opcional “json” o similar
+    if clean.lower().startswith("json"):
+        idx = clean.find("{")
+        if idx != -1:
+            clean = clean[idx:]          # nos quedamos desde “{” en adelante
+    return clean
+
+
+# ---------------------------------------------------------------------------
+# Interface
+# ---------------------------------------------------------------------------
+
+
+class Backend:
+    """Base class; subclasses implement :meth:`generate` (and usually more)."""
+
+    def encode(self, image: EncodedImage, prompt: Union[str, ChatPrompt]) -> List[Dict[str, Any]]:
+        """Chat‑completions style message list; the image always goes last."""
+        image_url: Dict[str, str] = {"url": image.data_url}
+        if image.detail:
+            image_url["detail"] = image.detail
+        image_part = {"type": "image_url", "image_url": image_url}
+        if isinstance(prompt, str):
+            return [{"role": "user", "content": [{"type": "text", "text": prompt}, image_part]}]
+        return [
+            {"role": "system", "content": prompt.system},
+            {"role": "user", "content": f"Goal: {prompt.goal}"},
+            {
+                "role": "user",
+                "content": [{"type": "text", "text": f"Action history:\n{prompt.history}"}, image_part],
+            },
+        ]
+
+    def generate(
+        self,
+        request: Any,
+        *,
+        model: str,
+        max_tokens: int,
+        client: Any = None,
+        response_format: Any = None,
+        timeout: Optional[float] = None,
+    ) -> Completion:
+        raise NotImplementedError
+
+    def stream(
+        self,
+        request: Any,
+        *,
+        model: str,
+        max_tokens: int,
+        response_format: Any = None,
+        timeout: Optional[float] = None,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> Iterator[str]:
+        """Text deltas; ``usage`` is filled when the stream ends.  The default
+        yields the whole reply at once."""
+        completion = self.generate(
+            request, model=model, max_tokens=max_tokens, response_format=response_format, timeout=timeout
+        )
+        if usage is not None:
+            usage.update(completion.usage)
+        yield completion.text
+
+    async def agenerate(
+        self,
+        request: Any,
+        *,
+        model: str,
+        max_tokens: int,
+        client: Any = None,
+        response_format: Any = None,
+        timeout: Optional[float] = None,
+    ) -> Completion:
+        return await asyncio.to_thread(
+            self.generate,
+            request,
+            model=model,
+            max_tokens=max_tokens,
+            client=client,
+            response_format=response_format,
+            timeout=timeout,
+        )
+
+    def parse(self, raw: str) -> Dict[str, Any]:
+        """Decode the JSON object in ``raw`` (raises ``ValueError`` if invalid)."""
+        return json.loads(strip_json_text(raw))
+
+    async def aclose(self) -> None:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# OpenAI / OpenAI‑compatible HTTP
+# ---------------------------------------------------------------------------
+
+
+@register_backend("openai")
+class OpenAIBackend(Backend):
+    """Chat completions over HTTP; ``base_url`` points at any compatible server.
+
+    The synchronous client is the process‑wide pooled one
+    (:func:`shared_openai_client`); with ``asynchronous=True`` an
+    ``AsyncOpenAI`` client with the same pool limits is built instead.
+    """
+
+    def __init__(
+        self,
+        *,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        client: Any = None,
+        asynchronous: bool = False,
+    ) -> None:
+        if client is None and base_url is None and not api_key:
+            raise ValueError("OPENAI_API_KEY env‑var missing")
+        # local servers ignore the key, but the client insists on one
+        api_key = api_key or ("not-needed" if base_url else None)
+        if client is None:
+            if asynchronous:
+                client = AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    max_retries=0,  # retried by :mod:`resilience`
+                    http_client=DefaultAsyncHttpxClient(limits=pooled_http_limits()),
+                )
+            else:
+                client = shared_openai_client(api_key, base_url=base_url)
+        self.client = client
+        self.base_url = base_url
+
+    @staticmethod
+    def _extra(response_format: Any, timeout: Optional[float]) -> Dict[str, Any]:
+        extra: Dict[str, Any] = {"response_format": response_format} if response_format is not None else {}
+        if timeout is not None:
+            extra["timeout"] = timeout
+        return extra
+
+    def generate(
+        self,
+        request: Any,
+        *,
+        model: str,
+        max_tokens: int,
+        client: Any = None,
+        response_format: Any = None,
+        timeout: Optional[float] = None,
+    ) -> Completion:
+        resp = (client or self.client).chat.completions.create(
+            model=model, max_tokens=max_tokens, messages=request, **self._extra(response_format, timeout)
+        )
+        return Completion(resp.choices[0].message.content, usage_dict(getattr(resp, "usage", None)))
+
+    def stream(
+        self,
+        request: Any,
+        *,
+        model: str,
+        max_tokens: int,
+        response_format: Any = None,
+        timeout: Optional[float] = None,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> Iterator[str]:
+        chunks = self.client.chat.completions.create(
+            model=model,
+            max_tokens=max_tokens,
+            messages=request,
+            stream=True,
+            stream_options={"include_usage": True},
+            **self._extra(response_format, timeout),
+        )
+        for chunk in chunks:
+            if getattr(chunk, "usage", None) is not None and usage is not None:
+                usage.update(usage_dict(chunk.usage))
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def agenerate(
+        self,
+        request: Any,
+        *,
+        model: str,
+        max_tokens: int,
+        client: Any = None,
+        response_format: Any = None,
+        timeout: Optional[float] = None,
+    ) -> Completion:
+        resp = await (client or self.client).chat.completions.create(
+            model=model, max_tokens=max_tokens, messages=request, **self._extra(response_format, timeout)
+        )
+        return Completion(resp.choices[0].message.content, usage_dict(getattr(resp, "usage", None)))
+
+    async def aclose(self) -> None:
+        close = getattr(self.client, "close", None)
+        if close is not None and asyncio.iscoroutinefunction(close):
+            await close()
+
+
+@register_backend("local")
+def _local_backend(*, base_url: Optional[str] = None, **kwargs: Any) -> OpenAIBackend:
+    return OpenAIBackend(
+        base_url=base_url or os.getenv("VLM_BASE_URL") or "http://localhost:8000/v1", **kwargs
+    )
+
+
+# ---------------------------------------------------------------------------
+# Deterministic stub
+# ---------------------------------------------------------------------------
+
+_STUB_REPLY: Dict[str, Any] = {
+    "actions": [
+        {
+            "type": "Navigation",
+            "parameters": {"direction": "forward", "angle": 0, "distance": 0.5},
+            "Goal_observed": "False",
+            "where_goal": "FALSE",
+            "obstacle_avoidance_strategy": "",
+        }
+    ],
+    "description": "Stub scene: clear corridor ahead.",
+    "obstacles": [],
+    "current_environment_type": "OPEN_SPACE_OR_CORRIDOR",
+    "status": "OK",
+}
+
+
+@register_backend("stub")
+class StubBackend(Backend):
+    """In‑process backend returning a fixed reply after a simulated delay.
+
+    Parameters
+    ----------
+    reply : dict | str | None
+        Reply object (or raw text); defaults to a forward navigation step.
+    latency : float, default 0.0
+        Seconds per request; ``jitter`` adds a seeded uniform ±jitter.
+    chunk_chars / chunk_interval :
+        Size and spacing of the deltas produced by :meth:`stream`.
+    seed : int
+        The RNG is reseeded from ``seed`` and the request, so the same
+        request always gets the same delay.
+    """
+
+    def __init__(
+        self,
+        *,
+        reply: Dict[str, Any] | str | None = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        chunk_chars: int = 8,
+        chunk_interval: float = 0.0,
+        seed: int = 0,
+        **_: Any,  # api_key / base_url / client passed by the engine
+    ) -> None:
+        reply = _STUB_REPLY if reply is None else reply
+        self.reply = reply if isinstance(reply, str) else json.dumps(reply)
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_chars = chunk_chars
+        self.chunk_interval = chunk_interval
+        self.seed = seed
+        self.client = None
+        self.calls = 0
+
+    def _delay(self, request: Any) -> float:
+        if not self.jitter:
+            return self.latency
+        digest = hashlib.blake2b(repr(request).encode(), digest_size=8).digest()
+        rng = random.Random(self.seed ^ int.from_bytes(digest, "big"))
+        return max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+
+    def _respond(self, request: Any) -> Tuple[Completion, float]:
+        """``(reply, delay)`` for one call; overridden by replay backends."""
+        self.calls += 1
+        return Completion(self.reply), self._delay(request)
+
+    def generate(
+        self,
+        request: Any,
+        *,
+        model: str,
+        max_tokens: int,
+        client: Any = None,
+        response_format: Any = None,
+        timeout: Optional[float] = None,
+    ) -> Completion:
+        reply, delay = self._respond(request)
+        time.sleep(delay)
+        return reply
+
+    def stream(
+        self,
+        request: Any,
+        *,
+        model: str,
+        max_tokens: int,
+        response_format: Any = None,
+        timeout: Optional[float] = None,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> Iterator[str]:
+        reply, delay = self._respond(request)
+        time.sleep(delay)
+        text = reply.text
+        for i in range(0, len(text), self.chunk_chars):
+            if i and self.chunk_interval:
+                time.sleep(self.chunk_interval)
+            yield text[i : i + self.chunk_chars]
+        if usage is not None:
+            usage.update(reply.usage)
+
+    async def agenerate(
+        self,
+        request: Any,
+        *,
+        model: str,
+        max_tokens: int,
+        client: Any = None,
+        response_format: Any = None,
+        timeout: Optional[float] = None,
+    ) -> Completion:
+        reply, delay = self._respond(request)
+        await asyncio.sleep(delay)
+        return reply
+
+
+@register_backend("replay")
+def _replay_backend(**kwargs: Any) -> Backend:
+    from .replay import ReplayBackend  # imports this module
+
+    return ReplayBackend(**kwargs)
+
+
+@register_backend("gateway")
+def _gateway_backend(**kwargs: Any) -> Backend:
+    from .gateway import GatewayBackend  # imports this module
+
+    return GatewayBackend(**kwargs)
@@ -0,0 +1,168 @@
+"""# vlm_robot_agent/vlm_inference/cache.py
+================================
+Perceptual‑hash frame cache that sits in front of :meth:`VLMInference.infer`.
+
+A robot standing still (or creeping forward) hands almost identical frames to
+the VLM on consecutive ticks.  **FrameCache** stores the last results keyed on
+
+    • a *difference hash* (dHash) of the downscaled grey frame,
+    • an exact context key (goal, perception mode, action‑history digest),
+
+and returns a stored result when a new frame lies within ``max_distance`` bits
+(Hamming distance) of a cached one with the same context.  Entries expire
+after ``ttl`` seconds and the least recently used entry is evicted once
+``max_entries`` is reached.
+
+>>> cache = FrameCache(max_distance=4, ttl=5.0)
+>>> engine = VLMInference(goal="Find the bathroom", cache=cache)
+>>> engine.infer(frame); engine.infer(frame)
+>>> cache.stats()
+{'hits': 1, 'misses': 1, 'evictions': 0, 'expired': 0, 'size': 1}
+"""
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional
+
+from PIL import Image
+
+__all__ = ["FrameCache", "dhash", "hamming"]
+
+
+def dhash(img: Image.Image, hash_size: int = 8) -> int:
+    """Difference hash: compare adjacent pixels of a (size+1)×size grey thumbnail.
+
+    Returns an int with ``hash_size ** 2`` significant bits.
+    """
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    px = small.tobytes()
+    bits = 0
+    row = hash_size + 1
+    for y in range(hash_size):
+        base = y * row
+        for x in range(hash_size):
+            bits = (bits << 1) | (px[base + x] > px[base + x + 1])
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+@dataclass
+class _Entry:
+    phash: int
+    context: Hashable
+    result: Any
+    stamp: float
+
+
+class FrameCache:
+    """LRU + TTL cache of inference results keyed on perceptual hash & context.
+
+    Parameters
+    ----------
+    max_entries : int, default 32
+        Capacity; the least recently used entry is evicted beyond it.
+    ttl : float, default 5.0
+        Seconds an entry stays valid.  ``0`` disables expiry.
+    max_distance : int, default 4
+        Maximum Hamming distance (out of ``hash_size**2`` bits) for a hit.
+    hash_size : int, default 8
+        Side of the dHash grid.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 32,
+        ttl: float = 5.0,
+        max_distance: int = 4,
+        hash_size: int = 8,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    # ------------------------------------------------------------------
+    def phash(self, img: Image.Image) -> int:
+        return dhash(img, self.hash_size)
+
+    def lookup(self, phash: int, context: Hashable) -> Optional[Any]:
+        """Return a deep copy of the closest fresh result, or ``None`` on miss."""
+        with self._lock:
+            return self._lookup(phash, context)
+
+    def _lookup(self, phash: int, context: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        self._expire(now)
+
+        best_id, best_dist = None, self.max_distance + 1
+        for entry_id, entry in self._entries.items():
+            if entry.context != context:
+                continue
+            dist = hamming(phash, entry.phash)
+            if dist < best_dist:
+                best_id, best_dist = entry_id, dist
+                if dist == 0:
+                    break
+
+        if best_id is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best_id)
+        return copy.deepcopy(self._entries[best_id].result)
+
+    def store(self, phash: int, context: Hashable, result: Any) -> None:
+        entry = _Entry(phash, context, copy.deepcopy(result), time.monotonic())
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters used to tune ``max_distance`` / ``ttl``."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "size": len(self._entries),
+        }
+
+    # ------------------------------------------------------------------
+    def _expire(self, now: float) -> None:
+        if not self.ttl:
+            return
+        stale = [k for k, e in self._entries.items() if now - e.stamp > self.ttl]
+        for k in stale:
+            del self._entries[k]
+        self.expired += len(stale)
+
+    def __len__(self) -> int:
+        return len(self._entries)
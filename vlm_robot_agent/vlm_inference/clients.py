@@ -0,0 +1,46 @@
+"""# vlm_robot_agent/vlm_inference/clients.py
+================================
+Process‑wide, pooled OpenAI clients.
+
+Every ``OpenAI()`` instance owns its own httpx connection pool, so each extra
+client pays a fresh TCP + TLS handshake.  :func:`shared_openai_client` returns
+one keep‑alive client per ``(api_key, base_url)`` that the inference engine
+and the conversation manager reuse.
+
+>>> client = shared_openai_client(api_key)
+>>> client is shared_openai_client(api_key)
+True
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+
+__all__ = ["shared_openai_client", "pooled_http_limits"]
+
+_CLIENTS: Dict[Tuple[Optional[str], Optional[str]], OpenAI] = {}
+_LOCK = threading.Lock()
+
+
+def pooled_http_limits() -> httpx.Limits:
+    """Connection‑pool limits tuned for a few concurrent calls per robot."""
+    return httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=60.0)
+
+
+def shared_openai_client(api_key: Optional[str] = None, *, base_url: Optional[str] = None) -> OpenAI:
+    """Return the process‑wide OpenAI client for this key / endpoint."""
+    key = (api_key, base_url)
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,  # retried by :mod:`resilience` (deadline aware)
+                http_client=DefaultHttpxClient(limits=pooled_http_limits()),
+            )
+            _CLIENTS[key] = client
+        return client
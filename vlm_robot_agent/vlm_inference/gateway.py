@@ -0,0 +1,541 @@
+"""# vlm_robot_agent/vlm_inference/gateway.py
+================================
+One inference gateway in front of a fleet of robots.
+
+When every robot process builds its own engine and OpenAI client, the fleet
+shares an API key but nothing else: rate limits hit at random and nobody is
+served first.  **GatewayServer** is a small asyncio HTTP service (TCP or a
+Unix socket) that owns the upstream connections and schedules the fleet's
+requests:
+
+    • shared connection pool – one pooled async client per API key,
+      at most ``max_inflight`` upstream requests at a time,
+    • token buckets          – per API key (``key_rpm``) and per robot
+      (``robot_rpm``); a robot over its budget waits without delaying others,
+    • priority               – robots in interaction mode, or whose last
+      reply was BLOCKED / NEED_HELP, are dispatched first,
+    • coalescing             – identical requests in flight (same model,
+      messages and frame) share a single upstream call.
+
+Robots talk to it through the ``"gateway"`` backend, or through
+:class:`GatewayInference`, a drop‑in :class:`VLMInference` that also sends
+its mode as a priority hint::
+
+    python -m vlm_robot_agent.vlm_inference.gateway --port 8765 --key-rpm 500 --robot-rpm 60
+
+>>> engine = GatewayInference(goal="…", url="http://gateway:8765", robot="tiago-2")
+>>> engine.infer(frame)
+>>> agent = RobotAgent(goal_text="…", provider="gateway",
+...                    backend_options={"url": "http://gateway:8765", "robot": "tiago-2"})
+
+Endpoints: ``POST /v1/generate`` (``{robot, priority, model, max_tokens,
+messages, response_format}`` → ``{text, usage, coalesced}``),
+``GET /stats`` and ``GET /health``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from . import telemetry
+from .backends import Backend, Completion, create_backend
+from .inference import DEFAULT_MODE, ImageInput, InferenceResult, Status, VLMInference
+
+__all__ = [
+    "PRIORITY_NORMAL",
+    "PRIORITY_HIGH",
+    "TokenBucket",
+    "GatewayServer",
+    "GatewayBackend",
+    "GatewayError",
+    "GatewayInference",
+]
+
+logger = logging.getLogger("vlm_gateway")
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+# statuses after which the robot's next request is served first
+_URGENT_STATUSES = {Status.BLOCKED.value, Status.NEED_HELP.value}
+
+
+class GatewayError(RuntimeError):
+    """The gateway rejected the request or the upstream call failed."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code  # HTTP status seen by the client (retries: 429 / 502)
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+
+
+class TokenBucket:
+    """``rate`` tokens per second, at most ``burst`` saved up (``rate <= 0``: unlimited)."""
+
+    def __init__(self, rate: float, burst: float = 1.0) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self._t = time.monotonic()
+
+    def wait_time(self, now: float, n: float = 1.0) -> float:
+        """Seconds until ``n`` tokens are available (0 = now)."""
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self._t) * self.rate)
+        self._t = now
+        return 0.0 if self.tokens >= n else (n - self.tokens) / self.rate
+
+    def take(self, n: float = 1.0) -> None:
+        if self.rate > 0:
+            self.tokens -= n
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class _Upstream:
+    name: str
+    backend: Backend
+    bucket: TokenBucket
+    requests: int = 0
+
+
+@dataclass(order=True)
+class _Job:
+    sort_key: Tuple[int, int]
+    robot: str = field(compare=False)
+    digest: str = field(compare=False)
+    payload: Dict[str, Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued: float = field(compare=False, default_factory=time.monotonic)
+
+
+class GatewayServer:
+    """Schedules fleet requests onto shared upstream backends.
+
+    Parameters
+    ----------
+    api_keys : sequence of str, optional
+        One upstream per key (default: ``OPENAI_API_KEY``); ignored when
+        ``backends`` is given.
+    provider / backend_options :
+        Backend built for every key (``asynchronous=True``).
+    backends : dict, optional
+        Ready upstream backends by name (e.g. ``{"stub": StubBackend()}``).
+    key_rpm / robot_rpm : float
+        Requests per minute per upstream key and per robot (0 = unlimited);
+        ``*_burst`` is how many may be saved up.
+    max_inflight : int
+        Concurrent upstream requests (size of the shared connection pool).
+    max_queue : int
+        Queued requests before new ones get HTTP 429.
+    """
+
+    def __init__(
+        self,
+        *,
+        api_keys: Sequence[str] | None = None,
+        provider: str = "openai",
+        backend_options: Dict[str, Any] | None = None,
+        backends: Dict[str, Backend] | None = None,
+        key_rpm: float = 500.0,
+        key_burst: float = 10.0,
+        robot_rpm: float = 120.0,
+        robot_burst: float = 4.0,
+        max_inflight: int = 16,
+        max_queue: int = 256,
+    ) -> None:
+        if backends is None:
+            keys = list(api_keys or [os.getenv("OPENAI_API_KEY") or ""])
+            backends = {
+                f"key{i}": create_backend(provider, api_key=key or None, asynchronous=True, **(backend_options or {}))
+                for i, key in enumerate(keys)
+            }
+        self.upstreams = [_Upstream(name, b, TokenBucket(key_rpm / 60.0, key_burst)) for name, b in backends.items()]
+        self.robot_rpm = robot_rpm
+        self.robot_burst = robot_burst
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self._robots: Dict[str, TokenBucket] = {}
+        self._urgent: Dict[str, bool] = {}
+        self._queue: List[_Job] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._seq = itertools.count()
+        self._stats = {"requests": 0, "coalesced": 0, "upstream": 0, "errors": 0, "rejected": 0}
+        self._per_robot: Dict[str, int] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._servers: List[asyncio.AbstractServer] = []
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    async def submit(self, robot: str, payload: Dict[str, Any], *, priority: int = PRIORITY_NORMAL) -> Dict[str, Any]:
+        """Queue one chat request; ``{text, usage, coalesced}`` once served."""
+        self._ensure_started()
+        self._stats["requests"] += 1
+        self._per_robot[robot] = self._per_robot.get(robot, 0) + 1
+        digest = _digest(payload)
+        shared = self._inflight.get(digest)
+        if shared is not None:
+            self._stats["coalesced"] += 1
+            telemetry.count("gateway.coalesced")
+            text, usage = await asyncio.shield(shared)
+            return {"text": text, "usage": {}, "coalesced": True}
+        if len(self._queue) >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise GatewayError("gateway queue full", 429)
+
+        if self._urgent.get(robot):
+            priority = max(priority, PRIORITY_HIGH)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[digest] = future
+        self._queue.append(_Job((-priority, next(self._seq)), robot, digest, payload, future))
+        telemetry.count("gateway.requests", priority=priority)
+        self._wake.set()
+        try:
+            text, usage = await asyncio.shield(future)
+        finally:
+            if self._inflight.get(digest) is future:
+                del self._inflight[digest]
+        self._urgent[robot] = _reply_status(text) in _URGENT_STATUSES
+        return {"text": text, "usage": usage, "coalesced": False}
+
+    def _ensure_started(self) -> None:
+        if self._dispatcher is None:
+            self._wake = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_inflight)
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    def _robot_bucket(self, robot: str) -> TokenBucket:
+        bucket = self._robots.get(robot)
+        if bucket is None:
+            bucket = self._robots[robot] = TokenBucket(self.robot_rpm / 60.0, self.robot_burst)
+        return bucket
+
+    def _pick(self) -> Tuple[Optional[_Job], Optional[_Upstream], float]:
+        """Highest‑priority job whose robot and some upstream have a token."""
+        now = time.monotonic()
+        waits = [u.bucket.wait_time(now) for u in self.upstreams]
+        ready = [u for u, w in zip(self.upstreams, waits) if w == 0.0]
+        if not ready:
+            return None, None, min(waits)
+        upstream = min(ready, key=lambda u: u.requests)  # spread over keys
+        soonest = float("inf")
+        self._queue.sort()
+        for i, job in enumerate(self._queue):
+            wait = self._robot_bucket(job.robot).wait_time(now)
+            if wait == 0.0:
+                del self._queue[i]
+                self._robots[job.robot].take()
+                upstream.bucket.take()
+                return job, upstream, 0.0
+            soonest = min(soonest, wait)
+        return None, None, soonest
+
+    async def _dispatch(self) -> None:
+        while True:
+            if not self._queue:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            await self._slots.acquire()
+            job, upstream, wait = self._pick()
+            if job is None:
+                self._slots.release()
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            asyncio.ensure_future(self._run(job, upstream))
+
+    async def _run(self, job: _Job, upstream: _Upstream) -> None:
+        telemetry.observe("gateway.queue_seconds", time.monotonic() - job.enqueued)
+        upstream.requests += 1
+        self._stats["upstream"] += 1
+        p = job.payload
+        try:
+            with telemetry.span("gateway.upstream", key=upstream.name):
+                completion = await upstream.backend.agenerate(
+                    p["messages"],
+                    model=p["model"],
+                    max_tokens=p.get("max_tokens", 2048),
+                    response_format=p.get("response_format"),
+                )
+            job.future.set_result((completion.text, dict(completion.usage)))
+        except Exception as exc:
+            self._stats["errors"] += 1
+            job.future.set_exception(GatewayError(f"upstream {upstream.name}: {exc}", 502))
+        finally:
+            self._slots.release()
+            self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "queued": len(self._queue),
+            "inflight": len(self._inflight),
+            "robots": dict(self._per_robot),
+            "upstreams": {u.name: u.requests for u in self.upstreams},
+        }
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, *, path: str | None = None) -> None:
+        """Listen on ``host:port`` (``port=None``: no TCP) and/or the Unix socket ``path``."""
+        self._ensure_started()
+        if port is not None:
+            server = await asyncio.start_server(self._handle, host, port)
+            self.port = server.sockets[0].getsockname()[1]
+            self._servers.append(server)
+        if path is not None:
+            self._servers.append(await asyncio.start_unix_server(self._handle, path))
+        logger.info("Gateway listening (port=%s, socket=%s)", getattr(self, "port", None), path)
+
+    async def serve_forever(self) -> None:
+        await asyncio.gather(*(s.serve_forever() for s in self._servers))
+
+    async def close(self) -> None:
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        for upstream in self.upstreams:
+            await upstream.backend.aclose()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, target = line.decode("latin-1").split()[:2]
+                headers: Dict[str, str] = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+                status, reply = await self._route(method, target.split("?", 1)[0], body)
+                data = json.dumps(reply, ensure_ascii=False).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        if method == "GET" and path == "/health":
+            return 200, {"ok": True}
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method != "POST" or path != "/v1/generate":
+            return 404, {"error": f"no route {method} {path}"}
+        try:
+            request = json.loads(body)
+            payload = {k: request.get(k) for k in ("model", "max_tokens", "messages", "response_format")}
+            if not payload["model"] or not payload["messages"]:
+                raise ValueError("model and messages are required")
+        except ValueError as exc:
+            return 400, {"error": str(exc)}
+        try:
+            reply = await self.submit(
+                str(request.get("robot") or "anonymous"), payload, priority=int(request.get("priority") or 0)
+            )
+        except GatewayError as exc:
+            return exc.status_code or 502, {"error": str(exc)}
+        return 200, reply
+
+
+def _digest(payload: Dict[str, Any]) -> str:
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+def _reply_status(text: str) -> Optional[str]:
+    """``status`` of a JSON reply (None if it does not parse)."""
+    try:
+        return json.loads(text[text.index("{") : text.rindex("}") + 1]).get("status")
+    except (ValueError, AttributeError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Client side
+# ---------------------------------------------------------------------------
+
+
+class GatewayBackend(Backend):
+    """Backend that forwards requests to a :class:`GatewayServer`.
+
+    ``priority`` is sent with every request (see :class:`GatewayInference`);
+    ``uds`` connects over a Unix socket instead of TCP.
+    """
+
+    def __init__(
+        self,
+        *,
+        url: str | None = None,
+        robot: str | None = None,
+        uds: str | None = None,
+        timeout: float = 60.0,
+        asynchronous: bool = False,
+        **_: Any,  # api_key / base_url: the gateway holds the keys
+    ) -> None:
+        self.url = (url or os.getenv("VLM_GATEWAY_URL") or DEFAULT_URL).rstrip("/")
+        self.robot = robot or f"{socket.gethostname()}-{os.getpid()}"
+        self.priority = PRIORITY_NORMAL
+        self.client = None
+        if asynchronous:
+            transport = httpx.AsyncHTTPTransport(uds=uds) if uds else None
+            self._aclient = httpx.AsyncClient(base_url=self.url, timeout=timeout, transport=transport)
+        else:
+            transport = httpx.HTTPTransport(uds=uds) if uds else None
+            self._client = httpx.Client(base_url=self.url, timeout=timeout, transport=transport)
+
+    def _body(self, request: Any, model: str, max_tokens: int, response_format: Any) -> Dict[str, Any]:
+        return {
+            "robot": self.robot,
+            "priority": self.priority,
+            "model": model,
+            "max_tokens": max_tokens,
+            "messages": request,
+            "response_format": response_format,
+        }
+
+    def _reply(self, resp: httpx.Response) -> Completion:
+        data = resp.json()
+        if resp.status_code != 200:
+            raise GatewayError(f"gateway HTTP {resp.status_code}: {data.get('error')}", resp.status_code)
+        return Completion(data["text"], data.get("usage") or {})
+
+    def generate(
+        self,
+        request: Any,
+        *,
+        model: str,
+        max_tokens: int,
+        client: Any = None,
+        response_format: Any = None,
+        timeout: Optional[float] = None,
+    ) -> Completion:
+        resp = self._client.post(
+            "/v1/generate",
+            json=self._body(request, model, max_tokens, response_format),
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+        return self._reply(resp)
+
+    async def agenerate(
+        self,
+        request: Any,
+        *,
+        model: str,
+        max_tokens: int,
+        client: Any = None,
+        response_format: Any = None,
+        timeout: Optional[float] = None,
+    ) -> Completion:
+        if not hasattr(self, "_aclient"):
+            return await super().agenerate(
+                request, model=model, max_tokens=max_tokens, response_format=response_format, timeout=timeout
+            )
+        resp = await self._aclient.post(
+            "/v1/generate",
+            json=self._body(request, model, max_tokens, response_format),
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+        return self._reply(resp)
+
+    async def aclose(self) -> None:
+        if hasattr(self, "_aclient"):
+            await self._aclient.aclose()
+
+
+class GatewayInference(VLMInference):
+    """:class:`VLMInference` served by a gateway, same ``infer`` signature.
+
+    Requests in interaction mode are sent with :data:`PRIORITY_HIGH`; the
+    gateway itself raises the priority after a BLOCKED / NEED_HELP reply.
+    """
+
+    def __init__(
+        self, goal: str, *, url: str | None = None, robot: str | None = None, uds: str | None = None, **kwargs: Any
+    ) -> None:
+        options = {"url": url, "robot": robot, "uds": uds, **(kwargs.pop("backend_options", None) or {})}
+        super().__init__(goal, provider="gateway", backend_options=options, **kwargs)
+
+    def infer(self, image: ImageInput, *, mode: str = DEFAULT_MODE, **kwargs: Any) -> InferenceResult:  # type: ignore[override]
+        self.backend.priority = PRIORITY_HIGH if mode != DEFAULT_MODE else PRIORITY_NORMAL
+        return super().infer(image, mode=mode, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Shared VLM inference gateway for a robot fleet",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="also listen on this Unix socket")
+    parser.add_argument("--provider", default="openai", help="upstream backend")
+    parser.add_argument("--base-url", help="OpenAI-compatible upstream endpoint")
+    parser.add_argument("--api-key", action="append", default=[], help="upstream key (repeatable); default OPENAI_API_KEY")
+    parser.add_argument("--key-rpm", type=float, default=500.0, help="requests/min per key (0 = unlimited)")
+    parser.add_argument("--robot-rpm", type=float, default=120.0, help="requests/min per robot (0 = unlimited)")
+    parser.add_argument("--max-inflight", type=int, default=16, help="concurrent upstream requests")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+
+    async def _main() -> None:
+        gateway = GatewayServer(
+            api_keys=args.api_key or None,
+            provider=args.provider,
+            backend_options={"base_url": args.base_url} if args.base_url else None,
+            key_rpm=args.key_rpm,
+            robot_rpm=args.robot_rpm,
+            max_inflight=args.max_inflight,
+        )
+        await gateway.start(args.host, args.port, path=args.socket)
+        try:
+            await gateway.serve_forever()
+        finally:
+            await gateway.close()
+
+    asyncio.run(_main())
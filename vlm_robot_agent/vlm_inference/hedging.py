@@ -0,0 +1,248 @@
+"""# vlm_robot_agent/vlm_inference/hedging.py
+================================
+Hedged requests: *first valid response wins*.
+
+The tail latency of a single chat completion decides how often the robot
+stops and waits.  With a :class:`HedgePolicy` attached, :class:`Hedger`
+
+    1. sends the primary request,
+    2. if nothing has come back after the ``delay_quantile`` of recent
+       latencies, sends a duplicate (optionally to another model / endpoint,
+       see :class:`HedgeTarget`), up to ``max_hedges`` times,
+    3. returns the first response accepted by the validator (the engine's
+       ``_parse_response``) and cancels the others.
+
+Hedges are rate‑limited by ``budget_per_minute`` so p99 drops without
+doubling the average cost.  Win / loss counters are in :meth:`Hedger.stats`.
+
+>>> engine = VLMInference(goal="…", hedge=HedgePolicy(delay_quantile=0.9, max_hedges=1))
+>>> engine.hedger.stats()
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from . import telemetry
+
+__all__ = ["HedgeTarget", "HedgePolicy", "Hedger"]
+
+logger = logging.getLogger("vlm_hedging")
+
+R = TypeVar("R")
+
+
+@dataclass
+class HedgeTarget:
+    """Where a hedge goes; ``None`` fields fall back to the engine's own."""
+
+    model: Optional[str] = None
+    client: Any = None  # OpenAI (sync engine) / AsyncOpenAI (async engine)
+
+
+@dataclass
+class HedgePolicy:
+    delay_quantile: float = 0.9       # hedge after this quantile of recent latencies
+    initial_delay: float = 2.0        # seconds, used until ``min_samples`` are known
+    min_delay: float = 0.2
+    min_samples: int = 10
+    window: int = 100                 # latency samples kept
+    max_hedges: int = 1               # duplicates per request
+    budget_per_minute: int = 20       # hedges allowed in any 60 s window
+    targets: List[HedgeTarget] = field(default_factory=list)  # round-robin for hedges
+
+
+class Hedger:
+    """Runs one logical request as primary + delayed duplicates."""
+
+    def __init__(self, policy: HedgePolicy) -> None:
+        self.policy = policy
+        self._latencies: Deque[float] = deque(maxlen=policy.window)
+        self._spent: Deque[float] = deque()
+        self._lock = threading.Lock()
+        # losers cannot be interrupted in threads; leave room for stragglers
+        self._pool = ThreadPoolExecutor(
+            max_workers=2 * (1 + policy.max_hedges), thread_name_prefix="vlm-hedge"
+        )
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedges_sent = 0
+        self.primary_wins = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+        self.failures = 0
+
+    # ------------------------------------------------------------------
+    def delay(self) -> float:
+        """Current hedge delay: ``delay_quantile`` of recent latencies."""
+        p = self.policy
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < p.min_samples:
+            return p.initial_delay
+        idx = min(len(samples) - 1, int(p.delay_quantile * len(samples)))
+        return max(p.min_delay, samples[idx])
+
+    def stats(self) -> Dict[str, float]:
+        delay = self.delay()
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedges_sent": self.hedges_sent,
+                "primary_wins": self.primary_wins,
+                "hedge_wins": self.hedge_wins,
+                "budget_denied": self.budget_denied,
+                "failures": self.failures,
+                "delay": delay,
+            }
+
+    # ------------------------------------------------------------------
+    def call(self, attempt: Callable[[Optional[HedgeTarget]], R], accept: Callable[[R], Any]) -> R:
+        """Blocking hedged call; returns the first accepted reply.
+
+        ``attempt(target)`` performs one request (``None`` = primary) and
+        ``accept(reply)`` raises if the reply is unusable.  Each attempt
+        should keep its own state (e.g. token usage) in the reply it returns:
+        losers may still be running when the winner is returned.
+        """
+        with self._lock:
+            self.requests += 1
+        delay = self.delay()
+        started: Dict[Any, int] = {}
+        last_exc: Optional[BaseException] = None
+        sent = 0
+
+        def launch(n: int) -> None:
+            started[self._pool.submit(attempt, self._target(n))] = n
+
+        launch(0)
+        t_first = time.monotonic()
+        can_hedge = True
+        while started:
+            timeout = None
+            if can_hedge and sent < self.policy.max_hedges:
+                timeout = max(0.0, t_first + delay * (sent + 1) - time.monotonic())
+            done, _ = wait(list(started), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                can_hedge = self._hedge_allowed(sent)
+                if can_hedge:
+                    sent += 1
+                    launch(sent)
+                continue
+            for fut in done:
+                n = started.pop(fut)
+                try:
+                    reply = fut.result()
+                    accept(reply)
+                except Exception as exc:  # failed or unparsable: let the others race
+                    last_exc = exc
+                    logger.debug("Hedge attempt %d rejected: %s", n, exc)
+                    if not started and can_hedge and self._hedge_allowed(sent):
+                        sent += 1
+                        launch(sent)
+                    continue
+                for other in started:
+                    other.cancel()
+                self._win(n, time.monotonic() - t_first, sent)
+                return reply
+        self._lose(sent)
+        raise last_exc if last_exc else RuntimeError("hedged call produced no response")
+
+    async def acall(
+        self, attempt: Callable[[Optional[HedgeTarget]], Awaitable[R]], accept: Callable[[R], Any]
+    ) -> R:
+        """asyncio variant of :meth:`call`; losing requests are truly cancelled."""
+        with self._lock:
+            self.requests += 1
+        delay = self.delay()
+        started: Dict[asyncio.Task, int] = {}
+        last_exc: Optional[BaseException] = None
+        sent = 0
+
+        def launch(n: int) -> None:
+            started[asyncio.ensure_future(attempt(self._target(n)))] = n
+
+        launch(0)
+        t_first = time.monotonic()
+        can_hedge = True
+        try:
+            while started:
+                timeout = None
+                if can_hedge and sent < self.policy.max_hedges:
+                    timeout = max(0.0, t_first + delay * (sent + 1) - time.monotonic())
+                done, _ = await asyncio.wait(list(started), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    can_hedge = self._hedge_allowed(sent)
+                    if can_hedge:
+                        sent += 1
+                        launch(sent)
+                    continue
+                for task in done:
+                    n = started.pop(task)
+                    try:
+                        reply = task.result()
+                        accept(reply)
+                    except Exception as exc:
+                        last_exc = exc
+                        logger.debug("Hedge attempt %d rejected: %s", n, exc)
+                        if not started and can_hedge and self._hedge_allowed(sent):
+                            sent += 1
+                            launch(sent)
+                        continue
+                    self._win(n, time.monotonic() - t_first, sent)
+                    return reply
+        finally:
+            for task in started:
+                task.cancel()
+        self._lose(sent)
+        raise last_exc if last_exc else RuntimeError("hedged call produced no response")
+
+    # ------------------------------------------------------------------
+    def _target(self, n: int) -> Optional[HedgeTarget]:
+        targets = self.policy.targets
+        if n == 0 or not targets:
+            return None
+        return targets[(n - 1) % len(targets)]
+
+    def _hedge_allowed(self, sent: int) -> bool:
+        if sent >= self.policy.max_hedges:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._spent and now - self._spent[0] > 60.0:
+                self._spent.popleft()
+            if len(self._spent) >= self.policy.budget_per_minute:
+                self.budget_denied += 1
+                return False
+            self._spent.append(now)
+            self.hedges_sent += 1
+        telemetry.count("vlm.hedges")
+        return True
+
+    def _win(self, n: int, latency: float, sent: int) -> None:
+        # ``latency`` runs from the primary's launch: a hedge that wins is
+        # still a slow request, and must not pull the delay estimate down
+        with self._lock:
+            self._latencies.append(latency)
+            if sent:
+                self.hedged += 1
+            if n == 0:
+                self.primary_wins += 1
+            else:
+                self.hedge_wins += 1
+        if n:
+            telemetry.count("vlm.hedge_wins")
+
+    def _lose(self, sent: int) -> None:
+        with self._lock:
+            if sent:
+                self.hedged += 1
+            self.failures += 1
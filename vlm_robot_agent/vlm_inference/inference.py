@@ -2,7 +2,8 @@
 ================================
 Vision‑Language‑Model (VLM) Inference engine specialised for indoor robot
 navigation & interaction.  Works either against the OpenAI Vision model
-(“GPT‑4o” family) via API or against a pluggable local model (future).
+(“GPT‑4o” family) via API or against any backend of the provider registry
+(OpenAI‑compatible local servers, an in‑process stub – see `backends`).
 
 The class **VLMInference** receives a single image (or path / ndarray), a
 high‑level *goal* string (e.g. "Enter office 42"), and optional action
@@ -15,7 +16,7 @@ history.  It returns a *structured JSON‐like dict* with:
     • status – enum Status
     • error – diagnostic field (empty if OK)
 
-The file is 100 % self‑contained; no external project imports besides
+Besides the sibling helpers of this package (e.g. `cache`) it only imports
 `openai`, `Pillow`, `numpy`, and standard lib.  Can be used stand‑alone as:
 
 >>> from vlm_inference.inference import VLMInference
@@ -27,32 +28,61 @@ from __future__ import annotations
 
 import base64
 import io
+import itertools
 import json
 import logging
 import os
+import re
+import threading
 import time
-from collections import deque
+from dataclasses import dataclass, field
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, TypedDict, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypedDict, Union
 from importlib import resources
 
 import numpy as np
 import yaml  # optional: if you want YAML config files
 from dotenv import load_dotenv
-from openai import OpenAI
 from PIL import Image, ImageDraw
 
+from .backends import Backend, ChatPrompt, create_backend, strip_json_text
+from .cache import FrameCache
+from .encoding import EncodedImage, EncodeOptions, ImageEncoder
+from . import telemetry
+from .hedging import HedgePolicy, Hedger, HedgeTarget
+from .history import HistoryRecord, HistoryRing
+from .resilience import ResilientCaller, RetryPolicy
+from .schema import repair_json, response_format, strip_nulls, validate_partial, validate_result
+from .streaming import IncrementalActionParser
+
 __all__ = [
     "Status",
     "ActionParameters",
     "Action",
     "InferenceResult",
+    "CallContext",
+    "ImageInput",
     "VLMInference",
+    "ndarray_to_pil",
 ]
 
 
 PROMPT_FILE_JSON = "navigation_prompts.json"
+# Packaged prompt file per perception mode.
+PROMPT_FILES = {
+    "navigation": PROMPT_FILE_JSON,
+    "interaction": "interaction_prompts.json",
+}
+DEFAULT_MODE = "navigation"
+# Prompt line describing the LEFT/CENTER/RIGHT guide-lines, dropped when the
+# image was sent without them.
+_GUIDE_NOTE = re.compile(r"^\[Note:[^\n]*guide-lines[^\n]*\]\n", re.MULTILINE)
+
+# Anything ``infer`` accepts: a path, a PIL image, an ndarray (see
+# ``channel_order``), pre‑encoded JPEG bytes or an already prepared image.
+ImageInput = Union[str, Path, Image.Image, np.ndarray, bytes, EncodedImage]
 
 
 ###############################################################################
@@ -89,6 +119,29 @@ def pil_to_data_url(img: Image.Image, fmt: str = "JPEG") -> str:
     img.save(buff, format=fmt)
     return f"data:image/{fmt.lower()};base64,{base64.b64encode(buff.getvalue()).decode()}"
 
+
+def ndarray_to_pil(arr: np.ndarray, channel_order: str = "RGB") -> Image.Image:
+    """Wrap a uint8 HxW / HxWx3 / HxWx4 array as a PIL image in a single copy.
+
+    The channel swap for ``channel_order="BGR"`` is done by Pillow's raw
+    decoder while copying, so no intermediate ``cvtColor`` array is built.
+    """
+    order = channel_order.upper()
+    if order not in ("RGB", "BGR"):
+        raise ValueError(f"channel_order must be 'RGB' or 'BGR', got {channel_order!r}")
+    if arr.dtype != np.uint8:
+        raise TypeError(f"Expected uint8 image array, got {arr.dtype}")
+    arr = np.ascontiguousarray(arr)
+    h, w = arr.shape[:2]
+    if arr.ndim == 2:
+        return Image.frombuffer("L", (w, h), arr, "raw", "L", 0, 1)
+    channels = arr.shape[2]
+    if channels == 3:
+        return Image.frombuffer("RGB", (w, h), arr, "raw", order, 0, 1)
+    if channels == 4:
+        return Image.frombuffer("RGBA", (w, h), arr, "raw", order + "A", 0, 1)
+    raise ValueError(f"Unsupported channel count: {channels}")
+
 ###############################################################################
 # TypedDicts & Enums                                                          #
 ###############################################################################
@@ -96,6 +149,7 @@ def pil_to_data_url(img: Image.Image, fmt: str = "JPEG") -> str:
 
 class Status(str, Enum):
     OK = "OK"
+    WAITING = "WAITING"
     BLOCKED = "BLOCKED"
     ERROR = "ERROR"
     NEED_HELP = "NEED_HELP"
@@ -120,6 +174,7 @@ class Action(TypedDict):
     parameters: ActionParameters
     Goal_observed: str
     where_goal: str
+    person_moved: str  # interaction mode only
     obstacle_avoidance_strategy: str
 
 
@@ -139,17 +194,34 @@ class HistoryItem(TypedDict):
     status: Status
 
 
+@dataclass
+class CallContext:
+    """Prompt, raw reply, stage timings and token usage of one :meth:`VLMInference.infer` call."""
+
+    prompt: str | ChatPrompt | None = None
+    raw: str | None = None  # None on a cache hit or error
+    timings: Dict[str, float] = field(default_factory=dict)
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+@lru_cache(maxsize=None)
+def _packaged_prompts(filename: str) -> Dict[str, Any]:
+    with resources.files("vlm_robot_agent.prompts").joinpath(filename).open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
 ###############################################################################
 # Settings & Exceptions                                                       #
 ###############################################################################
 
 
 class VLMSettings:
-    """Simple .env‑based settings (only OpenAI‑key for now)."""
+    """Simple .env‑based settings (API key and optional endpoint)."""
 
     def __init__(self) -> None:
         load_dotenv()
         self.api_key = os.getenv("OPENAI_API_KEY")
+        self.base_url = os.getenv("VLM_BASE_URL")  # OpenAI‑compatible server
 
 
 class VLMInferenceError(Exception):
@@ -162,7 +234,41 @@ class VLMInferenceError(Exception):
 
 
 class VLMInference:
-    """High‑level wrapper that embeds: prompt → image → call LLM → parse JSON."""
+    """High‑level wrapper that embeds: prompt → image → call LLM → parse JSON.
+
+    One engine serves every perception *mode* ("navigation", "interaction"):
+    each mode has its own prompt template (loaded lazily from
+    :data:`PROMPT_FILES`) and its own history buffer, while the client, the
+    encoder and the frame cache are shared.
+
+    ``provider`` names a backend of the registry in :mod:`backends`
+    ("openai", "local", "stub", …); ``base_url`` points the OpenAI backend at
+    any compatible server, and ``backend`` injects a ready instance.
+
+    ``prompt_layout="prefix_stable"`` (default) sends a constant system
+    message, then the goal, then history + image, so the provider can reuse
+    the cached prefix; ``"legacy"`` formats goal and history into the
+    template as one user block.  ``history_format="compact"`` renders history
+    as short ``key=value`` lines instead of dict reprs; each line is rendered
+    once, when its entry enters the :class:`history.HistoryRing`.  Token usage –
+    including ``cached_tokens`` – is summed in :meth:`usage_stats`.
+
+    ``structured_output=True`` sends the :class:`InferenceResult` JSON schema
+    as ``response_format`` and rejects replies that violate it; ``repair=True``
+    runs the local fixer of :mod:`schema` on malformed JSON before the tick
+    is declared an error.  A truncated reply keeps only its complete values;
+    if its ``status`` was cut off it comes out as NEED_HELP, never OK.  See
+    :meth:`parse_stats`.
+
+    Every request goes through a :class:`resilience.ResilientCaller`:
+    ``retry`` (a :class:`RetryPolicy`; ``False`` = bare calls) sets the call
+    budget, backoff and circuit breaker.  While the endpoint's circuit is
+    open, :meth:`infer` returns a status ERROR result at once, before any
+    encoding.  See :meth:`resilience_stats`.
+    """
+
+    #: build asyncio clients (set by :class:`AsyncVLMInference`)
+    _asynchronous = False
 
     def __init__(
         self,
@@ -171,154 +277,529 @@ class VLMInference:
         prompt_path: str | Path | None = None,
         history_size: int = 6,
         settings: VLMSettings | None = None,
+        cache: FrameCache | None = None,
+        encoder: ImageEncoder | EncodeOptions | None = None,
+        client: Any | None = None,
+        model: str = "gpt-4o-mini",
+        hedge: HedgePolicy | None = None,
+        base_url: str | None = None,
+        backend: Backend | None = None,
+        backend_options: Dict[str, Any] | None = None,
+        prompt_layout: str = "prefix_stable",
+        history_format: str = "legacy",
+        structured_output: bool = False,
+        repair: bool = False,
+        retry: RetryPolicy | bool = True,
     ) -> None:
         self.goal = goal
+        self.model = model
         self.provider = provider
         self.settings = settings or VLMSettings()
-        self.action_history: deque[HistoryItem] = deque(maxlen=history_size)
-
-        if provider != "openai":
-            raise NotImplementedError("Only provider='openai' implemented for now")
-        if not self.settings.api_key:
-            raise VLMInferenceError("OPENAI_API_KEY env‑var missing")
-
-        self.client = OpenAI(api_key=self.settings.api_key)
-        self.base_prompt_template = self._load_prompt(prompt_path)
+        self.history_size = history_size
+        self._histories: Dict[str, HistoryRing[HistoryRecord]] = {}
+        self._prompts: Dict[str, str] = {}
+        self.cache = cache
+        self.encoder = encoder if isinstance(encoder, ImageEncoder) else ImageEncoder(encoder)
+        self.last_timings: Dict[str, float] = {}
+        # prompt and reply of the latest recorded request (``last_raw`` is None
+        # on a cache hit); speculative ``record_history=False`` calls keep theirs
+        # in their own :class:`CallContext`
+        self.last_prompt: str | ChatPrompt | None = None
+        self.last_raw: str | None = None
+        self.hedger = Hedger(hedge) if hedge is not None else None
+        if prompt_layout not in ("prefix_stable", "legacy"):
+            raise ValueError(f"Unknown prompt_layout '{prompt_layout}'")
+        if history_format not in ("legacy", "compact"):
+            raise ValueError(f"Unknown history_format '{history_format}'")
+        self.prompt_layout = prompt_layout
+        self.history_format = history_format
+        self._systems: Dict[Tuple[str, bool], str] = {}
+        self.last_usage: Dict[str, int] = {}
+        self._usage = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+        self._usage_lock = threading.Lock()  # hedge attempts finish on pool threads
+        self.structured_output = structured_output
+        self.repair = repair
+        self._response_format = response_format() if structured_output else None
+        self._parse = {"ok": 0, "repaired": 0, "invalid": 0, "failed": 0}
+
+        self.backend = backend if backend is not None else self._make_backend(client, base_url, backend_options)
+        self.resilience: ResilientCaller | None = None
+        if retry is not False:
+            endpoint = getattr(self.backend, "base_url", None) or getattr(self.backend, "url", None) or provider
+            self.resilience = ResilientCaller(retry if isinstance(retry, RetryPolicy) else None, endpoint=endpoint)
+        if prompt_path is not None:
+            self._prompts[DEFAULT_MODE] = self._load_prompt(prompt_path)
         logger.info("VLMInference ready (goal=%s)", goal)
 
+    @property
+    def client(self) -> Any:
+        """HTTP client of the backend (``None`` for in‑process backends)."""
+        return getattr(self.backend, "client", None)
+
+    @client.setter
+    def client(self, value: Any) -> None:
+        self.backend.client = value
+
+    @property
+    def action_history(self) -> HistoryRing[HistoryRecord]:
+        """History of the default (navigation) mode."""
+        return self.history(DEFAULT_MODE)
+
+    @property
+    def base_prompt_template(self) -> str:
+        return self.prompt_template(DEFAULT_MODE)
+
+    def history(self, mode: str = DEFAULT_MODE) -> HistoryRing[HistoryRecord]:
+        hist = self._histories.get(mode)
+        if hist is None:
+            hist = self._histories[mode] = HistoryRing(self.history_size)
+        return hist
+
+    def prompt_template(self, mode: str = DEFAULT_MODE) -> str:
+        tpl = self._prompts.get(mode)
+        if tpl is None:
+            if mode not in PROMPT_FILES:
+                raise VLMInferenceError(f"Unknown perception mode '{mode}'")
+            tpl = self._prompts[mode] = self._load_prompt(None, prompt_file=PROMPT_FILES[mode])
+        return tpl
+
     # ---------------------------------------------------------------------
     # Public API
     # ---------------------------------------------------------------------
 
-    def infer(self, image: Union[str, Path, Image.Image, np.ndarray]) -> InferenceResult:
-        """Run full cycle and return parsed dict.  Handles any exception -> status ERROR."""
+    def infer(
+        self,
+        image: ImageInput,
+        *,
+        channel_order: str = "RGB",
+        mode: str = DEFAULT_MODE,
+        record_history: bool = True,
+        on_action: Optional[Callable[[Action], None]] = None,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        context: CallContext | None = None,
+    ) -> InferenceResult:
+        """Run full cycle and return parsed dict.  Handles any exception -> status ERROR.
+
+        ``channel_order`` ("RGB" | "BGR") declares the layout of ndarray
+        input, so OpenCV frames need no ``cvtColor``.  ``bytes`` are taken as
+        an already encoded JPEG (e.g. MJPEG cameras) and sent untouched –
+        no decode, annotation or re‑encode, and no frame cache; the prompt
+        then leaves out its note on the guide-lines.
+
+        With a :class:`FrameCache` attached, a frame perceptually close to a
+        recent one (same goal, mode & history) returns the stored result
+        without an API call; history is not extended on a hit.
+
+        ``record_history=False`` leaves history, cache and the ``last_*``
+        fields untouched (used for speculative requests running next to the
+        foreground tick); call :meth:`commit` to adopt the result later.
+        Prompt, raw reply, timings and usage of the call are collected in
+        ``context`` when one is passed.
+
+        With a :class:`HedgePolicy`, slow requests are duplicated and the
+        first reply that parses wins (see :mod:`hedging`).
+
+        Passing ``on_action`` (or ``on_chunk``) switches to a streamed
+        completion: each element of ``actions`` is handed to ``on_action`` as
+        soon as it is complete, before the rest of the JSON arrives (see
+        :mod:`streaming`).  The returned result is the same as without it.
+        Streamed requests are not hedged.
+        """
+        ctx = context if context is not None else CallContext()
         try:
-            data_url = self._prepare_image(image)
-            prompt = self._format_prompt()
-            raw = self._call_llm(data_url, prompt)
-            parsed = self._parse_response(raw)
-            self._maybe_store_history(parsed)
-            return parsed
+            t0 = time.perf_counter()
+            img, owned, encoded = self._ingest(image, channel_order)
+            ctx.timings["decode"] = time.perf_counter() - t0
+            phash = self._phash(img) if img is not None else encoded.phash
+            cached = self._cache_lookup(phash, mode)
+            if cached is not None:
+                telemetry.count("vlm.cache_hits", mode=mode)
+                if on_action is not None:
+                    for action in cached["actions"]:
+                        on_action(action)
+                return cached
+
+            if self.resilience is not None:
+                self.resilience.check()  # circuit open: no encoding, no request
+            if encoded is None:
+                encoded = self._encode_image(img, owned)
+                ctx.timings.update(encoded.timings)
+            prompt = ctx.prompt = self._build_prompt(mode, guides=encoded.annotated)
+            t0 = time.perf_counter()
+            if on_action is not None or on_chunk is not None:
+                raw = self._stream_llm(encoded, prompt, ctx, on_action, on_chunk)
+            elif self.hedger is not None:
+                raw = self._hedged_llm(encoded, prompt, ctx)
+            else:
+                raw = self._call_llm(encoded, prompt, ctx)
+            ctx.timings["request"] = time.perf_counter() - t0
+            result = self._complete(raw, phash, ctx, mode, record=record_history)
+            self._report_timings(ctx, mode)
+            return result
         except Exception as exc:
             logger.exception("Inference failed: %s", exc)
-            return {
-                "actions": [],
-                "description": f"Error: {exc}",
-                "obstacles": [],
-                "current_environment_type": "UNKNOWN",
-                "status": Status.ERROR,
-                "error": str(exc),
-            }
+            telemetry.count("vlm.errors", kind=type(exc).__name__, mode=mode)
+            return self._error_result(exc)
+        finally:
+            if record_history:
+                self._publish(ctx)
+
+    @staticmethod
+    def _error_result(exc: Exception) -> InferenceResult:
+        return {
+            "actions": [],
+            "description": f"Error: {exc}",
+            "obstacles": [],
+            "current_environment_type": "UNKNOWN",
+            "status": Status.ERROR,
+            "error": str(exc),
+        }
+
+    # ---------------------------------------------------------------------
+    # Cache & completion helpers (shared with the async engine)
+    # ---------------------------------------------------------------------
+
+    def _phash(self, img: Image.Image) -> int | None:
+        return self.cache.phash(img) if self.cache is not None else None
+
+    def _cache_context(self, mode: str) -> tuple[str, str, str]:
+        return (self.goal, mode, self._history_digest(mode))
+
+    def _cache_lookup(self, phash: int | None, mode: str = DEFAULT_MODE) -> InferenceResult | None:
+        if self.cache is None or phash is None:
+            return None
+        cached = self.cache.lookup(phash, self._cache_context(mode))
+        if cached is not None:
+            logger.debug("Frame cache hit (%s)", self.cache.stats())
+        return cached
+
+    def _report_timings(self, ctx: CallContext, mode: str) -> None:
+        """Feed the call's timings to :mod:`telemetry` as ``vlm.<stage>`` spans."""
+        if telemetry.enabled():
+            for stage, seconds in ctx.timings.items():
+                telemetry.record(f"vlm.{stage}", seconds, mode=mode)
+
+    def _publish(self, ctx: CallContext) -> None:
+        """Expose a finished call as ``last_prompt`` / ``last_raw`` / ``last_timings`` / ``last_usage``."""
+        self.last_prompt = ctx.prompt
+        self.last_raw = ctx.raw
+        self.last_timings = ctx.timings
+        self.last_usage = ctx.usage
+
+    def commit(self, result: InferenceResult, mode: str = DEFAULT_MODE) -> None:
+        """Record a result obtained with ``record_history=False`` into history."""
+        self._maybe_store_history(result, mode)
+
+    def _complete(
+        self, raw: str, phash: int | None, ctx: CallContext, mode: str = DEFAULT_MODE, record: bool = True
+    ) -> InferenceResult:
+        """Parse raw model text, update history and feed the frame cache."""
+        ctx.raw = raw
+        t0 = time.perf_counter()
+        parsed = self._parse_response(raw, record=True)
+        ctx.timings["parse"] = time.perf_counter() - t0
+        if not record:
+            return parsed
+        self._maybe_store_history(parsed, mode)
+        if self.cache is not None and phash is not None and parsed["status"] != Status.ERROR:
+            # keyed on the history the *next* tick will see, so a still
+            # robot keeps hitting until the TTL expires
+            self.cache.store(phash, self._cache_context(mode), parsed)
+        return parsed
 
     # ---------------------------------------------------------------------
     # Prompt management
     # ---------------------------------------------------------------------
-    def _load_prompt(self, path: str | Path | None, prompt_key: str = "default") -> str:
+    def _load_prompt(
+        self,
+        path: str | Path | None,
+        prompt_key: str = "default",
+        prompt_file: str = PROMPT_FILE_JSON,
+    ) -> str:
         """Return the prompt string either from an explicit file or from the packaged JSON."""
         # 1️⃣  explicit text file wins
         if path is not None:
             return Path(path).read_text(encoding="utf-8")
 
-        # 2️⃣  fallback to packaged JSON
-        
-        with resources.files("vlm_robot_agent.prompts").joinpath(PROMPT_FILE_JSON).open("r", encoding="utf-8") as f:
-            print(f)
-            print("-------------------")
-            data = json.load(f)
+        # 2️⃣  fallback to packaged JSON (parsed once per process)
+        data = _packaged_prompts(prompt_file)
         try:
             return data[prompt_key]["system"]
         except KeyError as exc:
-            raise VLMInferenceError(f"Prompt key '{prompt_key}' not found in {PROMPT_FILE_JSON}") from exc
+            raise VLMInferenceError(f"Prompt key '{prompt_key}' not found in {prompt_file}") from exc
+
+
+    def _build_prompt(self, mode: str = DEFAULT_MODE, *, guides: bool = True) -> str | ChatPrompt:
+        """Prompt for ``mode``; ``guides=False`` when the image carries no guide-lines."""
+        if self.prompt_layout == "legacy":
+            return self._format_prompt(mode, guides=guides)
+        return ChatPrompt(self._system_prompt(mode, guides=guides), self.goal, self._render_history(mode))
+
+    def _system_prompt(self, mode: str = DEFAULT_MODE, *, guides: bool = True) -> str:
+        """Template with placeholders pointing at the later messages (constant)."""
+        system = self._systems.get((mode, guides))
+        if system is None:
+            system = self._systems[(mode, guides)] = self._template(mode, guides).format(
+                goal="(given in the Goal message)",
+                action_history="(given in the Action history message)",
+            )
+        return system
 
+    def _format_prompt(self, mode: str = DEFAULT_MODE, *, guides: bool = True) -> str:
+        history = self._render_history(mode)
+        return self._template(mode, guides).format(goal=self.goal, action_history=history)
 
-    def _format_prompt(self) -> str:
-        history_lines: list[str] = []
-        for i, h in enumerate(self.action_history):
-            a = h["action"]
-            history_lines.append(
-                f"{i+1}. {a['type']} params={a['parameters']} status={h['status'].value} desc={h['description']}"
-            )
-        history = "\n".join(history_lines) if history_lines else "(none)"
-        return self.base_prompt_template.format(goal=self.goal, action_history=history)
+    def _template(self, mode: str, guides: bool) -> str:
+        tpl = self.prompt_template(mode)
+        return tpl if guides else _GUIDE_NOTE.sub("", tpl)
+
+    def _render_history(self, mode: str = DEFAULT_MODE) -> str:
+        return self.history(mode).text()
+
+    def _history_line(self, item: HistoryItem) -> str:
+        """Prompt line of one history entry (numbered by the ring)."""
+        a = item["action"]
+        if self.history_format == "compact":
+            params = " ".join(f"{k}={v}" for k, v in (a["parameters"] or {}).items())
+            return f"{a['type']} {params} | {item['status'].value} | {item['description'][:80]}"
+        return f"{a['type']} params={a['parameters']} status={item['status'].value} desc={item['description']}"
+
+    # ---------------------------------------------------------------------
+    # Usage
+    # ---------------------------------------------------------------------
+
+    def _record_usage(self, ctx: CallContext, usage: Dict[str, int]) -> None:
+        ctx.usage = usage = dict(usage)
+        with self._usage_lock:
+            self._usage["requests"] += 1
+            for k in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+                self._usage[k] += usage.get(k, 0)
+        telemetry.record_usage(usage, source="vlm", model=self.model)
+
+    def usage_stats(self) -> Dict[str, float]:
+        """Summed API token usage; ``cached_ratio`` = cached / prompt tokens."""
+        stats: Dict[str, float] = dict(self._usage)
+        stats["cached_ratio"] = (
+            self._usage["cached_tokens"] / self._usage["prompt_tokens"] if self._usage["prompt_tokens"] else 0.0
+        )
+        return stats
 
     # ---------------------------------------------------------------------
     # Image helpers
     # ---------------------------------------------------------------------
 
-    def _prepare_image(self, image: Union[str, Path, Image.Image, np.ndarray]) -> str:
+    def prepare(self, image: ImageInput, *, channel_order: str = "RGB") -> EncodedImage:
+        """Decode + annotate + encode ``image`` ahead of :meth:`infer`.
+
+        Lets a pipeline encode on its own thread; the returned
+        :class:`EncodedImage` (carrying its perceptual hash when a cache is
+        attached) can then be passed straight to :meth:`infer`.
+        """
+        img, owned, encoded = self._ingest(image, channel_order)
+        if encoded is None:
+            phash = self._phash(img)  # before annotation draws on the buffer
+            encoded = self._encode_image(img, owned)
+            encoded.phash = phash
+        return encoded
+
+    def _ingest(
+        self, image: ImageInput, channel_order: str = "RGB"
+    ) -> tuple[Image.Image | None, bool, EncodedImage | None]:
+        """Return ``(decoded image, owned, ready payload)`` – exactly one is set.
+
+        *owned* tells the encoder it may draw on the image in place.
+        """
+        if isinstance(image, EncodedImage):
+            return None, False, image
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            b64 = base64.b64encode(image).decode()
+            return None, False, EncodedImage(
+                data_url=f"data:image/jpeg;base64,{b64}",
+                detail=self.encoder.options.detail,
+                nbytes=len(image),
+                annotated=False,
+            )
+        return (*self._load_image(image, channel_order), None)
+
+    def _load_image(
+        self, image: Union[str, Path, Image.Image, np.ndarray], channel_order: str = "RGB"
+    ) -> tuple[Image.Image, bool]:
         if isinstance(image, (str, Path)):
-            img = Image.open(image)
-        elif isinstance(image, Image.Image):
-            img = image
-        elif isinstance(image, np.ndarray):
-            img = Image.fromarray(image)
-        else:
-            raise TypeError(f"Unsupported image type: {type(image)}")
-        annotated = annotate_tercios(img)
-        return pil_to_data_url(annotated)
+            return self.encoder.decode(Image.open(image), owned=True), True
+        if isinstance(image, Image.Image):
+            return self.encoder.decode(image), False
+        if isinstance(image, np.ndarray):
+            return ndarray_to_pil(image, channel_order), True
+        raise TypeError(f"Unsupported image type: {type(image)}")
+
+    def _encode_image(self, img: Image.Image, owned: bool = False) -> EncodedImage:
+        return self.encoder.encode(img, owned=owned)
+
+    def _prepare_image(self, image: Union[str, Path, Image.Image, np.ndarray]) -> EncodedImage:
+        return self._encode_image(*self._load_image(image))
 
     # ---------------------------------------------------------------------
-    # OpenAI call
+    # Backend call
     # ---------------------------------------------------------------------
 
-    def _call_llm(self, data_url: str, prompt: str) -> str:
+    def _make_backend(
+        self, client: Any | None, base_url: str | None, options: Dict[str, Any] | None
+    ) -> Backend:
+        kwargs: Dict[str, Any] = {"api_key": self.settings.api_key, "asynchronous": self._asynchronous}
+        base_url = base_url or self.settings.base_url
+        if base_url:
+            kwargs["base_url"] = base_url
+        if client is not None:
+            kwargs["client"] = client
+        kwargs.update(options or {})
+        try:
+            return create_backend(self.provider, **kwargs)
+        except ValueError as exc:
+            raise VLMInferenceError(str(exc)) from exc
+
+    def _build_messages(self, image: EncodedImage, prompt: str | ChatPrompt) -> list[dict[str, Any]]:
+        return self.backend.encode(image, prompt)
+
+    def _resilient(self, attempt: Callable[[Optional[float]], Any]) -> Any:
+        """Run ``attempt(timeout)`` with retries / breaker (bare when ``retry=False``)."""
+        return self.resilience.call(attempt) if self.resilience is not None else attempt(None)
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Attempts, retries, failed calls, fast failures and breaker state."""
+        return self.resilience.stats() if self.resilience is not None else {}
+
+    def _call_llm(
+        self, image: EncodedImage, prompt: str | ChatPrompt, ctx: CallContext, target: HedgeTarget | None = None
+    ) -> str:
         t0 = time.time()
-        resp = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            max_tokens=2048,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": data_url}},
-                    ],
-                }
-            ],
+        messages = self._build_messages(image, prompt)
+        completion = self._resilient(
+            lambda timeout: self.backend.generate(
+                messages,
+                model=(target.model if target is not None else None) or self.model,
+                max_tokens=2048,
+                client=target.client if target is not None else None,
+                response_format=self._response_format,
+                timeout=timeout,
+            )
         )
-        txt = resp.choices[0].message.content
+        self._record_usage(ctx, completion.usage)
         logger.debug("LLM latency %.2fs", time.time() - t0)
-        return txt
+        return completion.text
+
+    def _hedged_llm(self, image: EncodedImage, prompt: str | ChatPrompt, ctx: CallContext) -> str:
+        """Hedged completion; every attempt gets its own context, ``ctx`` the winner's usage."""
+        raw, won = self.hedger.call(lambda target: self._hedge_attempt(image, prompt, target), self._accept_attempt)
+        ctx.usage = won.usage
+        return raw
+
+    def _hedge_attempt(
+        self, image: EncodedImage, prompt: str | ChatPrompt, target: HedgeTarget | None
+    ) -> Tuple[str, CallContext]:
+        attempt = CallContext(prompt=prompt)
+        return self._call_llm(image, prompt, attempt, target), attempt
+
+    def _accept_attempt(self, reply: Tuple[str, CallContext]) -> None:
+        self._parse_response(reply[0])
+
+    def _stream_llm(
+        self,
+        image: EncodedImage,
+        prompt: str | ChatPrompt,
+        ctx: CallContext,
+        on_action: Optional[Callable[[Action], None]] = None,
+        on_chunk: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """Streamed completion; dispatches actions as they close, returns full text."""
+        t0 = time.perf_counter()
+        messages = self._build_messages(image, prompt)
+        usage: Dict[str, int] = {}  # filled by the backend when the stream ends
+
+        def open_stream(timeout: Optional[float]) -> tuple:
+            # retried only until the first delta: later failures would repeat text
+            usage.clear()
+            stream = iter(
+                self.backend.stream(
+                    messages,
+                    model=self.model,
+                    max_tokens=2048,
+                    response_format=self._response_format,
+                    timeout=timeout,
+                    usage=usage,
+                )
+            )
+            return next(stream, ""), stream
+
+        first, stream = self._resilient(open_stream)
+        parser = IncrementalActionParser()
+        for delta in itertools.chain((first,) if first else (), stream):
+            if on_chunk is not None:
+                on_chunk(delta)
+            for action in parser.feed(delta):
+                if parser.emitted == 1:
+                    ctx.timings["first_action"] = time.perf_counter() - t0
+                if on_action is not None:
+                    on_action(self._normalise_action(action))
+        self._record_usage(ctx, usage)
+        logger.debug("LLM stream latency %.2fs", time.perf_counter() - t0)
+        return parser.text
 
     # ---------------------------------------------------------------------
     # Parse & history
     # ---------------------------------------------------------------------
 
-    def _parse_response(self, raw: str) -> InferenceResult:
-        clean = raw.strip()
-
-        # --- elimina bloque ``` … ``` si existe
-        if clean.startswith("```"):
-            clean = clean.split("```", 2)[1].strip()
-
-        # --- elimina prefijo opcional “json” o similar
-        if clean.lower().startswith("json"):
-            idx = clean.find("{")
-            if idx != -1:
-                clean = clean[idx:]          # nos quedamos desde “{” en adelante
+    def parse_stats(self) -> Dict[str, float]:
+        """Replies parsed as‑is / after repair / rejected, and the failure rate."""
+        stats: Dict[str, float] = dict(self._parse)
+        total = sum(self._parse.values())
+        stats["failure_rate"] = (self._parse["invalid"] + self._parse["failed"]) / total if total else 0.0
+        return stats
 
+    def _parse_response(self, raw: str, *, record: bool = False) -> InferenceResult:
+        """Decode ``raw``; ``record`` counts the outcome in :meth:`parse_stats`."""
+        outcome = "ok"
         try:
-            data = json.loads(clean)
-        except json.JSONDecodeError as e:
-            raise VLMInferenceError(
-                f"Invalid JSON from model: {e}; text={clean[:200]}"
-            ) from e
-        
+            data = self.backend.parse(raw)
+        except ValueError as e:
+            data = None
+            if self.repair:
+                try:
+                    data = json.loads(repair_json(raw), strict=False)
+                    outcome = "repaired"
+                except ValueError:
+                    pass
+            if data is None:
+                if record:
+                    self._parse["failed"] += 1
+                    telemetry.count("vlm.parse_failures", outcome="failed")
+                raise VLMInferenceError(
+                    f"Invalid JSON from model: {e}; text={strip_json_text(raw)[:200]}"
+                ) from e
+
+        if self.structured_output:
+            # repaired replies may have lost their trailing keys to truncation
+            errors = (validate_partial if outcome == "repaired" else validate_result)(data)
+            if errors:
+                if record:
+                    self._parse["invalid"] += 1
+                    telemetry.count("vlm.parse_failures", outcome="invalid")
+                raise VLMInferenceError(f"Reply violates output schema: {'; '.join(errors[:3])}")
+            data = strip_nulls(data)
+        if record:
+            self._parse[outcome] += 1
+            if outcome == "repaired":
+                telemetry.count("vlm.parse_repaired")
+        error = ""
+        if outcome == "repaired" and "status" not in data:
+            # cut off before the model committed to a status: do not act on it blindly
+            data["status"] = Status.NEED_HELP.value
+            error = "reply truncated; status missing after repair"
+
         # status
         status = Status(data.get("status", "ERROR"))
 
         # actions normalisation
-        actions: list[Action] = []
-        for a in data.get("actions", []):
-            actions.append(
-                Action(
-                    type=a.get("type", "Navigation"),
-                    parameters=a.get("parameters", {}),
-                    Goal_observed=a.get("Goal_observed", "False"),
-                    where_goal=a.get("where_goal", "FALSE"),
-                    obstacle_avoidance_strategy=a.get("obstacle_avoidance_strategy", ""),
-                )
-            )
+        actions = [self._normalise_action(a) for a in data.get("actions", [])]
 
         return {
             "actions": actions,
@@ -326,19 +807,34 @@ class VLMInference:
             "obstacles": data.get("obstacles", []),
             "current_environment_type": data.get("current_environment_type", "UNKNOWN"),
             "status": status,
-            "error": "",
+            "error": error,
         }
 
-    def _maybe_store_history(self, result: InferenceResult) -> None:
+    @staticmethod
+    def _normalise_action(a: Dict[str, Any]) -> Action:
+        return Action(
+            type=a.get("type", "Navigation"),
+            parameters=a.get("parameters", {}),
+            Goal_observed=a.get("Goal_observed", "False"),
+            where_goal=a.get("where_goal", "FALSE"),
+            person_moved=a.get("person_moved", "False"),
+            obstacle_avoidance_strategy=a.get("obstacle_avoidance_strategy", ""),
+        )
+
+    def _history_digest(self, mode: str = DEFAULT_MODE) -> str:
+        """Short stable digest of the action history (part of the cache key)."""
+        return self.history(mode).digest()
+
+    def _maybe_store_history(self, result: InferenceResult, mode: str = DEFAULT_MODE) -> None:
         if result["actions"] and result["status"] != Status.ERROR:
-            self.action_history.append(
-                HistoryItem(
-                    action=result["actions"][0],
-                    description=result["description"],
-                    current_environment_type=result["current_environment_type"],
-                    status=result["status"],
-                )
+            item = HistoryItem(
+                action=result["actions"][0],
+                description=result["description"],
+                current_environment_type=result["current_environment_type"],
+                status=result["status"],
             )
+            record = HistoryRecord.from_result(item["action"], item["description"], item["current_environment_type"], item["status"])
+            self.history(mode).append(record, self._history_line(item))
 
 
 #/home/edison/Desktop/PhD/vlm_robot_agent/img/1_center.jpg
@@ -0,0 +1,214 @@
+"""# vlm_robot_agent/vlm_inference/replay.py
+================================
+Record agent sessions and replay them offline.
+
+**SessionRecorder** writes one directory per session::
+
+    session/
+        meta.json          goal, model, provider, start time
+        session.jsonl      one line per tick: mode, frame file, prompt,
+                           raw reply, token usage, timings (+ action)
+        frames/000000.jpg  the input frame of every tick, as received
+
+**ReplayBackend** (provider ``"replay"``) serves the recorded raw replies in
+order, so the same engine / planner code runs without network or API spend:
+
+>>> agent = RobotAgent(goal_text="…", recorder="runs/office12")      # record
+>>> engine = VLMInference(goal="…", provider="replay",
+...                       backend_options={"session": "runs/office12"})  # replay
+
+Replay is purely sequential – the *n*‑th request gets the *n*‑th recorded
+reply – so replay with the same frame cache / speculation settings as the
+recording.  ``realtime=True`` also reproduces the recorded request latency.
+"""
+from __future__ import annotations
+
+import base64
+import io
+import json
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from .backends import ChatPrompt, Completion, StubBackend
+from .encoding import EncodedImage
+
+__all__ = ["SessionRecorder", "ReplayBackend", "load_session", "session_frames", "frame_bytes"]
+
+SESSION_FILE = "session.jsonl"
+META_FILE = "meta.json"
+FRAMES_DIR = "frames"
+
+
+def frame_bytes(image: Any, channel_order: str = "RGB") -> Tuple[bytes, str]:
+    """``(file bytes, suffix)`` of any input ``VLMInference.infer`` accepts.
+
+    Paths and pre‑encoded payloads are stored untouched; PIL images and
+    ndarrays are saved as JPEG (quality 95).
+    """
+    if isinstance(image, (str, Path)):
+        path = Path(image)
+        return path.read_bytes(), path.suffix.lower() or ".jpg"
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return bytes(image), ".jpg"
+    if isinstance(image, EncodedImage):
+        header, b64 = image.data_url.split(",", 1)
+        fmt = header.split("/", 1)[1].split(";", 1)[0]
+        return base64.b64decode(b64), "." + ("jpg" if fmt == "jpeg" else fmt)
+    if isinstance(image, np.ndarray):
+        arr = image[..., ::-1] if image.ndim == 3 and channel_order.upper() == "BGR" else image
+        image = Image.fromarray(np.ascontiguousarray(arr[..., :3] if arr.ndim == 3 else arr))
+    if isinstance(image, Image.Image):
+        buf = io.BytesIO()
+        image.convert("RGB").save(buf, format="JPEG", quality=95)
+        return buf.getvalue(), ".jpg"
+    raise TypeError(f"Unsupported image type: {type(image)}")
+
+
+def _prompt_record(prompt: Union[str, ChatPrompt, None]) -> Any:
+    return asdict(prompt) if isinstance(prompt, ChatPrompt) else prompt
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+
+
+class SessionRecorder:
+    """Append‑only writer of a session directory (thread‑safe, flushed per tick)."""
+
+    def __init__(
+        self, directory: str | Path, *, meta: Optional[Dict[str, Any]] = None, save_frames: bool = True
+    ) -> None:
+        self.directory = Path(directory).expanduser()
+        self.save_frames = save_frames
+        (self.directory / FRAMES_DIR).mkdir(parents=True, exist_ok=True)
+        meta_path = self.directory / META_FILE
+        if not meta_path.exists():
+            meta_path.write_text(
+                json.dumps({"created": time.time(), **(meta or {})}, indent=2, ensure_ascii=False),
+                encoding="utf-8",
+            )
+        path = self.directory / SESSION_FILE
+        self.ticks = sum(1 for _ in path.open(encoding="utf-8")) if path.exists() else 0
+        self._file = path.open("a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        frame: Any,
+        *,
+        prompt: Union[str, ChatPrompt, None],
+        raw: Optional[str],
+        timings: Dict[str, float],
+        mode: str = "navigation",
+        channel_order: str = "RGB",
+        usage: Optional[Dict[str, int]] = None,
+        **extra: Any,
+    ) -> int:
+        """Append one tick; returns its index.  ``raw=None`` marks a cache hit."""
+        with self._lock:
+            tick = self.ticks
+            self.ticks += 1
+            frame_name = None
+            if self.save_frames and frame is not None:
+                data, suffix = frame_bytes(frame, channel_order)
+                frame_name = f"{FRAMES_DIR}/{tick:06d}{suffix}"
+                (self.directory / frame_name).write_bytes(data)
+            line = {
+                "tick": tick,
+                "t": time.time(),
+                "mode": mode,
+                "frame": frame_name,
+                "prompt": _prompt_record(prompt),
+                "raw": raw,
+                "usage": usage or {},
+                "timings": timings,
+                **extra,
+            }
+            self._file.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+        return tick
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "SessionRecorder":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def load_session(path: str | Path) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """``(meta, ticks)`` of a session directory (or its ``session.jsonl``)."""
+    path = Path(path).expanduser()
+    directory = path.parent if path.is_file() else path
+    meta_path = directory / META_FILE
+    meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+    with (directory / SESSION_FILE).open(encoding="utf-8") as f:
+        ticks = [json.loads(line) for line in f if line.strip()]
+    return meta, ticks
+
+
+def session_frames(path: str | Path) -> Iterator[Tuple[Dict[str, Any], Optional[Path]]]:
+    """``(tick, frame path)`` pairs in recording order."""
+    path = Path(path).expanduser()
+    directory = path.parent if path.is_file() else path
+    for tick in load_session(directory)[1]:
+        yield tick, (directory / tick["frame"]) if tick.get("frame") else None
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+
+class ReplayBackend(StubBackend):
+    """Serves the raw replies of a recorded session, one per request.
+
+    Parameters
+    ----------
+    session : path
+        Session directory written by :class:`SessionRecorder`.
+    loop : bool, default True
+        Start over after the last reply instead of raising ``RuntimeError``.
+    realtime : bool, default False
+        Sleep the recorded ``request`` time (divided by ``speed``).
+    """
+
+    def __init__(
+        self,
+        *,
+        session: str | Path,
+        loop: bool = True,
+        realtime: bool = False,
+        speed: float = 1.0,
+        chunk_chars: int = 8,
+        chunk_interval: float = 0.0,
+        **_: Any,
+    ) -> None:
+        super().__init__(chunk_chars=chunk_chars, chunk_interval=chunk_interval)
+        self.meta, ticks = load_session(session)
+        self.replies = [t for t in ticks if t.get("raw") is not None]  # cache hits made no request
+        if not self.replies:
+            raise ValueError(f"No recorded replies in session {session}")
+        self.loop = loop
+        self.realtime = realtime
+        self.speed = speed
+        self._lock = threading.Lock()
+
+    def _respond(self, request: Any) -> Tuple[Completion, float]:
+        with self._lock:
+            idx = self.calls
+            if idx >= len(self.replies) and not self.loop:
+                raise RuntimeError(f"Replay session exhausted after {len(self.replies)} replies")
+            self.calls += 1
+        tick = self.replies[idx % len(self.replies)]
+        delay = tick.get("timings", {}).get("request", 0.0) / self.speed if self.realtime else 0.0
+        return Completion(tick["raw"], dict(tick.get("usage") or {})), delay
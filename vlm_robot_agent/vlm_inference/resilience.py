@@ -0,0 +1,325 @@
+"""# vlm_robot_agent/vlm_inference/resilience.py
+================================
+Retries, deadlines and a circuit breaker for model calls.
+
+A bare ``chat.completions.create`` turns every 429 or timeout into a lost
+tick, and keeps hammering an endpoint that is down.  :class:`ResilientCaller`
+wraps one call:
+
+    • the whole call has a *deadline* (``RetryPolicy.budget``, the share of
+      the control‑loop tick it may use); every attempt gets the remaining
+      time as its timeout (``attempt_timeout`` caps it),
+    • retryable failures (429, 408/409, 5xx, timeouts, connection errors)
+      are retried with jittered exponential backoff, waiting at least the
+      server's ``Retry-After``; a retry that could not finish before the
+      deadline is not started,
+    • a :class:`CircuitBreaker` per endpoint, shared by every caller of the
+      process, opens after ``failure_threshold`` consecutive failed calls;
+      while open, calls fail at once with :class:`CircuitOpenError` and the
+      agent falls back to a safe stop, and after ``reset_timeout`` a single
+      probe call is let through to close it again.
+
+>>> caller = ResilientCaller(RetryPolicy(budget=3.0), endpoint="openai")
+>>> reply = caller.call(lambda timeout: client.chat.completions.create(..., timeout=timeout))
+
+Retries, fast failures and breaker transitions are counted in
+:mod:`telemetry` (``llm.retries``, ``llm.fast_fail``, ``llm.breaker``).
+OpenAI clients are built with ``max_retries=0`` so that this layer is the
+only one retrying.
+"""
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+import openai
+
+from . import telemetry
+
+__all__ = [
+    "RetryPolicy",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "DeadlineExceeded",
+    "ResilientCaller",
+    "circuit_breaker",
+    "is_retryable",
+    "retry_after",
+]
+
+logger = logging.getLogger("vlm_resilience")
+
+T = TypeVar("T")
+
+_RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_RETRY_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    httpx.TimeoutException,
+    httpx.TransportError,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+@dataclass
+class RetryPolicy:
+    budget: float = 8.0                    # s per call, all attempts included
+    attempt_timeout: Optional[float] = None  # s per attempt (None = rest of budget)
+    min_attempt: float = 0.5               # s; no attempt with less time left
+    max_attempts: int = 4
+    base_delay: float = 0.25               # s, doubled per retry
+    max_delay: float = 4.0
+    failure_threshold: int = 5             # consecutive failed calls → open
+    reset_timeout: float = 15.0            # s open before a probe is allowed
+
+
+class CircuitOpenError(RuntimeError):
+    """The endpoint's circuit is open; the call was not attempted."""
+
+    def __init__(self, endpoint: str, retry_in: float) -> None:
+        super().__init__(f"circuit open for '{endpoint}', retry in {retry_in:.1f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call budget ran out before a reply arrived."""
+
+
+# ---------------------------------------------------------------------------
+# Error classification
+# ---------------------------------------------------------------------------
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "status_code", None)
+    if code is None and isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+    return code
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient failures worth another attempt (and counted by the breaker)."""
+    code = _status_code(exc)
+    if code is not None:
+        return code in _RETRY_STATUS
+    return isinstance(exc, _RETRY_ERRORS)
+
+
+def retry_after(exc: BaseException) -> float:
+    """Seconds the server asked to wait (``Retry-After[-Ms]``), 0 if none."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return float(getattr(exc, "retry_after", 0.0) or 0.0)
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        value = headers.get("retry-after")
+        if not value:
+            return 0.0
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------------------
+
+
+class CircuitBreaker:
+    """closed → (``threshold`` failures) → open → (``reset_timeout``) → half‑open."""
+
+    def __init__(self, endpoint: str, *, threshold: int = 5, reset_timeout: float = 15.0) -> None:
+        self.endpoint = endpoint
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_in(self) -> float:
+        return max(0.0, self._opened + self.reset_timeout - time.monotonic()) if self.state == "open" else 0.0
+
+    def check(self) -> None:
+        """Raise :class:`CircuitOpenError` unless a call may go out now."""
+        with self._lock:
+            if self.state == "open" and self.retry_in() == 0.0:
+                self._transition("half_open")
+            if self.state == "half_open":
+                if not self._probing:
+                    self._probing = True
+                    return
+            elif self.state == "closed":
+                return
+            retry_in = self.retry_in() or self.reset_timeout
+        telemetry.count("llm.fast_fail", endpoint=self.endpoint)
+        raise CircuitOpenError(self.endpoint, retry_in)
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != "closed":
+                self._transition("closed")
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self._opened = time.monotonic()
+                self._transition("open")
+
+    def release(self) -> None:
+        """Give back a half‑open probe that was not used."""
+        with self._lock:
+            self._probing = False
+
+    def _transition(self, state: str) -> None:
+        logger.warning("Circuit '%s': %s → %s", self.endpoint, self.state, state)
+        self.state = state
+        telemetry.count("llm.breaker", endpoint=self.endpoint, state=state)
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def circuit_breaker(endpoint: str, policy: Optional[RetryPolicy] = None) -> CircuitBreaker:
+    """Process‑wide breaker of ``endpoint`` (created with ``policy`` on first use).
+
+    Every caller of an endpoint shares its breaker, so the first policy's
+    ``failure_threshold`` / ``reset_timeout`` stay in force; a later caller
+    asking for different values gets a warning saying so.
+    """
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(endpoint)
+        if breaker is None:
+            policy = policy or RetryPolicy()
+            breaker = _BREAKERS[endpoint] = CircuitBreaker(
+                endpoint, threshold=policy.failure_threshold, reset_timeout=policy.reset_timeout
+            )
+        elif policy is not None and (policy.failure_threshold, policy.reset_timeout) != (
+            breaker.threshold,
+            breaker.reset_timeout,
+        ):
+            logger.warning(
+                "Circuit '%s' is shared: keeping failure_threshold=%d, reset_timeout=%.1fs "
+                "(asked for %d, %.1fs)",
+                endpoint,
+                breaker.threshold,
+                breaker.reset_timeout,
+                policy.failure_threshold,
+                policy.reset_timeout,
+            )
+        return breaker
+
+
+# ---------------------------------------------------------------------------
+# Caller
+# ---------------------------------------------------------------------------
+
+
+class ResilientCaller:
+    """Runs ``fn(timeout)`` under the retry policy and the endpoint's breaker."""
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, *, endpoint: str = "openai") -> None:
+        self.policy = policy or RetryPolicy()
+        self.endpoint = endpoint
+        self.breaker = circuit_breaker(endpoint, self.policy)
+        self._stats = {"calls": 0, "retries": 0, "failures": 0, "fast_fails": 0}
+
+    def stats(self) -> Dict[str, Any]:
+        """Attempts, retries, failed calls, fast failures and the breaker state."""
+        return {**self._stats, "breaker": self.breaker.state}
+
+    def check(self) -> None:
+        """Fail fast before preparing a request the breaker would refuse."""
+        if self.breaker.state == "open" and self.breaker.retry_in() > 0.0:
+            self._stats["fast_fails"] += 1
+            telemetry.count("llm.fast_fail", endpoint=self.endpoint)
+            raise CircuitOpenError(self.endpoint, self.breaker.retry_in())
+
+    def call(self, fn: Callable[[float], T], *, budget: Optional[float] = None) -> T:
+        deadline = time.monotonic() + (budget or self.policy.budget)
+        attempt = 0
+        while True:
+            timeout = self._start(deadline)
+            attempt += 1
+            try:
+                result = fn(timeout)
+            except Exception as exc:
+                delay = self._failed(exc, attempt, deadline)
+                time.sleep(delay)
+                continue
+            self.breaker.success()
+            return result
+
+    async def acall(self, fn: Callable[[float], Awaitable[T]], *, budget: Optional[float] = None) -> T:
+        deadline = time.monotonic() + (budget or self.policy.budget)
+        attempt = 0
+        while True:
+            timeout = self._start(deadline)
+            attempt += 1
+            try:
+                result = await fn(timeout)
+            except asyncio.CancelledError:
+                self.breaker.release()  # superseded, not a verdict on the endpoint
+                raise
+            except Exception as exc:
+                delay = self._failed(exc, attempt, deadline)
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.success()
+            return result
+
+    # ------------------------------------------------------------------
+    def _start(self, deadline: float) -> float:
+        """Timeout of the next attempt (breaker and deadline permitting)."""
+        try:
+            self.breaker.check()
+        except CircuitOpenError:
+            self._stats["fast_fails"] += 1
+            raise
+        self._stats["calls"] += 1
+        remaining = deadline - time.monotonic()
+        if remaining < self.policy.min_attempt:
+            self.breaker.release()
+            raise DeadlineExceeded(f"no time left for a request to '{self.endpoint}'")
+        return min(remaining, self.policy.attempt_timeout or remaining)
+
+    def _failed(self, exc: Exception, attempt: int, deadline: float) -> float:
+        """Backoff before the next attempt, or re‑raise ``exc``."""
+        if not is_retryable(exc):
+            # a client error (400, 401, bad schema …) says nothing about the
+            # endpoint's health: give back a probe, leave the state alone
+            self.breaker.release()
+            raise exc
+        policy = self.policy
+        backoff = min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1))
+        delay = max(retry_after(exc), random.uniform(backoff / 2, backoff))
+        doomed = time.monotonic() + delay + policy.min_attempt > deadline
+        if attempt >= policy.max_attempts or doomed or self.breaker.state == "half_open":
+            self._stats["failures"] += 1
+            self.breaker.failure()
+            raise exc
+        self._stats["retries"] += 1
+        telemetry.count("llm.retries", endpoint=self.endpoint, error=type(exc).__name__)
+        logger.info("%s from '%s', retry %d in %.2fs", type(exc).__name__, self.endpoint, attempt, delay)
+        return delay
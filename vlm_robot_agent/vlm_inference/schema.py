@@ -0,0 +1,450 @@
+"""# vlm_robot_agent/vlm_inference/schema.py
+================================
+Output schema, validation and local repair of model replies.
+
+Without constraints a single malformed reply (truncated at ``max_tokens``,
+a trailing comma, a ``// comment`` copied from the prompt) turns the whole
+tick into ``Status.ERROR``.  This module offers three cheap layers:
+
+    • :data:`INFERENCE_RESULT_SCHEMA` – the :class:`InferenceResult` shape as
+      JSON Schema, sent as ``response_format`` (:func:`response_format`) so
+      servers with structured outputs constrain decoding to it;
+    • :func:`validate_result` – a validator *compiled once* into nested
+      closures (no ``jsonschema`` dependency, no per‑call schema walking);
+    • :func:`repair_json` – a single‑pass fixer for truncated braces /
+      strings, trailing commas and comments, tried before giving up.
+
+>>> data, repaired = loads_lenient('```json\\n{"actions": [], "status": "OK",')
+>>> data, repaired
+({'actions': [], 'status': 'OK'}, True)
+>>> validate_result(data)
+['$: missing description', '$: missing obstacles', '$: missing current_environment_type']
+
+The schema is written for strict mode, so every key is listed as required;
+keys whose type admits ``null`` may also be *absent* when validating, which
+keeps replies from unconstrained backends valid.  Repaired replies are
+checked with :func:`validate_partial`, which tolerates missing keys.
+
+Run as a script to measure the parse‑failure rate of the strict parser vs.
+repair vs. repair + schema on a corpus of recorded raw replies (JSONL lines
+with a ``raw`` field, or stream recordings from :mod:`streaming`)::
+
+    python -m vlm_robot_agent.vlm_inference.schema replies.jsonl
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .backends import strip_json_text
+
+__all__ = [
+    "INFERENCE_RESULT_SCHEMA",
+    "response_format",
+    "compile_validator",
+    "validate_result",
+    "validate_partial",
+    "repair_json",
+    "loads_lenient",
+    "strip_nulls",
+]
+
+# kept in sync with ``inference.Status`` (not imported: inference imports us)
+STATUS_VALUES = ("OK", "WAITING", "BLOCKED", "ERROR", "NEED_HELP", "FINISHED")
+
+_STR = {"type": "string"}
+_OPT_STR = {"type": ["string", "null"]}
+_OPT_NUM = {"type": ["number", "null"]}
+
+
+def _object(properties: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+ACTION_SCHEMA: Dict[str, Any] = _object(
+    {
+        "type": {"type": "string", "enum": ["Navigation", "Interaction"]},
+        "parameters": _object(
+            {
+                # Navigation
+                "direction": _OPT_STR,
+                "angle": _OPT_NUM,
+                "distance": _OPT_NUM,
+                # Interaction
+                "interaction_type": _OPT_STR,
+                "utterance": _OPT_STR,
+                "gesture": _OPT_STR,
+                "target": _OPT_STR,
+            }
+        ),
+        "Goal_observed": _OPT_STR,
+        "where_goal": _OPT_STR,
+        "person_moved": _OPT_STR,
+        "obstacle_avoidance_strategy": _OPT_STR,
+    }
+)
+
+INFERENCE_RESULT_SCHEMA: Dict[str, Any] = _object(
+    {
+        "actions": {"type": "array", "items": ACTION_SCHEMA},
+        "description": _STR,
+        "obstacles": {"type": "array", "items": _STR},
+        "current_environment_type": _STR,
+        "status": {"type": "string", "enum": list(STATUS_VALUES)},
+    }
+)
+
+
+def response_format(schema: Dict[str, Any] = INFERENCE_RESULT_SCHEMA, name: str = "inference_result") -> Dict[str, Any]:
+    """``response_format`` argument for chat completions (strict JSON schema)."""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+# ---------------------------------------------------------------------------
+# Precompiled validator
+# ---------------------------------------------------------------------------
+
+Check = Callable[[Any, str, List[str]], None]
+
+_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def _nullable(schema: Dict[str, Any]) -> bool:
+    t = schema.get("type")
+    return t == "null" or (isinstance(t, list) and "null" in t)
+
+
+def _compile(schema: Dict[str, Any], partial: bool = False) -> Check:
+    checks: List[Check] = []
+
+    if "type" in schema:
+        names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        preds = tuple(_TYPES[n] for n in names)
+        label = "|".join(names)
+
+        def check_type(v: Any, path: str, errors: List[str]) -> None:
+            if not any(p(v) for p in preds):
+                errors.append(f"{path}: expected {label}, got {type(v).__name__}")
+
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = frozenset(schema["enum"])
+
+        def check_enum(v: Any, path: str, errors: List[str]) -> None:
+            if isinstance(v, str) and v not in allowed:
+                errors.append(f"{path}: {v!r} not in {sorted(allowed)}")
+
+        checks.append(check_enum)
+
+    if "properties" in schema:
+        props = {k: _compile(s, partial) for k, s in schema["properties"].items()}
+        required = () if partial else tuple(
+            k for k in schema.get("required", ()) if not _nullable(schema["properties"][k])
+        )
+        closed = schema.get("additionalProperties") is False
+
+        def check_object(v: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(v, dict):
+                return
+            for k in required:
+                if k not in v:
+                    errors.append(f"{path}: missing {k}")
+            for k, item in v.items():
+                sub = props.get(k)
+                if sub is not None:
+                    sub(item, f"{path}.{k}", errors)
+                elif closed:
+                    errors.append(f"{path}: unexpected key {k}")
+
+        checks.append(check_object)
+
+    if "items" in schema:
+        item_check = _compile(schema["items"], partial)
+
+        def check_items(v: Any, path: str, errors: List[str]) -> None:
+            if isinstance(v, list):
+                for i, item in enumerate(v):
+                    item_check(item, f"{path}[{i}]", errors)
+
+        checks.append(check_items)
+
+    def check(v: Any, path: str, errors: List[str]) -> None:
+        for c in checks:
+            c(v, path, errors)
+
+    return check
+
+
+def compile_validator(schema: Dict[str, Any], *, partial: bool = False) -> Callable[[Any], List[str]]:
+    """Compile ``schema`` once; the result returns a list of error strings.
+
+    Supports the subset the output schema uses: ``type`` (incl. lists),
+    ``enum``, ``properties`` / ``required`` / ``additionalProperties`` and
+    ``items``.  ``partial=True`` skips ``required`` – for repaired replies
+    whose trailing keys were lost to truncation.
+    """
+    check = _compile(schema, partial)
+
+    def validate(value: Any) -> List[str]:
+        errors: List[str] = []
+        check(value, "$", errors)
+        return errors
+
+    return validate
+
+
+validate_result = compile_validator(INFERENCE_RESULT_SCHEMA)
+validate_partial = compile_validator(INFERENCE_RESULT_SCHEMA, partial=True)
+
+
+def strip_nulls(value: Any) -> Any:
+    """Drop ``null`` members from objects (strict‑mode placeholders)."""
+    if isinstance(value, dict):
+        return {k: strip_nulls(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [strip_nulls(v) for v in value]
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Repair
+# ---------------------------------------------------------------------------
+
+_TAIL_COMMA = re.compile(r",\s*$")
+
+
+def _keeps(stack: List[str]) -> bool:
+    """Containers a truncated reply may be cut inside: the top‑level object
+    and its direct array values.  Anything deeper is an array element or a
+    nested value and is only kept once fully closed."""
+    return len(stack) == 1 or (len(stack) == 2 and stack[1] == "]")
+
+
+def repair_json(raw: str) -> str:
+    """Best‑effort fix of a damaged JSON object; returns the candidate text.
+
+    One scan over the text outside of strings drops ``//`` and ``/* */``
+    comments, commas right before ``}`` / ``]``, stray closers and anything
+    after the top‑level object.  A truncated reply is never completed in
+    place: it is cut back to the end of the last fully closed top‑level
+    value or array element, and only the brackets still open there are
+    closed.  A half‑written number, string or trailing element is dropped.
+
+    >>> repair_json('{"actions": [{"type": "Navigation"}], "angle": 9')
+    '{"actions": [{"type": "Navigation"}]}'
+    >>> repair_json('{"actions": [{"type": "Navigation"}, {"type": "Interac"')
+    '{"actions": [{"type": "Navigation"}]}'
+    """
+    text = strip_json_text(raw)
+    start = text.find("{")
+    if start == -1:
+        return text
+    text = text[start:]
+
+    out: List[str] = []
+    stack: List[str] = []
+    # (len(out), open stack) right after a complete value that may be kept
+    cuts: List[Tuple[int, Tuple[str, ...]]] = []
+    in_str = esc = False
+    value_str = False  # the open string is a value, not a key
+    last = ""          # last structural character outside strings
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if in_str:
+            out.append(ch)
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+                if value_str and _keeps(stack):
+                    cuts.append((len(out), tuple(stack)))
+            i += 1
+            continue
+        if ch == "/" and text.startswith("//", i):
+            nl = text.find("\n", i)
+            i = n if nl == -1 else nl
+            continue
+        if ch == "/" and text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if ch == '"':
+            in_str = True
+            value_str = last == ":" or (bool(stack) and stack[-1] == "]")
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if not stack or stack[-1] != ch:
+                i += 1
+                continue
+            stack.pop()
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            out.append(ch)
+            last = ch
+            i += 1
+            if not stack:
+                break
+            if _keeps(stack):
+                cuts.append((len(out), tuple(stack)))
+            continue
+        elif ch == ",":
+            if _keeps(stack):
+                cuts.append((len(out), tuple(stack)))  # numbers / literals end here
+        if not ch.isspace():
+            last = ch
+        out.append(ch)
+        i += 1
+        if not stack:
+            break
+
+    body = "".join(out)
+    if not stack and not in_str:
+        return body
+    for cut, cut_stack in reversed(cuts):
+        candidate = _TAIL_COMMA.sub("", body[:cut].rstrip()) + "".join(reversed(cut_stack))
+        if _loads(candidate) is not None:
+            return candidate
+    return body
+
+
+def _loads(text: str) -> Optional[Any]:
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        return None
+
+
+def loads_lenient(raw: str) -> Tuple[Any, bool]:
+    """``(object, repaired)``; strict parse first, then :func:`repair_json`.
+
+    Raises ``ValueError`` when the repaired text is still not JSON.
+    """
+    try:
+        return json.loads(strip_json_text(raw)), False
+    except ValueError:
+        pass
+    fixed = repair_json(raw)
+    data = _loads(fixed)
+    if data is None:
+        raise ValueError(f"unrepairable JSON: {fixed[:200]!r}")
+    return data, True
+
+
+# ---------------------------------------------------------------------------
+# Corpus benchmark
+# ---------------------------------------------------------------------------
+
+
+def load_corpus(paths: Iterable[str]) -> List[str]:
+    """Raw replies from JSONL files (``raw`` lines or ``{"t", "delta"}`` streams)."""
+    corpus: List[str] = []
+    for path in paths:
+        deltas: List[str] = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                if isinstance(rec, str):
+                    corpus.append(rec)
+                elif "raw" in rec:
+                    corpus.append(rec["raw"])
+                elif "delta" in rec:
+                    deltas.append(rec["delta"])
+        if deltas:
+            corpus.append("".join(deltas))
+    return corpus
+
+
+def _synthetic_corpus(sample: Dict[str, Any]) -> List[str]:
+    """Typical damage applied to one well‑formed reply."""
+    pretty = json.dumps(sample, indent=2, ensure_ascii=False)
+    fenced = f"```json\n{pretty}\n```"
+    corpus = [pretty, fenced, "json\n" + pretty, pretty + "\nLet me know if you need anything else."]
+    corpus.append(pretty.replace('"OK"', '"OK",').replace("]\n", "],\n", 1))  # trailing commas
+    corpus.append(pretty.replace('"angle": 0,', '"angle": 0,  // degrees'))  # comment from the prompt
+    corpus.append(pretty.replace('"OPEN_SPACE_OR_CORRIDOR"', '"OPEN_SPACE_OR_CORRIDOR"  /* env */'))
+    for frac in (0.35, 0.5, 0.65, 0.8, 0.9, 0.97):  # max_tokens truncation
+        corpus.append(fenced[: int(len(fenced) * frac)])
+    corpus.append(pretty.replace("\n", "\n\n").replace('"status"', '"status":'))  # garbage
+    return corpus
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Parse-failure rate: strict vs repair vs repair+schema",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("corpus", nargs="*", help="JSONL files of recorded raw replies / streams")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print each failure")
+    args = parser.parse_args()
+
+    if args.corpus:
+        replies = load_corpus(args.corpus)
+    else:
+        replies = _synthetic_corpus(
+            {
+                "actions": [
+                    {
+                        "type": "Navigation",
+                        "parameters": {"direction": "forward", "angle": 0, "distance": 0.8},
+                        "Goal_observed": "False",
+                        "where_goal": "FALSE",
+                        "obstacle_avoidance_strategy": "",
+                    }
+                ],
+                "description": "A long corridor with doors on both sides.",
+                "obstacles": ["chair", "bin"],
+                "current_environment_type": "OPEN_SPACE_OR_CORRIDOR",
+                "status": "OK",
+            }
+        )
+
+    strict = repaired = valid = 0
+    for idx, raw in enumerate(replies):
+        try:
+            json.loads(strip_json_text(raw))
+            strict += 1
+        except ValueError:
+            pass
+        try:
+            data, was_repaired = loads_lenient(raw)
+        except ValueError as exc:
+            if args.verbose:
+                print(f"[{idx}] unrepairable: {exc}")
+            continue
+        repaired += 1
+        errors = (validate_partial if was_repaired else validate_result)(data)
+        if errors:
+            if args.verbose:
+                print(f"[{idx}] schema: {'; '.join(errors[:3])}")
+            continue
+        valid += 1
+
+    total = len(replies) or 1
+    print(f"{len(replies)} replies")
+    for name, ok in (("strict", strict), ("repair", repaired), ("repair+schema", valid)):
+        print(f"{name:14s} ok={ok:4d}  failure_rate={100 * (1 - ok / total):5.1f} %")
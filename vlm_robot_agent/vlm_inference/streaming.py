@@ -0,0 +1,210 @@
+"""# vlm_robot_agent/vlm_inference/streaming.py
+================================
+Incremental parsing of streamed chat completions.
+
+The blocking path waits for the whole completion, strips code fences and
+only then runs ``json.loads``.  The prompts ask for ``actions`` *first*, so
+with ``stream=True`` the first action is complete long before
+``description`` / ``obstacles`` are generated.  **IncrementalActionParser**
+is fed the text deltas and returns every element of the top‑level
+``actions`` array as soon as its closing brace arrives:
+
+>>> parser = IncrementalActionParser()
+>>> parser.feed('```json\\n{"actions": [{"type": "Navigation", "param')
+[]
+>>> parser.feed('eters": {}}, {"ty')
+[{'type': 'Navigation', 'parameters': {}}]
+
+The full text is still parsed by :meth:`VLMInference._parse_response` at the
+end, so the final :class:`InferenceResult` is unchanged.
+
+Run as a script to benchmark time‑to‑first‑action against recorded streams
+(JSONL files of ``{"t": seconds, "delta": text}`` lines, see ``--capture``)::
+
+    python -m vlm_robot_agent.vlm_inference.streaming rec1.jsonl rec2.jsonl
+"""
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+__all__ = ["IncrementalActionParser", "load_stream", "save_stream", "replay_stream"]
+
+_ARRAY_KEY = "actions"
+
+
+class IncrementalActionParser:
+    """Character scanner that tracks JSON nesting across arbitrary chunks.
+
+    Only structure is tracked (strings, escapes, ``{}``/``[]`` depth); each
+    finished action object is handed to ``json.loads`` once.  Text before the
+    top‑level object (code fences, a ``json`` prefix) is skipped.  An element
+    that is not valid JSON on its own (e.g. a ``//`` comment copied from the
+    prompt) is not dispatched early – counted in ``skipped`` – and the final
+    parse of the whole text decides.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start = -1
+        self._last_key = ""
+        self._expect_array = False
+        self._in_actions = False
+        self._elem_start = -1
+        self.done = False  # ``actions`` array closed
+        self.emitted = 0
+        self.skipped = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume ``chunk``; return the action objects completed by it."""
+        self.text += chunk
+        out: List[Dict[str, Any]] = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start >= 0:
+                        self._last_key = text[self._key_start : i]
+                        self._key_start = -1
+                continue
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._key_start = i + 1
+            elif c == ":" and self._depth == 1:
+                self._expect_array = self._last_key == _ARRAY_KEY and not self.done
+            elif c in "{[":
+                self._depth += 1
+                if c == "[" and self._depth == 2 and self._expect_array:
+                    self._in_actions = True
+                elif c == "{" and self._depth == 3 and self._in_actions:
+                    self._elem_start = i
+                self._expect_array = False
+            elif c in "}]":
+                if c == "}" and self._depth == 3 and self._elem_start >= 0:
+                    try:
+                        out.append(json.loads(text[self._elem_start : i + 1]))
+                        self.emitted += 1
+                    except ValueError:
+                        self.skipped += 1
+                    self._elem_start = -1
+                elif c == "]" and self._depth == 2 and self._in_actions:
+                    self._in_actions = False
+                    self.done = True
+                self._depth -= 1
+        self._pos = len(text)
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Recorded streams (benchmark input)
+# ---------------------------------------------------------------------------
+
+
+def save_stream(path: str | Path, chunks: Iterable[Tuple[float, str]]) -> None:
+    """Write ``(seconds_since_request, delta)`` pairs as JSONL."""
+    with Path(path).open("w", encoding="utf-8") as f:
+        for t, delta in chunks:
+            f.write(json.dumps({"t": t, "delta": delta}) + "\n")
+
+
+def load_stream(path: str | Path) -> List[Tuple[float, str]]:
+    with Path(path).open("r", encoding="utf-8") as f:
+        return [(rec["t"], rec["delta"]) for rec in map(json.loads, f) if rec]
+
+
+def replay_stream(chunks: List[Tuple[float, str]], speed: float = 1.0) -> Iterator[str]:
+    """Yield deltas with their recorded timing (``speed`` > 1 replays faster)."""
+    t0 = time.perf_counter()
+    for t, delta in chunks:
+        wait = t / speed - (time.perf_counter() - t0)
+        if wait > 0:
+            time.sleep(wait)
+        yield delta
+
+
+def _synthetic_stream(text: str, tokens_per_s: float, ttft: float) -> List[Tuple[float, str]]:
+    """Chop ``text`` into ~4‑char tokens emitted at a constant rate."""
+    return [(ttft + i / tokens_per_s, text[i * 4 : i * 4 + 4]) for i in range((len(text) + 3) // 4)]
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    import statistics
+
+    from .inference import VLMInference
+
+    parser = argparse.ArgumentParser(
+        description="Time-to-first-action: incremental vs full-response parsing",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("streams", nargs="*", help="recorded stream JSONL files")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor")
+    parser.add_argument("--tps", type=float, default=60.0, help="tokens/s of the synthetic stream")
+    parser.add_argument("--capture", metavar="IMAGE", help="record one real streamed request instead")
+    parser.add_argument("--out", default="stream.jsonl", help="output file for --capture")
+    parser.add_argument("-g", "--goal", default="Entrar en la oficina 12")
+    args = parser.parse_args()
+
+    if args.capture:
+        engine = VLMInference(goal=args.goal)
+        rec: List[Tuple[float, str]] = []
+        t_start = time.perf_counter()
+        engine.infer(args.capture, on_chunk=lambda d: rec.append((time.perf_counter() - t_start, d)))
+        save_stream(args.out, rec)
+        print(f"saved {len(rec)} chunks to {args.out}")
+        raise SystemExit(0)
+
+    if args.streams:
+        recordings = {p: load_stream(p) for p in args.streams}
+    else:
+        sample = {
+            "actions": [
+                {
+                    "type": "Navigation",
+                    "parameters": {"direction": "forward", "angle": 0, "distance": 0.8},
+                    "Goal_observed": "False",
+                    "where_goal": "FALSE",
+                    "obstacle_avoidance_strategy": "",
+                }
+            ],
+            "description": "A long corridor with doors on both sides and a fire extinguisher on the left wall.",
+            "obstacles": ["chair", "bin", "door"],
+            "current_environment_type": "OPEN_SPACE_OR_CORRIDOR",
+            "status": "OK",
+        }
+        text = "```json\n" + json.dumps(sample, indent=2) + "\n```"
+        recordings = {f"synthetic@{args.tps:g}tps": _synthetic_stream(text, args.tps, ttft=0.4)}
+
+    first, full = [], []
+    for name, chunks in recordings.items():
+        p = IncrementalActionParser()
+        t0 = time.perf_counter()
+        t_first = None
+        for delta in replay_stream(chunks, args.speed):
+            if p.feed(delta) and t_first is None:
+                t_first = time.perf_counter() - t0
+        t_full = time.perf_counter() - t0
+        first.append(t_first if t_first is not None else t_full)
+        full.append(t_full)
+        print(f"{name:40s} first_action={first[-1] * 1000:7.1f} ms  full={t_full * 1000:7.1f} ms")
+    print(
+        f"mean time-to-first-action {statistics.mean(first) * 1000:.1f} ms vs "
+        f"{statistics.mean(full) * 1000:.1f} ms waiting for the full response "
+        f"({100 * (1 - statistics.mean(first) / statistics.mean(full)):.0f}% faster)"
+    )
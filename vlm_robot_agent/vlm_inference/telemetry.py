@@ -0,0 +1,386 @@
+"""# vlm_robot_agent/vlm_inference/telemetry.py
+================================
+Lightweight spans, counters and histograms for the agent stack.
+
+Instrumented code calls the module functions unconditionally:
+
+>>> with telemetry.span("agent.step"):
+...     ...
+>>> telemetry.count("vlm.cache_hits", mode="navigation")
+>>> telemetry.record_usage({"prompt_tokens": 812, "cached_tokens": 768}, source="vlm")
+
+While no sink is installed (the default) every call returns right after one
+global check – ``span`` hands out a shared no‑op context manager – so the
+overhead is a function call.  :func:`enable` installs sinks:
+
+    • :class:`MemorySink`      – aggregates in process; ``snapshot()`` gives
+                                 counters and p50 / p95 / p99 per histogram,
+    • :class:`JSONLSink`       – one JSON line per event (offline analysis),
+    • :class:`PrometheusSink`  – text exposition format, optionally served
+                                 on ``http://host:port/metrics``.
+
+>>> prom = PrometheusSink(port=9464)
+>>> telemetry.enable(MemorySink(), prom)
+
+Spans become the histogram ``span_seconds{span=<name>}``; nested spans know
+their parent (reported by the JSONL sink).  Stage timings measured
+elsewhere are fed with :func:`record`.
+"""
+from __future__ import annotations
+
+import bisect
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+__all__ = [
+    "Event",
+    "Sink",
+    "MemorySink",
+    "JSONLSink",
+    "PrometheusSink",
+    "enable",
+    "disable",
+    "enabled",
+    "span",
+    "record",
+    "count",
+    "observe",
+    "record_usage",
+]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Event(NamedTuple):
+    kind: str               # "span" | "counter" | "histogram"
+    name: str
+    value: float            # seconds for spans
+    labels: Dict[str, str]
+    time: float             # wall clock (time.time())
+    parent: Optional[str]   # enclosing span, spans only
+
+
+class Sink:
+    """Receives every event; must be thread‑safe."""
+
+    def emit(self, event: Event) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Global state & recording API
+# ---------------------------------------------------------------------------
+
+_SINKS: Tuple[Sink, ...] = ()
+_CURRENT: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("vlm_span", default=None)
+
+
+def enable(*sinks: Sink) -> Tuple[Sink, ...]:
+    """Install ``sinks`` (replacing the previous ones); returns them."""
+    global _SINKS
+    _SINKS = tuple(sinks)
+    return _SINKS
+
+
+def disable() -> None:
+    """Remove and close all sinks."""
+    global _SINKS
+    sinks, _SINKS = _SINKS, ()
+    for sink in sinks:
+        sink.close()
+
+
+def enabled() -> bool:
+    return bool(_SINKS)
+
+
+def _emit(kind: str, name: str, value: float, labels: Dict[str, Any], parent: Optional[str] = None) -> None:
+    event = Event(kind, name, float(value), {k: str(v) for k, v in labels.items()}, time.time(), parent)
+    for sink in _SINKS:
+        sink.emit(event)
+
+
+class _Span:
+    __slots__ = ("name", "labels", "parent", "_t0", "_token")
+
+    def __init__(self, name: str, labels: Dict[str, Any]) -> None:
+        self.name = name
+        self.labels = labels
+
+    def set(self, **labels: Any) -> None:
+        """Add labels discovered inside the span (e.g. ``cache="hit"``)."""
+        self.labels.update(labels)
+
+    def __enter__(self) -> "_Span":
+        self.parent = _CURRENT.get()
+        self._token = _CURRENT.set(self.name)
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        elapsed = time.perf_counter() - self._t0
+        _CURRENT.reset(self._token)
+        if exc_type is not None:
+            self.labels["error"] = exc_type.__name__
+            _emit("counter", "errors", 1, {"span": self.name, "error": exc_type.__name__})
+        _emit("span", self.name, elapsed, self.labels, self.parent)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **labels: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **labels: Any) -> Any:
+    """Context manager timing a stage; exceptions are counted and re‑raised."""
+    if not _SINKS:
+        return _NULL_SPAN
+    return _Span(name, labels)
+
+
+def record(name: str, seconds: float, **labels: Any) -> None:
+    """Report a span measured elsewhere (e.g. ``VLMInference.last_timings``)."""
+    if _SINKS:
+        _emit("span", name, seconds, labels, _CURRENT.get())
+
+
+def count(name: str, value: float = 1, **labels: Any) -> None:
+    if _SINKS:
+        _emit("counter", name, value, labels)
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    if _SINKS:
+        _emit("histogram", name, value, labels)
+
+
+def record_usage(usage: Optional[Dict[str, int]], **labels: Any) -> None:
+    """Count API tokens: ``tokens{kind=prompt|completion|cached}``."""
+    if not _SINKS or not usage:
+        return
+    for kind in ("prompt", "completion", "cached"):
+        n = usage.get(f"{kind}_tokens", 0)
+        if n:
+            _emit("counter", "tokens", n, {**labels, "kind": kind})
+
+
+# ---------------------------------------------------------------------------
+# Sinks
+# ---------------------------------------------------------------------------
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "n", "recent")
+
+    def __init__(self, buckets: Sequence[float], window: int) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last = +Inf
+        self.sum = 0.0
+        self.n = 0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.n += 1
+        self.recent.append(value)
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self.recent)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted(labels.items()))
+
+
+def _fmt_key(name: str, key: LabelKey) -> str:
+    if not key:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in key) + "}"
+
+
+class MemorySink(Sink):
+    """In‑process aggregation; quantiles over the last ``window`` samples."""
+
+    def __init__(self, *, buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = 1024) -> None:
+        self.buckets = tuple(buckets)
+        self.window = window
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.histograms: Dict[Tuple[str, LabelKey], _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def emit(self, event: Event) -> None:
+        if event.kind == "counter":
+            k = (event.name, _key(event.labels))
+            with self._lock:
+                self.counters[k] = self.counters.get(k, 0.0) + event.value
+            return
+        if event.kind == "span":
+            k = ("span_seconds", _key({**event.labels, "span": event.name}))
+        else:
+            k = (event.name, _key(event.labels))
+        with self._lock:
+            hist = self.histograms.get(k)
+            if hist is None:
+                hist = self.histograms[k] = _Histogram(self.buckets, self.window)
+            hist.add(event.value)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                "counters": {_fmt_key(n, k): v for (n, k), v in self.counters.items()},
+                "histograms": {
+                    _fmt_key(n, k): {
+                        "count": h.n,
+                        "sum": h.sum,
+                        "p50": h.quantile(0.50),
+                        "p95": h.quantile(0.95),
+                        "p99": h.quantile(0.99),
+                    }
+                    for (n, k), h in self.histograms.items()
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+class JSONLSink(Sink):
+    """Appends every event as a JSON line; flushed every ``flush_every`` events."""
+
+    def __init__(self, path: str | Path, *, flush_every: int = 64) -> None:
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a", encoding="utf-8")
+        self.flush_every = flush_every
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def emit(self, event: Event) -> None:
+        line = json.dumps(event._asdict(), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._file.flush()
+                self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def _metric_name(prefix: str, name: str) -> str:
+    return prefix + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _prom_labels(key: LabelKey, *extra: Tuple[str, str]) -> str:
+    if not key and not extra:
+        return ""
+    parts = []
+    for k, v in key + extra:
+        v = v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class PrometheusSink(MemorySink):
+    """:class:`MemorySink` rendered in the Prometheus text format.
+
+    With ``port`` a daemon thread serves :meth:`render` on ``/metrics``.
+    """
+
+    def __init__(
+        self,
+        *,
+        port: Optional[int] = None,
+        host: str = "0.0.0.0",
+        prefix: str = "vlm_",
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(buckets=buckets)
+        self.prefix = prefix
+        self._server: Optional[ThreadingHTTPServer] = None
+        if port is not None:
+            self._serve(host, port)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+        typed = set()
+        for (name, key), value in counters:
+            metric = _metric_name(self.prefix, name) + "_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_prom_labels(key)} {value:g}")
+        for (name, key), hist in histograms:
+            metric = _metric_name(self.prefix, name)
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, n in zip(list(hist.buckets) + [float("inf")], hist.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{metric}_bucket{_prom_labels(key, ('le', le))} {cumulative}")
+            lines.append(f"{metric}_sum{_prom_labels(key)} {hist.sum:g}")
+            lines.append(f"{metric}_count{_prom_labels(key)} {hist.n}")
+        return "\n".join(lines) + "\n"
+
+    def _serve(self, host: str, port: int) -> None:
+        sink = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 (http.server API)
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = sink.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None